@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Float, ForeignKey
+from sqlalchemy import BigInteger, Column, Date, String, ForeignKey
 from sqlalchemy.orm import relationship
+from core.money import from_minor
 from database.core import Base
 
 
@@ -7,12 +8,31 @@ class Accounts(Base):
     __tablename__ = "accounts"
 
     id = Column(String, primary_key=True, index=True)
-    owner_id = Column(String, ForeignKey("users.id"))
+    owner_id = Column(String, ForeignKey("users.id"), index=True)
     name = Column(String)
     currency = Column(String)
-    money = Column(Float)
+    # Balance in minor units, see core.money
+    money_minor = Column(BigInteger, nullable=False, default=0)
 
     # Relation vers les ordres
     orders = relationship(
         "Orders", back_populates="account", cascade="all, delete-orphan"
     )
+
+    @property
+    def money(self) -> float:
+        return from_minor(self.money_minor)
+
+
+class BalanceSnapshots(Base):
+    """Net balance change of one account on one day (see services.balance_history)
+
+    The rows of an account add up to its balance, so the balance at the end
+    of any day is the sum of its rows up to that day.
+    """
+
+    __tablename__ = "balance_snapshots"
+
+    account_id = Column(String, ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    delta_minor = Column(BigInteger, nullable=False, default=0)
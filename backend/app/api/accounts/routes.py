@@ -1,13 +1,26 @@
-import uuid
-
-from typing import Annotated
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session, joinedload
+from datetime import date, timedelta
+from typing import Annotated, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.accounts.models import Accounts
-from api.accounts.schemas import AccountBase
-from api.orders.models import Orders
-from database.core import get_db
+from api.accounts.schemas import (
+    ACCOUNT_FIELDS,
+    AccountBase,
+    AccountPage,
+    AccountResponse,
+    AccountWithOrders,
+    BalanceHistory,
+    UserAccountsResponse,
+)
+from api.orders.schemas import OrderResponse
+from core.config import settings
+from core.pagination import page_dependency, paginate, stream_ndjson
+from database.core import get_async_db, get_read_db
+from services import accounts as accounts_service
+from services.balance_history import balance_history
+from services.versions import account_etag, user_etag
 from core.security import (
     get_current_user,
     get_superuser_dependency,
@@ -17,64 +30,229 @@ from core.security import (
 
 router = APIRouter(prefix="/account", tags=["account"])
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# GET endpoints read from the replica, when there is one
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 
 user_dependency = Annotated[dict, Depends(get_current_user)]
 superuser_dependency = Annotated[dict, Depends(get_superuser_dependency)]
 
+
+class AccountView:
+    """How much of each account to return (list views skip orders by default)"""
+
+    def __init__(
+        self,
+        include_orders: bool = Query(default=False),
+        orders_limit: int = Query(
+            default=settings.EMBEDDED_ORDERS_DEFAULT,
+            ge=0,
+            le=settings.EMBEDDED_ORDERS_MAX,
+            description="newest orders embedded per account",
+        ),
+        fields: Optional[str] = Query(
+            default=None, description="comma separated fields, e.g. id,name,money"
+        ),
+    ):
+        self.fields = ACCOUNT_FIELDS
+        if fields:
+            self.fields = {name.strip() for name in fields.split(",")}
+            unknown = self.fields - ACCOUNT_FIELDS
+            if unknown:
+                raise HTTPException(
+                    status_code=422, detail=f"Unknown fields: {sorted(unknown)}"
+                )
+            # A projection embeds the orders only when it names them
+            include_orders = "orders" in self.fields
+        self.include_orders = include_orders
+        self.orders_limit = orders_limit
+        if not include_orders:
+            self.fields = self.fields - {"orders"}
+
+
+class AccountDetailView(AccountView):
+    """Single account: orders are embedded unless `include_orders` is false
+    or `fields` leaves them out"""
+
+    def __init__(
+        self,
+        include_orders: bool = Query(default=True),
+        orders_limit: int = Query(
+            default=settings.EMBEDDED_ORDERS_DEFAULT,
+            ge=0,
+            le=settings.EMBEDDED_ORDERS_MAX,
+            description="newest orders embedded",
+        ),
+        fields: Optional[str] = Query(
+            default=None, description="comma separated fields, e.g. id,name,money"
+        ),
+    ):
+        super().__init__(include_orders, orders_limit, fields)
+
+
+view_dependency = Annotated[AccountView, Depends()]
+
+
+async def build_accounts(
+    db: AsyncSession, accounts: list, view: AccountView
+) -> List[AccountWithOrders]:
+    """Projects accounts on the requested fields, embedding capped orders"""
+    orders = {}
+    if view.include_orders:
+        orders = await accounts_service.load_recent_orders(
+            db, [a.id for a in accounts], view.orders_limit
+        )
+
+    result = []
+    for account in accounts:
+        values = {
+            name: getattr(account, name) for name in view.fields if name != "orders"
+        }
+        if view.include_orders:
+            values["orders"] = [
+                OrderResponse.model_validate(o) for o in orders[account.id]
+            ]
+        result.append(
+            AccountWithOrders.model_construct(_fields_set=set(values), **values)
+        )
+    return result
+
+
+async def serialize_accounts(db: AsyncSession, accounts: list, view: AccountView):
+    """ndjson documents of a batch of accounts, as build_accounts shapes them"""
+    return [
+        account.model_dump_json(exclude_unset=True)
+        for account in await build_accounts(db, accounts, view)
+    ]
+
+
 """═══ MY ACCOUNTS ═══"""
 
 
-@router.get("/")
-async def get_my_accounts(db: db_dependency, user: user_dependency):
+@router.get(
+    "/",
+    response_model=List[AccountWithOrders],
+    response_model_exclude_unset=True,
+    dependencies=[Depends(user_etag)],
+)
+async def get_my_accounts(
+    db: read_db_dependency, user: user_dependency, view: view_dependency
+):
     """Returns All Accounts of active user"""
-    return (
-        db.query(Accounts)
-        .options(joinedload(Accounts.orders))
-        .filter(Accounts.owner_id == user["id"])
-        .all()
+    accounts = await db.scalars(
+        select(Accounts).where(Accounts.owner_id == user["id"]).order_by(Accounts.id)
     )
+    return await build_accounts(db, accounts.all(), view)
 
 
-@router.post("/")
+@router.post("/", response_model=dict[str, str])
 async def create_account(db: db_dependency, user: user_dependency, acc: AccountBase):
     """Creates an account for the active user"""
-    db_acc = Accounts(
-        id=uuid.uuid4(),
-        owner_id=user["id"],
-        name=acc.name,
-        currency=acc.currency,
-        money=acc.money,
-    )
-    db.add(db_acc)
-    db.commit()
+    await accounts_service.create_account(db, user["id"], acc)
+    await db.commit()
     return {"data": "Account created successfully"}
 
 
-@router.get("/{account_id}")
+"""═══ ADMIN ONLY ═══"""
+
+
+# Declared before /{account_id} so that "all" is not taken for an account id
+@router.get("/all", response_model=AccountPage, response_model_exclude_unset=True)
+async def get_all_accounts(
+    db: read_db_dependency,
+    super_db: superuser_dependency,
+    page: page_dependency,
+    view: view_dependency,
+):
+    """Returns all accounts in the DB ( only superuser ), one page at a time"""
+    stmt = select(Accounts)
+    if page.format == "ndjson":
+        # The capped orders of one streamed batch are loaded at once
+        return stream_ndjson(
+            stmt,
+            [Accounts.id],
+            serialize_batch=lambda db, accounts: serialize_accounts(db, accounts, view),
+        )
+
+    accounts, next_cursor = await paginate(db, stmt, [Accounts.id], page)
+    return AccountPage(
+        accounts=await build_accounts(db, accounts, view), next_cursor=next_cursor
+    )
+
+
+@router.get(
+    "/{account_id}",
+    response_model=AccountWithOrders,
+    response_model_exclude_unset=True,
+    dependencies=[Depends(account_etag)],
+)
 async def get_account_by_id(
-    *, db: db_dependency, user: user_dependency, account_id: str
+    *,
+    db: read_db_dependency,
+    user: user_dependency,
+    account_id: str,
+    view: Annotated[AccountDetailView, Depends()],
 ):
     """Get account by ID"""
-    db_acc = (
-        db.query(Accounts)
-        .options(joinedload(Accounts.orders))
-        .filter(Accounts.id == account_id)
-        .first()
-    )
+    db_acc = await db.get(Accounts, account_id)
     if not db_acc:
         raise HTTPException(status_code=404, detail="Account Not Found")
 
     check_resource_access(user, db_acc.owner_id, "account")
 
-    return db_acc
+    return (await build_accounts(db, [db_acc], view))[0]
+
+
+@router.get(
+    "/{account_id}/balance-history",
+    response_model=BalanceHistory,
+    dependencies=[Depends(account_etag)],
+)
+async def get_balance_history(
+    account_id: str,
+    db: read_db_dependency,
+    user: user_dependency,
+    start: Optional[date] = Query(
+        default=None, description="defaults to end - 30 days"
+    ),
+    end: Optional[date] = Query(default=None, description="defaults to today"),
+):
+    """Daily closing balances of an account, from its balance snapshots"""
+    db_acc = await db.get(Accounts, account_id)
+    if not db_acc:
+        raise HTTPException(status_code=404, detail="Account Not Found")
+    check_resource_access(user, db_acc.owner_id, "account")
+
+    end = end or date.today()
+    start = start or end - timedelta(days=settings.BALANCE_HISTORY_DEFAULT_DAYS)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must not be after end")
+    if (end - start).days >= settings.BALANCE_HISTORY_MAX_DAYS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Ranges are limited to {settings.BALANCE_HISTORY_MAX_DAYS} days",
+        )
+
+    return BalanceHistory(
+        account_id=account_id,
+        currency=db_acc.currency,
+        start=start,
+        end=end,
+        points=await balance_history(db, account_id, start, end),
+    )
 
 
 """═══ USER SPECIFIC (Admin can access any) ═══"""
 
 
-@router.get("/user/{user_id}")
-async def get_accounts_by_user(db: db_dependency, user: user_dependency, user_id: str):
+@router.get(
+    "/user/{user_id}",
+    response_model=UserAccountsResponse,
+    response_model_exclude_unset=True,
+)
+async def get_accounts_by_user(
+    db: read_db_dependency, user: user_dependency, user_id: str, view: view_dependency
+):
     """Returns accounts of a specific user (superuser only) or own accounts"""
     if not is_superuser(user) and user["id"] != user_id:
         raise HTTPException(
@@ -83,76 +261,61 @@ async def get_accounts_by_user(db: db_dependency, user: user_dependency, user_id
         )
 
     try:
-        accounts = (
-            db.query(Accounts)
-            .options(joinedload(Accounts.orders))
-            .filter(Accounts.owner_id == user_id)
-            .all()
+        result = await db.scalars(
+            select(Accounts).where(Accounts.owner_id == user_id).order_by(Accounts.id)
+        )
+        accounts = await build_accounts(db, result.all(), view)
+        return UserAccountsResponse(
+            user_id=user_id, accounts=accounts, count=len(accounts)
         )
-        return {"user_id": user_id, "accounts": accounts, "count": len(accounts)}
     except Exception:
         raise HTTPException(status_code=500, detail="Could not retrieve data")
 
 
-"""═══ ADMIN ONLY ═══"""
-
-
-@router.get("/all")
-async def get_all_accounts(db: db_dependency, super_db: superuser_dependency):
-    """Returns all accounts in the DB ( only superuser )"""
-    return db.query(Accounts).options(joinedload(Accounts.orders)).all()
-
-
 """═══ ACCOUNT MANAGEMENT ═══"""
 
 
-@router.put("/{account_id}")
+@router.put("/{account_id}", response_model=dict[str, str])
 async def update_account(
     account_id: str, db: db_dependency, user: user_dependency, new_acc: AccountBase
 ):
     """Update account information"""
-    db_acc = db.query(Accounts).filter(Accounts.id == account_id).first()
+    db_acc = await db.get(Accounts, account_id)
     if not db_acc:
         raise HTTPException(status_code=404, detail="Account Not Found")
 
     if not is_superuser(user) and user["id"] != db_acc.owner_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    db_acc.name = new_acc.name
-    db_acc.money = new_acc.money
-    db_acc.currency = new_acc.currency
-    db.add(db_acc)
-    db.commit()
-    db.refresh(db_acc)
+    await accounts_service.update_account(db, db_acc, new_acc)
+    await db.commit()
     return {"data": "Account updated"}
 
 
-@router.put("/reset/{account_id}")
+@router.put("/reset/{account_id}", response_model=AccountResponse)
 async def reset_account(db: db_dependency, user: user_dependency, account_id: str):
-    db_account = db.query(Accounts).options(joinedload(Accounts.orders)).filter(Accounts.id == account_id).first()
+    db_account = await db.get(Accounts, account_id)
     if not db_account:
         raise HTTPException(status_code=404, detail="Account not found")
     if not is_superuser(user) and user["id"] != db_account.owner_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    db_orders = db.query(Orders).filter(Orders.account_id == db_account.id).all()
-    for element in db_orders:
-        db.delete(element)
-    db_account.money = 0
-    db.commit()
-    db.refresh(db_account)
-    return db_account
+    db_account = await accounts_service.reset_account(db, db_account)
+    if db_account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    await db.commit()
+    return AccountResponse.model_validate(db_account)
 
 
-@router.delete("/{account_id}")
+@router.delete("/{account_id}", response_model=dict[str, str])
 async def delete_account(account_id: str, db: db_dependency, user: user_dependency):
     """Delete account"""
-    db_acc = db.query(Accounts).filter(Accounts.id == account_id).first()
+    db_acc = await db.get(Accounts, account_id)
     if not db_acc:
         raise HTTPException(status_code=404, detail="Account doesn't exist")
     if not is_superuser(user) and user["id"] != db_acc.owner_id:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    db.delete(db_acc)
-    db.commit()
+    await accounts_service.delete_account(db, db_acc)
+    await db.commit()
     return {"data": "Account deleted successfully"}
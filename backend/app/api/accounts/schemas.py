@@ -1,6 +1,9 @@
+from datetime import date
 from typing import List, Optional
 from pydantic import BaseModel, Field
 
+from api.orders.schemas import OrderResponse
+
 
 class AccountBase(BaseModel):
     name: str = Field(
@@ -10,29 +13,57 @@ class AccountBase(BaseModel):
     money: float = Field(default=0)
 
 
-class OrderResponse(BaseModel):
-    """Schema for orders in account response"""
+class AccountResponse(BaseModel):
+    """Schema for account without its orders"""
 
     id: str
-    description: Optional[str]
-    order_type: str
-    amount: float
-    created_at: str
-    updated_at: str
+    owner_id: str
+    name: str
+    currency: str
+    money: float
 
     class Config:
         from_attributes = True
 
 
-class AccountWithOrders(BaseModel):
-    """Schema for account with its orders"""
+class AccountWithOrders(AccountResponse):
+    """Schema for account with its orders
+
+    Routes build it with only the requested fields set and serialize with
+    exclude_unset, so `fields` projections and `include_orders=false` simply
+    leave the other keys out.
+    """
 
-    id: str
-    owner_id: str
-    name: str
-    currency: str
-    money: float
     orders: List[OrderResponse] = []
 
-    class Config:
-        from_attributes = True
+
+# Fields a `fields` projection may select
+ACCOUNT_FIELDS = set(AccountWithOrders.model_fields)
+
+
+class AccountPage(BaseModel):
+    """One keyset page of accounts"""
+
+    accounts: List[AccountWithOrders]
+    next_cursor: Optional[str] = None
+
+
+class UserAccountsResponse(BaseModel):
+    user_id: str
+    accounts: List[AccountWithOrders]
+    count: int
+
+
+class BalancePoint(BaseModel):
+    day: date
+    balance: float
+
+
+class BalanceHistory(BaseModel):
+    """Closing balance of every day of the requested range"""
+
+    account_id: str
+    currency: str
+    start: date
+    end: date
+    points: List[BalancePoint]
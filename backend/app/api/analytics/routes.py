@@ -0,0 +1,77 @@
+from datetime import date, datetime
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.analytics.schemas import NetWorth, SpendingSummary
+from core.config import settings
+from core.security import get_current_user, is_superuser
+from database.core import get_read_db
+from services.analytics import get_summary
+from services.net_worth import get_net_worth
+
+router = APIRouter(prefix="/analytics", tags=["analytics"])
+
+# GET endpoints read from the replica, when there is one
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+"""═══ SPENDING ═══"""
+
+
+@router.get("/summary", response_model=SpendingSummary)
+async def get_spending_summary(
+    db: read_db_dependency,
+    user: user_dependency,
+    start: Optional[datetime] = Query(default=None, description="created_at >="),
+    end: Optional[datetime] = Query(default=None, description="created_at <"),
+    top: int = Query(default=10, ge=1, le=100),
+    user_id: Optional[str] = Query(default=None, description="superuser only"),
+):
+    """Monthly totals per account and order type, top descriptions, averages"""
+    owner_id = user_id or user["id"]
+    if owner_id != user["id"] and not is_superuser(user):
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied: You can only access your own analytics",
+        )
+
+    return await get_summary(db, owner_id, start, end, top)
+
+
+"""═══ NET WORTH ═══"""
+
+
+@router.get("/net-worth", response_model=NetWorth)
+async def get_my_net_worth(
+    db: read_db_dependency,
+    user: user_dependency,
+    currency: str = Query(
+        default=settings.FX_DEFAULT_CURRENCY, min_length=3, max_length=3
+    ),
+    start: Optional[date] = Query(
+        default=None, description="first day of the daily history (none if unset)"
+    ),
+    end: Optional[date] = Query(default=None, description="defaults to today"),
+    user_id: Optional[str] = Query(default=None, description="superuser only"),
+    all_users: bool = Query(default=False, description="superuser only"),
+):
+    """Balances converted to one currency: total, per currency and per day"""
+    if (user_id or all_users) and not is_superuser(user):
+        raise HTTPException(
+            status_code=403,
+            detail="Access denied: You can only access your own analytics",
+        )
+    end = end or date.today()
+    if start is not None:
+        if start > end:
+            raise HTTPException(status_code=400, detail="start must not be after end")
+        if (end - start).days >= settings.BALANCE_HISTORY_MAX_DAYS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Ranges are limited to {settings.BALANCE_HISTORY_MAX_DAYS} days",
+            )
+
+    owner_id = None if all_users else user_id or user["id"]
+    return await get_net_worth(db, owner_id, currency, start, end)
@@ -0,0 +1,55 @@
+from datetime import date
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class Totals(BaseModel):
+    count: int
+    total: float
+    average: float
+
+
+class MonthlyTotals(Totals):
+    month: str
+    account_id: str
+    order_type: str
+
+
+class OrderTypeTotals(Totals):
+    order_type: str
+
+
+class DescriptionTotals(Totals):
+    description: Optional[str]
+
+
+class SpendingSummary(BaseModel):
+    monthly: List[MonthlyTotals]
+    by_order_type: List[OrderTypeTotals]
+    top_descriptions: List[DescriptionTotals]
+
+
+class CurrencyBreakdown(BaseModel):
+    """Balances held in one currency, and their value in the report currency"""
+
+    currency: str
+    accounts: int
+    balance: float
+    # None when no rate is loaded for the currency
+    converted: Optional[float]
+    share: Optional[float]
+
+
+class NetWorthPoint(BaseModel):
+    day: date
+    total: float
+
+
+class NetWorth(BaseModel):
+    currency: str
+    total: float
+    rates_as_of: Optional[date]
+    by_currency: List[CurrencyBreakdown]
+    # Currencies left out of the totals for lack of a rate
+    missing_rates: List[str]
+    history: List[NetWorthPoint] = []
@@ -0,0 +1,33 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.batch.schemas import BatchRequest, BatchResponse
+from core.config import settings
+from core.security import get_current_user
+from database.core import get_async_db
+from services import batch as batch_service
+
+router = APIRouter(prefix="/batch", tags=["batch"])
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+"""═══ BATCH ═══"""
+
+
+@router.post("/", response_model=BatchResponse)
+async def run_batch(db: db_dependency, user: user_dependency, batch: BatchRequest):
+    """Apply account and order operations in order, in one transaction
+
+    Each result carries the status the operation's own endpoint would have
+    returned. Atomic batches (the default) commit all operations or none,
+    otherwise every operation that succeeds is committed.
+    """
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batches are limited to {settings.BATCH_MAX_OPERATIONS} operations",
+        )
+    return await batch_service.run_batch(db, user, batch.operations, batch.atomic)
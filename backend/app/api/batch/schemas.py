@@ -0,0 +1,45 @@
+from typing import Any, List, Literal, Optional
+from pydantic import BaseModel, Field
+
+
+class BatchOperation(BaseModel):
+    """One create / update / delete of an account or an order
+
+    `data` is the body of the matching single-item endpoint (AccountBase or
+    OrderBase). Creates may carry the `id` the client generated offline, so
+    later operations of the same batch can refer to it.
+    """
+
+    op: Literal["create", "update", "delete"]
+    resource: Literal["account", "order"]
+    id: Optional[str] = None
+    data: Optional[dict] = None
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(min_length=1)
+    atomic: bool = Field(
+        default=True,
+        description="all operations or none; false applies every one that succeeds",
+    )
+
+
+class BatchResult(BaseModel):
+    """Outcome of one operation, with the status its own endpoint would return
+
+    In an atomic batch that failed, every operation but the failing one is
+    reported as 424: none of them was committed.
+    """
+
+    index: int
+    status: int
+    id: Optional[str] = None
+    data: Optional[dict] = None
+    error: Optional[Any] = None
+
+
+class BatchResponse(BaseModel):
+    committed: bool
+    succeeded: int
+    failed: int
+    results: List[BatchResult]
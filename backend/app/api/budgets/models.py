@@ -0,0 +1,41 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, String, ForeignKey
+from core.money import from_minor
+from database.core import Base
+
+
+class Budgets(Base):
+    """A spending limit per week, month or year
+
+    Covers the expenses booked on one account (account_id) or on every
+    account of its owner (account_id NULL), in one category or in all of
+    them (category NULL).
+    """
+
+    __tablename__ = "budgets"
+
+    id = Column(String, primary_key=True)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    account_id = Column(String, ForeignKey("accounts.id"), index=True)
+    category = Column(String)
+    name = Column(String)
+    period = Column(String, nullable=False)
+    # Limit in minor units, see core.money
+    limit_minor = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False)
+
+    @property
+    def limit(self) -> float:
+        return from_minor(self.limit_minor)
+
+
+class BudgetSpend(Base):
+    """What a budget has spent in one period (see services.budgets)
+
+    Kept up to date by the order writes, in their transaction.
+    """
+
+    __tablename__ = "budget_spend"
+
+    budget_id = Column(String, ForeignKey("budgets.id"), primary_key=True)
+    period_start = Column(Date, primary_key=True)
+    spent_minor = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,98 @@
+from datetime import date
+from typing import Annotated, Optional
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.budgets.schemas import (
+    BudgetBase,
+    BudgetList,
+    BudgetStatus,
+    ReconcileResponse,
+)
+from core.security import get_current_user, get_superuser_dependency
+from database.core import get_async_db, get_read_db
+from services import budgets as budget_service
+
+router = APIRouter(prefix="/budgets", tags=["budgets"])
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# GET endpoints read from the replica, when there is one
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+superuser_dependency = Annotated[dict, Depends(get_superuser_dependency)]
+
+day_query = Query(default=None, description="a day of the period, default today")
+
+
+"""═══ MY BUDGETS ═══"""
+
+
+@router.get("/", response_model=BudgetList)
+async def get_my_budgets(
+    db: read_db_dependency, user: user_dependency, day: Optional[date] = day_query
+):
+    """Every budget of the current user with what is spent and left of it"""
+    budgets = await budget_service.user_budgets(db, user["id"])
+    statuses = await budget_service.budget_statuses(db, budgets, day or date.today())
+    return {"budgets": statuses, "count": len(statuses)}
+
+
+@router.post("/", response_model=BudgetStatus)
+async def create_budget(db: db_dependency, user: user_dependency, budget: BudgetBase):
+    """Set a spending limit per week, month or year
+
+    Expenses already booked in the current period count towards it.
+    """
+    db_budget = await budget_service.create_budget(db, user, budget)
+    await db.commit()
+    statuses = await budget_service.budget_statuses(db, [db_budget], date.today())
+    return statuses[0]
+
+
+"""═══ ADMIN ONLY ═══"""
+
+
+# Declared before /{budget_id} so that "reconcile" is not taken for an id
+@router.post("/reconcile", response_model=ReconcileResponse)
+async def reconcile_budgets(
+    db: db_dependency,
+    superuser: superuser_dependency,
+    fix: bool = Query(default=True, description="rebuild the drifted budgets"),
+):
+    """Recount every budget counter from the orders and report the drift"""
+    return await budget_service.reconcile(db, fix)
+
+
+"""═══ BUDGET MANAGEMENT ═══"""
+
+
+@router.get("/{budget_id}", response_model=BudgetStatus)
+async def get_budget(
+    db: read_db_dependency,
+    user: user_dependency,
+    budget_id: str,
+    day: Optional[date] = day_query,
+):
+    db_budget = await budget_service.get_budget(db, user, budget_id)
+    statuses = await budget_service.budget_statuses(
+        db, [db_budget], day or date.today()
+    )
+    return statuses[0]
+
+
+@router.put("/{budget_id}", response_model=BudgetStatus)
+async def update_budget(
+    db: db_dependency, user: user_dependency, budget_id: str, budget: BudgetBase
+):
+    """Change a budget; a new account, category or period is recounted"""
+    db_budget = await budget_service.update_budget(db, user, budget_id, budget)
+    await db.commit()
+    statuses = await budget_service.budget_statuses(db, [db_budget], date.today())
+    return statuses[0]
+
+
+@router.delete("/{budget_id}", response_model=dict[str, str])
+async def delete_budget(db: db_dependency, user: user_dependency, budget_id: str):
+    await budget_service.delete_budget(db, user, budget_id)
+    await db.commit()
+    return {"data": "Budget deleted successfully"}
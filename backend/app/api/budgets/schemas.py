@@ -0,0 +1,65 @@
+from datetime import date, datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+Period = Literal["weekly", "monthly", "yearly"]
+
+
+class BudgetBase(BaseModel):
+    name: str = Field(min_length=1, max_length=50)
+    account_id: Optional[str] = Field(
+        default=None,
+        description="account it covers; every account of its owner if omitted",
+    )
+    category: Optional[str] = Field(
+        default=None,
+        max_length=50,
+        description="order category it covers; every category if omitted",
+    )
+    period: Period = Field(description="weeks start on Monday")
+    limit: float = Field(ge=0, description="most the expenses may add up to")
+
+
+class BudgetResponse(BaseModel):
+    id: str
+    owner_id: str
+    account_id: Optional[str] = None
+    category: Optional[str] = None
+    name: Optional[str]
+    period: str
+    limit: float
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class BudgetStatus(BudgetResponse):
+    """A budget and what is spent of it in one period"""
+
+    period_start: date
+    period_end: date
+    spent: float
+    remaining: float
+
+
+class BudgetList(BaseModel):
+    budgets: List[BudgetStatus]
+    count: int
+
+
+class BudgetDrift(BaseModel):
+    budget_id: str
+    period_start: date
+    stored: float
+    expected: float
+
+
+class ReconcileResponse(BaseModel):
+    budgets: int
+    counters: int
+    drifted: int
+    drift: List[BudgetDrift]
+    drift_truncated: bool
+    rebuilt: bool
+    elapsed_seconds: float
@@ -0,0 +1,31 @@
+from typing import Annotated
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from core.security import get_current_user
+from services import events as events_service
+
+router = APIRouter(prefix="/events", tags=["events"])
+
+user_dependency = Annotated[dict, Depends(get_current_user)]
+
+
+"""═══ LIVE UPDATES ═══"""
+
+
+@router.get("/", response_class=StreamingResponse)
+async def stream_events(user: user_dependency):
+    """Server-Sent Events of the changes to the user's accounts and orders
+
+    Events: account.created / updated / deleted / reset, account.balance,
+    order.created / updated / deleted and orders.imported, each with a
+    compact JSON payload. "resync" means events were dropped because the
+    client fell behind: refetch, as after connecting.
+    """
+    # Refused before the response starts; the stream itself subscribes
+    events_service.get_broker().check_capacity()
+    return StreamingResponse(
+        events_service.stream(user["id"]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, Date, Float, String
+from database.core import Base
+
+
+class FxRates(Base):
+    """Exchange rate of one currency against the base of the loaded rate file
+
+    Only the ratio of two rates matters: converting `amount` from A to B is
+    `amount * units_per_base[B] / units_per_base[A]`.
+    """
+
+    __tablename__ = "fx_rates"
+
+    currency = Column(String(3), primary_key=True)
+    # Units of this currency one unit of the base currency buys
+    units_per_base = Column(Float, nullable=False)
+    as_of = Column(Date, nullable=False)
@@ -0,0 +1,56 @@
+from datetime import date
+from typing import Annotated, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.fx.schemas import FxRateTable
+from core.security import get_current_user, get_superuser_dependency
+from database.core import get_async_db, get_read_db
+from services import fx as fx_service
+
+router = APIRouter(prefix="/fx", tags=["fx"])
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# GET endpoints read from the replica, when there is one
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+superuser_dependency = Annotated[dict, Depends(get_superuser_dependency)]
+
+
+def rate_table(table: fx_service.RateTable) -> dict:
+    rates = table.to_list()
+    return {"rates": rates, "count": len(rates)}
+
+
+"""═══ RATES ═══"""
+
+
+@router.get("/rates", response_model=FxRateTable)
+async def get_rates(db: read_db_dependency, user: user_dependency):
+    """The loaded exchange rates, against the base of their rate file"""
+    return rate_table(await fx_service.get_rates(db))
+
+
+"""═══ ADMIN ONLY ═══"""
+
+
+@router.put("/rates", response_model=FxRateTable)
+async def load_rates(
+    request: Request,
+    db: db_dependency,
+    user: superuser_dependency,
+    format: Literal["json", "csv"] = Query(default="json"),
+    as_of: Optional[date] = Query(default=None, description="defaults to the file's"),
+):
+    """Replace the exchange rates with a JSON or CSV rate file (request body)"""
+    try:
+        rates, file_date = fx_service.parse_rates(
+            (await request.body()).decode("utf-8"), format
+        )
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    await fx_service.store_rates(db, rates, as_of or file_date or date.today())
+    await db.commit()
+    return rate_table(await fx_service.get_rates(db))
@@ -0,0 +1,14 @@
+from datetime import date
+from typing import List
+from pydantic import BaseModel
+
+
+class FxRate(BaseModel):
+    currency: str
+    units_per_base: float
+    as_of: date
+
+
+class FxRateTable(BaseModel):
+    rates: List[FxRate]
+    count: int
@@ -0,0 +1,165 @@
+import hmac
+from typing import Annotated, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from core.config import settings
+from core.metrics import registry
+from core.security import get_password_pool, get_token_cache
+from database.core import pool_status
+from services.analytics import get_analytics_cache
+from services.events import get_broker
+from services.fx import rate_cache
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def check_metrics_token(authorization: Annotated[Optional[str], Header()] = None):
+    """Scrapers authenticate with `Bearer <METRICS_TOKEN>` when one is set"""
+    if not settings.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if settings.METRICS_TOKEN is None:
+        return
+    expected = f"Bearer {settings.METRICS_TOKEN}"
+    if not authorization or not hmac.compare_digest(authorization, expected):
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+
+"""═══ COLLECTORS ═══"""
+
+
+@registry.collector(("engine",))
+def collect_db_pools():
+    pools = pool_status()
+
+    def per_engine(key, scale=1):
+        return {
+            (name,): stats[key] * scale for name, stats in pools.items() if key in stats
+        }
+
+    return {
+        "db_pool_size": ("gauge", "Pool size", per_engine("size")),
+        "db_pool_in_use": ("gauge", "Connections checked out", per_engine("in_use")),
+        "db_pool_idle": ("gauge", "Connections idle in the pool", per_engine("idle")),
+        "db_pool_overflow": ("gauge", "Overflow connections", per_engine("overflow")),
+        "db_pool_checkouts_total": (
+            "counter",
+            "Connection checkouts",
+            per_engine("checkouts"),
+        ),
+        "db_pool_timeouts_total": (
+            "counter",
+            "Checkouts that timed out waiting for a connection",
+            per_engine("timeouts"),
+        ),
+        "db_pool_checkout_wait_seconds_total": (
+            "counter",
+            "Time spent waiting for a connection",
+            per_engine("wait_total_ms", 0.001),
+        ),
+        "db_pool_checkout_wait_seconds_max": (
+            "gauge",
+            "Longest wait for a connection",
+            per_engine("wait_max_ms", 0.001),
+        ),
+    }
+
+
+@registry.collector(())
+def collect_caches_and_pools():
+    passwords = get_password_pool().snapshot()
+    tokens = get_token_cache().snapshot()
+    analytics = get_analytics_cache().snapshot()
+    events = get_broker().snapshot()
+    return {
+        "password_pool_pending": (
+            "gauge",
+            "bcrypt jobs running or queued",
+            {(): passwords["pending"]},
+        ),
+        "password_pool_capacity": (
+            "gauge",
+            "bcrypt jobs accepted before rejecting with 503",
+            {(): passwords["capacity"]},
+        ),
+        "password_pool_completed_total": (
+            "counter",
+            "bcrypt jobs completed",
+            {(): passwords["completed"]},
+        ),
+        "password_pool_rejected_total": (
+            "counter",
+            "bcrypt jobs rejected with 503",
+            {(): passwords["rejected"]},
+        ),
+        "token_cache_entries": ("gauge", "Cached JWTs", {(): tokens["size"]}),
+        "token_cache_hits_total": ("counter", "Token cache hits", {(): tokens["hits"]}),
+        "token_cache_misses_total": (
+            "counter",
+            "Token cache misses",
+            {(): tokens["misses"]},
+        ),
+        "analytics_cache_users": (
+            "gauge",
+            "Users with cached analytics",
+            {(): analytics["users"]},
+        ),
+        "analytics_cache_entries": (
+            "gauge",
+            "Cached analytics results",
+            {(): analytics["entries"]},
+        ),
+        "analytics_cache_hits_total": (
+            "counter",
+            "Analytics cache hits",
+            {(): analytics["hits"]},
+        ),
+        "analytics_cache_misses_total": (
+            "counter",
+            "Analytics cache misses",
+            {(): analytics["misses"]},
+        ),
+        "fx_rate_cache_hits_total": (
+            "counter",
+            "Requests served the cached exchange rates",
+            {(): rate_cache.hits},
+        ),
+        "fx_rate_cache_misses_total": (
+            "counter",
+            "Exchange rate table reloads",
+            {(): rate_cache.misses},
+        ),
+        "event_streams": ("gauge", "Open event streams", {(): events["subscribers"]}),
+        "events_published_total": (
+            "counter",
+            "Committed changes published to the event streams",
+            {(): events["published"]},
+        ),
+        "events_delivered_total": (
+            "counter",
+            "Events queued on event streams",
+            {(): events["delivered"]},
+        ),
+        "event_resyncs_total": (
+            "counter",
+            "Event streams told to resync after falling behind",
+            {(): events["resyncs"]},
+        ),
+    }
+
+
+"""═══ SCRAPE ═══"""
+
+
+@router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    dependencies=[Depends(check_metrics_token)],
+    include_in_schema=False,
+)
+async def get_metrics():
+    """Prometheus text format: request, query, pool and cache metrics"""
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_MEDIA_TYPE)
@@ -1,21 +1,34 @@
-from sqlalchemy import Column, String, Float, ForeignKey
+from sqlalchemy import BigInteger, Column, DateTime, Index, String, ForeignKey
 from sqlalchemy.orm import relationship
+from core.money import from_minor
 from database.core import Base
 
 
 class Orders(Base):
     __tablename__ = "orders"
+    # Every listing filters on the account or the creator and sorts by date
+    __table_args__ = (
+        Index("ix_orders_account_id_created_at", "account_id", "created_at"),
+        Index("ix_orders_created_by_created_at", "created_by", "created_at"),
+    )
 
     id = Column(String, primary_key=True, index=True)
     created_by = Column(String, ForeignKey("users.id"))
     account_id = Column(
         String, ForeignKey("accounts.id")
     )  # Nouvelle relation vers Account
-    created_at = Column(String)
-    updated_at = Column(String)
+    created_at = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime)
     description = Column(String)
     order_type = Column(String)
-    amount = Column(Float)
+    # Free-form spending category, what budgets can be scoped to
+    category = Column(String)
+    # Amount in minor units, see core.money
+    amount_minor = Column(BigInteger, nullable=False, default=0)
 
     # Relation vers le compte
     account = relationship("Accounts", back_populates="orders")
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor)
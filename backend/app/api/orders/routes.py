@@ -1,56 +1,214 @@
-import uuid
-
 from datetime import datetime
-from typing import Annotated
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-
-from api.orders.schemas import OrderBase
-from api.orders.models import Orders
+from typing import Annotated, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.orders.schemas import (
+    AccountOrdersPage,
+    ImportReportResponse,
+    OrderBase,
+    OrderPage,
+    OrderResponse,
+    OrderSearchPage,
+)
 from api.accounts.models import Accounts
-from database.core import get_db
-from core.security import get_current_user, get_superuser_dependency, is_superuser
+from api.orders.models import Orders
+from core.config import settings
+from core.pagination import page_dependency, paginate, stream_ndjson
+from database.core import get_async_db, get_read_db
+from services import orders as orders_service
+from services import search as search_service
+from services.order_export import (
+    ENCODERS,
+    MEDIA_TYPES,
+    export_statement,
+    iter_batches,
+    require_pyarrow,
+)
+from services.search import search_terms
+from services.versions import account_etag, user_etag
+from services.order_import import (
+    import_orders,
+    iter_csv_records,
+    iter_lines,
+    iter_ndjson_records,
+)
+from core.security import (
+    check_resource_access,
+    get_current_user,
+    get_superuser_dependency,
+    is_superuser,
+)
 
 router = APIRouter(prefix="/order", tags=["order"])
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# GET endpoints read from the replica, when there is one
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 superuser_dependency = Annotated[dict, Depends(get_superuser_dependency)]
 
+# Keyset order of every order listing
+order_keys = [Orders.created_at, Orders.id]
+
+
+def serialize_order(order: Orders) -> str:
+    return OrderResponse.model_validate(order).model_dump_json()
+
+
 """═══ MY ORDERS ═══"""
 
 
-@router.get("/")
-async def get_my_orders(db: db_dependency, user: user_dependency):
-    """Get all orders of current user"""
-    return db.query(Orders).filter(Orders.created_by == user["id"]).all()
+@router.get("/", response_model=OrderPage, dependencies=[Depends(user_etag)])
+async def get_my_orders(
+    db: read_db_dependency, user: user_dependency, page: page_dependency
+):
+    """Get orders of current user, one page at a time"""
+    stmt = select(Orders).where(Orders.created_by == user["id"])
+    if page.format == "ndjson":
+        return stream_ndjson(stmt, order_keys, serialize_order)
+
+    orders, next_cursor = await paginate(db, stmt, order_keys, page)
+    return {
+        "orders": orders,
+        "next_cursor": next_cursor,
+    }
 
 
-@router.post("/")
+@router.post("/", response_model=dict[str, str])
 async def create_order(db: db_dependency, user: user_dependency, order: OrderBase):
     """Create a new order"""
-    db_order = Orders(
-        id=uuid.uuid4(),
-        created_by=user["id"],
-        created_at=datetime.now(),
-        updated_at="",
-        account_id=order.account_id,
-        description=order.description,
-        order_type=order.order_type,
-        amount=order.amount,
-    )
-    db_account = db.query(Accounts).filter(Accounts.id == db_order.account_id).first()
-    db_account.money += db_order.amount
-    db.add(db_account)
-    db.add(db_order)
-    db.commit()
+    await orders_service.create_order(db, user, order)
+    await db.commit()
     return {"data": "Order created successfully"}
 
 
-@router.get("/{order_id}")
-async def get_order_by_id(db: db_dependency, user: user_dependency, order_id: str):
+"""═══ IMPORT / EXPORT ═══"""
+
+
+@router.post("/import", response_model=ImportReportResponse)
+async def import_my_orders(
+    request: Request,
+    db: db_dependency,
+    user: user_dependency,
+    format: Literal["csv", "ndjson"] = Query(default="csv"),
+    batch_size: int = Query(
+        default=settings.IMPORT_BATCH_SIZE, ge=1, le=settings.IMPORT_BATCH_SIZE_MAX
+    ),
+):
+    """Bulk import orders from a CSV (with header) or NDJSON request body
+
+    Columns / keys: account_id, description, order_type, amount and an
+    optional category and created_at. Invalid rows are skipped and reported.
+
+    Every `batch_size` rows are committed as they arrive, so the import is
+    not all or nothing: if it fails or the upload is cut off, the batches
+    committed before stay (each one sends an orders.imported event) and
+    re-sending the whole file would book them twice.
+    """
+    lines = iter_lines(request.stream())
+    records = iter_csv_records(lines) if format == "csv" else iter_ndjson_records(lines)
+    return await import_orders(db, user, records, batch_size)
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_orders(
+    user: user_dependency,
+    format: Literal["csv", "ndjson", "parquet"] = Query(default="csv"),
+    account_id: Optional[str] = None,
+    start: Optional[datetime] = Query(default=None, description="created_at >="),
+    end: Optional[datetime] = Query(default=None, description="created_at <"),
+):
+    """Stream the current user's orders (every order for the superuser)"""
+    filters = []
+    if not is_superuser(user):
+        filters.append(Orders.created_by == user["id"])
+    if account_id is not None:
+        filters.append(Orders.account_id == account_id)
+    if start is not None:
+        filters.append(Orders.created_at >= start)
+    if end is not None:
+        filters.append(Orders.created_at < end)
+    if format == "parquet":
+        require_pyarrow()
+
+    batches = iter_batches(export_statement(filters))
+    return StreamingResponse(
+        ENCODERS[format](batches),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'},
+    )
+
+
+"""═══ SEARCH ═══"""
+
+
+@router.get("/search", response_model=OrderSearchPage)
+async def search_orders(
+    db: read_db_dependency,
+    user: user_dependency,
+    q: str = Query(min_length=1, max_length=200, description="words to look for"),
+    account_id: Optional[str] = Query(default=None),
+    cursor: Optional[str] = Query(
+        default=None, description="next_cursor of the previous page"
+    ),
+    limit: int = Query(
+        default=settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX
+    ),
+):
+    """Orders whose description contains every word (as a prefix), best first
+
+    Covers the orders of every account the user can access, or of one.
+    """
+    if not search_terms(q):
+        raise HTTPException(status_code=400, detail="The query has no words")
+
+    owner_id = None if is_superuser(user) else user["id"]
+    if account_id is not None:
+        account = await db.get(Accounts, account_id)
+        if not account:
+            raise HTTPException(status_code=404, detail="Account not found")
+        check_resource_access(user, account.owner_id, "account")
+        owner_id = None
+
+    hits, next_cursor = await search_service.search_orders(
+        db, q, owner_id, account_id, cursor, limit
+    )
+    return {
+        "orders": [
+            {**OrderResponse.model_validate(order).model_dump(), "rank": rank}
+            for order, rank in hits
+        ],
+        "next_cursor": next_cursor,
+    }
+
+
+"""═══ ADMIN ONLY ═══"""
+
+
+# Declared before /{order_id} so that "all" is not taken for an order id
+@router.get("/all", response_model=OrderPage)
+async def get_all_orders(
+    db: read_db_dependency, superuser: superuser_dependency, page: page_dependency
+):
+    """Get all orders in the system (admin only), one page at a time"""
+    stmt = select(Orders)
+    if page.format == "ndjson":
+        return stream_ndjson(stmt, order_keys, serialize_order)
+
+    orders, next_cursor = await paginate(db, stmt, order_keys, page)
+    return {
+        "orders": orders,
+        "next_cursor": next_cursor,
+    }
+
+
+@router.get("/{order_id}", response_model=OrderResponse)
+async def get_order_by_id(db: read_db_dependency, user: user_dependency, order_id: str):
     """Get order by ID"""
-    db_order = db.query(Orders).filter(Orders.id == order_id).first()
+    db_order = await db.get(Orders, order_id)
     if not db_order:
         raise HTTPException(status_code=404, detail="Order does not exist")
     if not is_superuser(user) and user["id"] != db_order.created_by:
@@ -62,69 +220,55 @@ async def get_order_by_id(db: db_dependency, user: user_dependency, order_id: st
 """═══ ORDER MANAGEMENT ═══"""
 
 
-@router.put("/{order_id}")
+@router.put("/{order_id}", response_model=OrderResponse)
 async def update_order(
     db: db_dependency, user: user_dependency, order_id: str, new_order: OrderBase
 ):
     """Update order information"""
-    db_order = db.query(Orders).filter(Orders.id == order_id).first()
-    if not db_order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    if not is_superuser(user) and user["id"] != db_order.created_by:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    db_order.updated_at = datetime.now()
-    db_order.description = new_order.description
-    db_order.order_type = new_order.order_type
-    db_order.amount = new_order.amount
-    db_order.account_id = new_order.account_id
-
-    db.commit()
-    db.refresh(db_order)
+    db_order = await orders_service.update_order(db, user, order_id, new_order)
+    await db.commit()
 
     return db_order
 
 
-@router.delete("/{order_id}")
+@router.delete("/{order_id}", response_model=dict[str, str])
 async def delete_order(db: db_dependency, user: user_dependency, order_id: str):
     """Delete order"""
-    db_order = db.query(Orders).filter(Orders.id == order_id).first()
-    if not db_order:
-        raise HTTPException(status_code=404, detail="Order does not exist")
-    if not is_superuser(user) and user["id"] != db_order.created_by:
-        raise HTTPException(status_code=401, detail="Unauthorized")
-
-    db.delete(db_order)
-    db.commit()
+    await orders_service.delete_order(db, user, order_id)
+    await db.commit()
     return {"data": "Order deleted successfully"}
 
 
 """═══ ACCOUNT RELATED ═══"""
 
 
-@router.get("/account/{account_id}")
+@router.get(
+    "/account/{account_id}",
+    response_model=AccountOrdersPage,
+    dependencies=[Depends(account_etag)],
+)
 async def get_orders_by_account(
-    db: db_dependency, user: user_dependency, account_id: str
+    db: read_db_dependency,
+    user: user_dependency,
+    account_id: str,
+    page: page_dependency,
 ):
-    """Get all orders for a specific account"""
+    """Get orders for a specific account, one page at a time"""
     # Verify account access first
-    from api.accounts.models import Accounts
-    from core.security import check_resource_access
-
-    account = db.query(Accounts).filter(Accounts.id == account_id).first()
+    account = await db.get(Accounts, account_id)
     if not account:
         raise HTTPException(status_code=404, detail="Account not found")
 
     check_resource_access(user, account.owner_id, "account")
 
-    orders = db.query(Orders).filter(Orders.account_id == account_id).all()
-    return {"account_id": account_id, "orders": orders, "count": len(orders)}
-
-
-"""═══ ADMIN ONLY ═══"""
-
-
-@router.get("/all")
-async def get_all_orders(db: db_dependency, superuser: superuser_dependency):
-    """Get all orders in the system (admin only)"""
-    return db.query(Orders).all()
+    stmt = select(Orders).where(Orders.account_id == account_id)
+    if page.format == "ndjson":
+        return stream_ndjson(stmt, order_keys, serialize_order)
+
+    orders, next_cursor = await paginate(db, stmt, order_keys, page)
+    return {
+        "account_id": account_id,
+        "orders": orders,
+        "count": len(orders),
+        "next_cursor": next_cursor,
+    }
@@ -1,5 +1,6 @@
+from datetime import datetime
 from enum import Enum
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -11,5 +12,67 @@ class OrderType(Enum):
 class OrderBase(BaseModel):
     account_id: str = Field(description="ID of the account this order belongs to")
     description: Optional[str] = Field(default="", max_length=100)
-    order_type: str
+    order_type: OrderType
     amount: float = Field(default=0)
+    category: Optional[str] = Field(default=None, max_length=50)
+
+
+class OrderImportRow(OrderBase):
+    """One row of a bulk import, which may carry its original date"""
+
+    created_at: Optional[datetime] = None
+
+
+class OrderResponse(BaseModel):
+    """Schema for orders in responses"""
+
+    id: str
+    account_id: Optional[str] = None
+    created_by: Optional[str] = None
+    description: Optional[str]
+    order_type: str
+    category: Optional[str] = None
+    amount: float
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+
+class OrderPage(BaseModel):
+    """One keyset page of orders"""
+
+    orders: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+
+class OrderSearchHit(OrderResponse):
+    """An order matching a search, lower ranks are better matches"""
+
+    rank: float
+
+
+class OrderSearchPage(BaseModel):
+    """One keyset page of search results, best matches first"""
+
+    orders: List[OrderSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class AccountOrdersPage(OrderPage):
+    """One keyset page of the orders of an account"""
+
+    account_id: str
+    count: int
+
+
+class ImportReportResponse(BaseModel):
+    rows: int
+    inserted: int
+    batches: int
+    failed: int
+    errors: List[dict]
+    errors_truncated: bool
+    elapsed_seconds: float
+    rows_per_second: Optional[int]
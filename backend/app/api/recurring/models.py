@@ -0,0 +1,36 @@
+from sqlalchemy import BigInteger, Column, Date, DateTime, Integer, String, ForeignKey
+from core.money import from_minor
+from database.core import Base
+
+
+class RecurringOrders(Base):
+    """An order booked every `every` `frequency` from `start_date` on
+
+    Occurrence n falls on start_date + n * every days / weeks / months /
+    years, monthly and yearly ones on the last day of shorter months.
+    `next_index` and `next_run` are the first occurrence not booked yet
+    (next_run is NULL once end_date is passed); the scheduler moves them in
+    the transaction that books the orders (see services.recurring).
+    """
+
+    __tablename__ = "recurring_orders"
+
+    id = Column(String, primary_key=True)
+    created_by = Column(String, ForeignKey("users.id"), index=True)
+    account_id = Column(String, ForeignKey("accounts.id"), index=True)
+    description = Column(String)
+    order_type = Column(String)
+    # Amount in minor units, see core.money
+    amount_minor = Column(BigInteger, nullable=False, default=0)
+    frequency = Column(String, nullable=False)
+    every = Column(Integer, nullable=False, default=1)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date)
+    next_index = Column(Integer, nullable=False, default=0)
+    # The scheduler looks up due definitions by this column
+    next_run = Column(Date, index=True)
+    created_at = Column(DateTime, nullable=False)
+
+    @property
+    def amount(self) -> float:
+        return from_minor(self.amount_minor)
@@ -0,0 +1,106 @@
+import time
+from typing import Annotated
+from fastapi import APIRouter, Depends
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.recurring.models import RecurringOrders
+from api.recurring.schemas import (
+    RecurringOrderBase,
+    RecurringOrderList,
+    RecurringOrderResponse,
+    RecurringOrderUpdate,
+    SchedulerRunResponse,
+)
+from core.security import get_current_user, get_superuser_dependency
+from database.core import get_async_db, get_read_db
+from services import recurring as recurring_service
+
+router = APIRouter(prefix="/recurring", tags=["recurring"])
+
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# GET endpoints read from the replica, when there is one
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
+user_dependency = Annotated[dict, Depends(get_current_user)]
+superuser_dependency = Annotated[dict, Depends(get_superuser_dependency)]
+
+
+"""═══ MY RECURRING ORDERS ═══"""
+
+
+@router.get("/", response_model=RecurringOrderList)
+async def get_my_recurring_orders(db: read_db_dependency, user: user_dependency):
+    """Recurring order definitions of the current user"""
+    definitions = (
+        await db.scalars(
+            select(RecurringOrders)
+            .where(RecurringOrders.created_by == user["id"])
+            .order_by(RecurringOrders.created_at, RecurringOrders.id)
+        )
+    ).all()
+    return {"recurring_orders": definitions, "count": len(definitions)}
+
+
+@router.post("/", response_model=RecurringOrderResponse)
+async def create_recurring_order(
+    db: db_dependency, user: user_dependency, definition: RecurringOrderBase
+):
+    """Define an order booked on a schedule (salary, rent, subscriptions)
+
+    Occurrences are booked by the scheduler, past ones included, within
+    SCHEDULER_INTERVAL_SECONDS.
+    """
+    db_definition = await recurring_service.create_definition(db, user, definition)
+    await db.commit()
+    return db_definition
+
+
+"""═══ ADMIN ONLY ═══"""
+
+
+# Declared before /{definition_id} so that "run" is not taken for an id
+@router.post("/run", response_model=SchedulerRunResponse)
+async def run_scheduler_now(superuser: superuser_dependency):
+    """Book every due occurrence now instead of at the next tick"""
+    started = time.perf_counter()
+    booked = await recurring_service.run_due()
+    return {
+        "booked": booked,
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+"""═══ DEFINITION MANAGEMENT ═══"""
+
+
+@router.get("/{definition_id}", response_model=RecurringOrderResponse)
+async def get_recurring_order(
+    db: read_db_dependency, user: user_dependency, definition_id: str
+):
+    return await recurring_service.get_definition(db, user, definition_id)
+
+
+@router.put("/{definition_id}", response_model=RecurringOrderResponse)
+async def update_recurring_order(
+    db: db_dependency,
+    user: user_dependency,
+    definition_id: str,
+    definition: RecurringOrderUpdate,
+):
+    """Change the account, amount, description, type or end of a definition"""
+    db_definition = await recurring_service.update_definition(
+        db, user, definition_id, definition
+    )
+    await db.commit()
+    return db_definition
+
+
+@router.delete("/{definition_id}", response_model=dict[str, str])
+async def delete_recurring_order(
+    db: db_dependency, user: user_dependency, definition_id: str
+):
+    """Stop the schedule; orders already booked are kept"""
+    db_definition = await recurring_service.get_definition(db, user, definition_id)
+    await db.delete(db_definition)
+    await db.commit()
+    return {"data": "Recurring order deleted successfully"}
@@ -0,0 +1,56 @@
+from datetime import date
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
+
+from api.orders.schemas import OrderType
+
+Frequency = Literal["daily", "weekly", "monthly", "yearly"]
+
+
+class RecurringOrderUpdate(BaseModel):
+    """What can change on a definition; its schedule cannot"""
+
+    account_id: str = Field(description="ID of the account the orders are booked on")
+    description: Optional[str] = Field(default="", max_length=100)
+    order_type: OrderType
+    amount: float = Field(default=0)
+    end_date: Optional[date] = Field(
+        default=None, description="last day an occurrence may fall on"
+    )
+
+
+class RecurringOrderBase(RecurringOrderUpdate):
+    frequency: Frequency
+    every: int = Field(default=1, ge=1, le=366, description="e.g. 2 weeks")
+    start_date: date = Field(
+        default_factory=date.today,
+        description="first occurrence; past dates are booked right away",
+    )
+
+
+class RecurringOrderResponse(BaseModel):
+    id: str
+    created_by: Optional[str] = None
+    account_id: Optional[str] = None
+    description: Optional[str]
+    order_type: str
+    amount: float
+    frequency: str
+    every: int
+    start_date: date
+    end_date: Optional[date] = None
+    next_run: Optional[date] = None
+    booked: int = Field(validation_alias="next_index")
+
+    class Config:
+        from_attributes = True
+
+
+class RecurringOrderList(BaseModel):
+    recurring_orders: List[RecurringOrderResponse]
+    count: int
+
+
+class SchedulerRunResponse(BaseModel):
+    booked: int
+    elapsed_seconds: float
@@ -3,9 +3,21 @@ from fastapi import APIRouter
 from api.users.routes import router as user_router
 from api.accounts.routes import router as account_router
 from api.orders.routes import router as order_router
+from api.analytics.routes import router as analytics_router
+from api.fx.routes import router as fx_router
+from api.batch.routes import router as batch_router
+from api.events.routes import router as events_router
+from api.recurring.routes import router as recurring_router
+from api.budgets.routes import router as budget_router
 
 api_router = APIRouter(prefix="/api")
 
 api_router.include_router(router=user_router)
 api_router.include_router(router=account_router)
 api_router.include_router(router=order_router)
+api_router.include_router(router=analytics_router)
+api_router.include_router(router=fx_router)
+api_router.include_router(router=batch_router)
+api_router.include_router(router=events_router)
+api_router.include_router(router=recurring_router)
+api_router.include_router(router=budget_router)
@@ -1,36 +1,51 @@
 import uuid
-from typing import Annotated
-from sqlalchemy.orm import Session
+from typing import Annotated, Any
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 
 from core.security import (
-    hash_password,
+    hash_password_async,
+    get_password_pool,
+    get_token_cache,
     authenticate_superuser_or_user,
     create_access_token,
     get_current_user,
     get_superuser_dependency,
 )
-from database.core import get_db
-from api.users.schemas import UserBase
+from core.pagination import page_dependency, paginate, stream_ndjson
+from database.core import get_async_db, get_read_db, pool_status
+from services.accounts import delete_user_data
+from services.analytics import get_analytics_cache
+from services.events import get_broker
+from api.users.schemas import TokenResponse, UserBase, UserPage, UserResponse
 from api.users.models import Users
 
 router = APIRouter(prefix="/user", tags=["user"])
 
-db_dependency = Annotated[Session, Depends(get_db)]
+db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
+# GET endpoints read from the replica, when there is one
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 
 user_dependency = Annotated[dict, Depends(get_current_user)]
 superuser_dependency = Annotated[dict, Depends(get_superuser_dependency)]
 
 
+def serialize_user(user: Users) -> str:
+    return UserResponse.model_validate(user).model_dump_json()
+
+
 """═══ AUTHENTICATION ═══"""
 
 
-@router.post("/token")
+@router.post("/token", response_model=TokenResponse)
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency
 ):
-    user = authenticate_superuser_or_user(form_data.username, form_data.password, db)
+    user = await authenticate_superuser_or_user(
+        form_data.username, form_data.password, db
+    )
     if not user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
@@ -39,25 +54,25 @@ async def login_for_access_token(
     return {"access_token": token, "token_type": "bearer"}
 
 
-@router.post("/register")
+@router.post("/register", response_model=dict[str, str])
 async def register(db: db_dependency, user_request: UserBase):
     """Register a new user account"""
     user_model = Users(
-        id=uuid.uuid4(),
+        id=str(uuid.uuid4()),
         username=user_request.username,
-        hashed_password=hash_password(user_request.password),
+        hashed_password=await hash_password_async(user_request.password),
     )
 
     db.add(user_model)
-    db.commit()
+    await db.commit()
     return {"Data": "User created successfully"}
 
 
 """═══ USER PROFILE ═══"""
 
 
-@router.get("/profile")
-async def get_profile(user: user_dependency, db: db_dependency):
+@router.get("/profile", response_model=dict[str, dict])
+async def get_profile(user: user_dependency, db: read_db_dependency):
     """Get current user profile"""
     if user is None:
         raise HTTPException(status_code=401, detail="Authentication Failed")
@@ -67,30 +82,46 @@ async def get_profile(user: user_dependency, db: db_dependency):
 """═══ ADMIN ONLY ═══"""
 
 
-@router.get("/all")
-async def get_all_users(superuser: superuser_dependency, db: db_dependency):
-    """Get all users - requires superuser permissions"""
+@router.get("/all", response_model=UserPage)
+async def get_all_users(
+    superuser: superuser_dependency, db: read_db_dependency, page: page_dependency
+):
+    """Get all users, one page at a time - requires superuser permissions"""
+    stmt = select(Users)
+    if page.format == "ndjson":
+        return stream_ndjson(stmt, [Users.id], serialize_user)
+
     try:
-        users = db.query(Users).all()
-        return {"users": users, "count": len(users)}
+        users, next_cursor = await paginate(db, stmt, [Users.id], page)
+        return {"users": users, "count": len(users), "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except Exception:
         raise HTTPException(status_code=500, detail="Error retrieving users")
 
 
-@router.delete("/{user_id}")
+@router.delete("/{user_id}", response_model=dict[str, str])
 async def delete_user(user_id: str, superuser: superuser_dependency, db: db_dependency):
     """Delete a user by ID - requires superuser permissions"""
-    user = db.query(Users).filter(Users.id == user_id).first()
+    user = await db.get(Users, user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    db.delete(user)
-    db.commit()
+    await delete_user_data(db, user_id)
+    await db.commit()
     return {"message": f"User {user.username} deleted successfully"}
 
 
-@router.get("/admin/stats")
-async def get_admin_stats(superuser: superuser_dependency, db: db_dependency):
+@router.get("/admin/stats", response_model=dict[str, Any])
+async def get_admin_stats(superuser: superuser_dependency, db: read_db_dependency):
     """Get admin statistics - requires superuser permissions"""
-    total_users = db.query(Users).count()
-    return {"total_users": total_users, "superuser": superuser.get("username")}
+    total_users = await db.scalar(select(func.count()).select_from(Users))
+    return {
+        "total_users": total_users,
+        "superuser": superuser.get("username"),
+        "password_pool": get_password_pool().snapshot(),
+        "token_cache": get_token_cache().snapshot(),
+        "analytics_cache": get_analytics_cache().snapshot(),
+        "event_streams": get_broker().snapshot(),
+        "db_pool": pool_status(),
+    }
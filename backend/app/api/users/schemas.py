@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from pydantic import BaseModel, Field
 
 
@@ -9,3 +11,26 @@ class UserBase(BaseModel):
 class LoginRequest(BaseModel):
     username: str
     password: str
+
+
+class UserResponse(BaseModel):
+    """Schema for users in responses (never exposes the password hash)"""
+
+    id: str
+    username: str
+
+    class Config:
+        from_attributes = True
+
+
+class UserPage(BaseModel):
+    """One keyset page of users"""
+
+    users: List[UserResponse]
+    count: int
+    next_cursor: Optional[str] = None
+
+
+class TokenResponse(BaseModel):
+    access_token: str
+    token_type: str
@@ -0,0 +1,152 @@
+"""Concurrency stress check for the order balance maintenance
+
+Many clients create, update (including moves between accounts) and delete
+orders on the same two accounts in parallel, then every account balance is
+checked against its initial value plus the sum of its remaining orders.
+A lost update shows up as drift.
+
+    python -m benchmarks.balance_stress --writers 32 --ops 25
+
+Runs against a throwaway SQLite file unless --db-url is given. The test
+suite runs a small version of it (tests/test_order_balances.py); this one
+is for large runs and other databases.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+from collections import Counter
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--ops", type=int, default=25, help="operations per writer")
+    parser.add_argument("--db-url", default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+async def writer(client, headers, account_ids, order_ids, ops, rng):
+    statuses = Counter()
+    for _ in range(ops):
+        action = rng.random()
+        amount = rng.randint(-5000, 5000) / 100
+        body = {
+            "account_id": rng.choice(account_ids),
+            "description": "stress",
+            "order_type": "Add",
+            "amount": amount,
+        }
+        if action < 0.6 or not order_ids:
+            r = await client.post("/api/order/", json=body, headers=headers)
+            if r.status_code == 200:
+                # Writers share the order ids so they also race on updates
+                # and deletes of the same orders
+                page = await client.get(
+                    "/api/order/", params={"limit": 500}, headers=headers
+                )
+                order_ids[:] = [o["id"] for o in page.json()["orders"]]
+        elif action < 0.85:
+            r = await client.put(
+                f"/api/order/{rng.choice(order_ids)}", json=body, headers=headers
+            )
+        else:
+            r = await client.delete(
+                f"/api/order/{rng.choice(order_ids)}", headers=headers
+            )
+        statuses[r.status_code] += 1
+    return statuses
+
+
+async def run(args):
+    from main import app
+
+    # ASGITransport sends no lifespan events, run the app's startup here
+    async with app.router.lifespan_context(app):
+        return await stress(args, app)
+
+
+async def stress(args, app):
+    import httpx
+    from sqlalchemy import func, select
+
+    from api.accounts.models import Accounts
+    from api.orders.models import Orders
+    from database.core import async_session
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        user = {"username": "stressuser", "password": "stresspassword"}
+        await c.post("/api/user/register", json=user)
+        token = (await c.post("/api/user/token", data=user)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+        for name in ("Stress A", "Stress B"):
+            await c.post(
+                "/api/account/", json={"name": name, "money": 100}, headers=headers
+            )
+        accounts = (await c.get("/api/account/", headers=headers)).json()
+        account_ids = [a["id"] for a in accounts]
+
+        rng = random.Random(args.seed)
+        order_ids = []
+        results = await asyncio.gather(
+            *(
+                writer(
+                    c,
+                    headers,
+                    account_ids,
+                    order_ids,
+                    args.ops,
+                    random.Random(rng.random()),
+                )
+                for _ in range(args.writers)
+            )
+        )
+
+    async with async_session() as db:
+        sums = dict(
+            (
+                await db.execute(
+                    select(Orders.account_id, func.sum(Orders.amount_minor))
+                    .where(Orders.account_id.in_(account_ids))
+                    .group_by(Orders.account_id)
+                )
+            ).all()
+        )
+        balances = dict(
+            (
+                await db.execute(
+                    select(Accounts.id, Accounts.money_minor).where(
+                        Accounts.id.in_(account_ids)
+                    )
+                )
+            ).all()
+        )
+
+    drift = {
+        account_id: balances[account_id] - 100_00 - (sums.get(account_id) or 0)
+        for account_id in account_ids
+    }
+    statuses = sum(results, Counter())
+    print(f"writers={args.writers} ops/writer={args.ops} statuses={dict(statuses)}")
+    for account_id, value in drift.items():
+        print(f"  account {account_id}: drift {value} minor units")
+    return 0 if not any(drift.values()) else 1
+
+
+def main():
+    args = parse_args()
+    if args.db_url is None:
+        path = os.path.join(tempfile.mkdtemp(), "stress.db")
+        args.db_url = f"sqlite:///{path}"
+    os.environ["DB_URL"] = args.db_url
+    os.environ.pop("ASYNC_DB_URL", None)
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == "__main__":
+    main()
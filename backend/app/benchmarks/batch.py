@@ -0,0 +1,248 @@
+"""Batched versus sequential writes: POST /batch against one request per edit
+
+Every client replays the same kind of offline edits (creates, updates and
+deletes of its orders, --ops per mode) three ways: one request per edit on
+the single-item endpoints, atomic batches of --batch-size and per-item
+(savepoint) batches of --batch-size. Reported per mode are edits/s,
+request latency percentiles and database queries per edit.
+
+    python -m benchmarks.batch --db-url sqlite:////tmp/bench.db --batch-size 50
+
+Seeds an empty database like benchmarks.endpoints. Updates and deletes
+work on the clients' seeded orders, so repeated runs slowly use them up.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.endpoints import (
+    dataset_counts,
+    git_revision,
+    log,
+    prepare_workers,
+    summarize,
+)
+from benchmarks.seed import SCALES, dataset_size, seed
+
+MODES = ("sequential", "batch_atomic", "batch_per_item")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None, help="defaults to DB_URL")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ops", type=int, default=100, help="edits per client")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--output", default=None, help="JSON file, else stdout")
+    return parser.parse_args(argv)
+
+
+def plan_edits(worker, order_ids: list, count: int, rng: random.Random) -> list:
+    """`count` batch operations: half creates, the rest updates and deletes
+
+    Deleted ids are taken out of `order_ids`, so no mode touches an order
+    an earlier one deleted.
+    """
+    edits = []
+    for index in range(count):
+        data = {
+            "account_id": worker.account_id,
+            "description": f"offline edit {index}",
+            "order_type": "Expense",
+            "amount": -rng.randint(1, 10_000) / 100,
+        }
+        kind = rng.random()
+        if kind < 0.5 or len(order_ids) < 2:
+            edits.append(
+                {
+                    "op": "create",
+                    "resource": "order",
+                    "id": str(uuid.uuid4()),
+                    "data": data,
+                }
+            )
+        elif kind < 0.8:
+            edits.append(
+                {
+                    "op": "update",
+                    "resource": "order",
+                    "id": rng.choice(order_ids),
+                    "data": data,
+                }
+            )
+        else:
+            order_id = order_ids.pop(rng.randrange(len(order_ids)))
+            edits.append({"op": "delete", "resource": "order", "id": order_id})
+    return edits
+
+
+async def send_one(client, headers: dict, edit: dict):
+    """The single-item request an edit stands for"""
+    if edit["op"] == "create":
+        return await client.post("/api/order/", json=edit["data"], headers=headers)
+    if edit["op"] == "update":
+        return await client.put(
+            f"/api/order/{edit['id']}", json=edit["data"], headers=headers
+        )
+    return await client.delete(f"/api/order/{edit['id']}", headers=headers)
+
+
+async def run_mode(client, workers: list, plans: list, mode: str, batch_size: int):
+    from core.instrumentation import request_queries
+
+    latencies, statuses = [], Counter()
+
+    async def timed(request):
+        started = time.perf_counter()
+        response = await request
+        latencies.append(time.perf_counter() - started)
+        statuses[response.status_code] += 1
+        return response
+
+    async def drive(worker, edits: list):
+        if mode == "sequential":
+            for edit in edits:
+                await timed(send_one(client, worker.headers, edit))
+            return
+        for start in range(0, len(edits), batch_size):
+            response = await timed(
+                client.post(
+                    "/api/batch/",
+                    json={
+                        "operations": edits[start : start + batch_size],
+                        "atomic": mode == "batch_atomic",
+                    },
+                    headers=worker.headers,
+                )
+            )
+            for result in response.json().get("results", []):
+                statuses[f"op_{result['status']}"] += 1
+
+    queries_before, _ = request_queries.total()
+    started = time.perf_counter()
+    await asyncio.gather(*(drive(w, edits) for w, edits in zip(workers, plans)))
+    seconds = time.perf_counter() - started
+    queries_after, _ = request_queries.total()
+
+    edits = sum(len(plan) for plan in plans)
+    request_statuses = Counter(
+        {status: n for status, n in statuses.items() if isinstance(status, int)}
+    )
+    result = summarize(latencies, request_statuses, seconds, 0.0)
+    del result["queries_per_request"]
+    result["edits"] = edits
+    result["edits_per_second"] = round(edits / seconds, 2) if seconds else 0.0
+    result["queries_per_edit"] = round((queries_after - queries_before) / edits, 2)
+    result["operation_statuses"] = {
+        status.removeprefix("op_"): n
+        for status, n in sorted(statuses.items(), key=str)
+        if isinstance(status, str)
+    }
+    return result
+
+
+async def run(args) -> dict:
+    from main import app
+
+    # ASGITransport sends no lifespan events, run the app's startup here
+    async with app.router.lifespan_context(app):
+        return await benchmark(args, app)
+
+
+async def benchmark(args, app) -> dict:
+    import httpx
+
+    counts = await dataset_counts()
+    if not counts["users"]:
+        # In a thread: the scheduler's transactions need the event loop to end
+        await asyncio.to_thread(seed, dataset_size(args), args.seed, log)
+        counts = await dataset_counts()
+    if counts["users"] < args.concurrency:
+        raise SystemExit("Fewer seeded users than --concurrency")
+
+    rng = random.Random(args.seed)
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        workers = await prepare_workers(client, args.concurrency)
+        order_ids = []
+        for worker in workers:
+            page = await client.get(
+                "/api/order/", params={"limit": 500}, headers=worker.headers
+            )
+            order_ids.append([order["id"] for order in page.json()["orders"]])
+
+        results = {}
+        for mode in MODES:
+            plans = [
+                plan_edits(worker, ids, args.ops, rng)
+                for worker, ids in zip(workers, order_ids)
+            ]
+            results[mode] = await run_mode(
+                client, workers, plans, mode, args.batch_size
+            )
+            log(
+                f"{mode:16} {results[mode]['edits_per_second']:9.1f} edits/s  "
+                f"{results[mode]['rps']:8.1f} req/s  "
+                f"p50 {results[mode]['latency_ms']['p50']:8.2f} ms  "
+                f"queries/edit {results[mode]['queries_per_edit']:5.2f}  "
+                f"operations {results[mode]['operation_statuses'] or '-'}"
+            )
+
+    sequential = results["sequential"]["edits_per_second"]
+    from sqlalchemy.engine import make_url
+
+    from database.core import get_async_db_url
+
+    return {
+        "benchmark": "batch",
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(get_async_db_url()).drivername,
+            "dataset": counts,
+            "concurrency": args.concurrency,
+            "ops": args.ops,
+            "batch_size": args.batch_size,
+        },
+        "results": results,
+        "speedup_vs_sequential": {
+            mode: round(results[mode]["edits_per_second"] / sequential, 2)
+            for mode in MODES
+            if sequential
+        },
+    }
+
+
+def main():
+    args = parse_args()
+    if args.db_url:
+        os.environ["DB_URL"] = args.db_url
+        os.environ.pop("ASYNC_DB_URL", None)
+    report = asyncio.run(run(args))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
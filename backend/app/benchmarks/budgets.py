@@ -0,0 +1,255 @@
+"""Budget status from counters against summing the orders, and counter upkeep
+
+Gives --users seeded users three budgets each (owner-wide monthly,
+owner-wide "food" monthly, weekly on their busiest account) and reports:
+the backfill time per budget, the latency of reading every budget status
+of a user from the counters versus with a SUM over the period's orders,
+the cost the counters add to an order write (--writes creates, before and
+after the budgets exist) and the time of a full reconciliation, which must
+find no drift. The budgets and orders it creates are deleted afterwards.
+
+    python -m benchmarks.budgets --db-url sqlite:////tmp/bench.db --users 50
+
+Seeds an empty database like benchmarks.endpoints.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from benchmarks.endpoints import dataset_counts, git_revision, log, percentile
+from benchmarks.seed import SCALES, SEED_NOW, dataset_size, seed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None, help="defaults to DB_URL")
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--reads", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=200)
+    parser.add_argument("--output", default=None, help="JSON file, else stdout")
+    return parser.parse_args(argv)
+
+
+def latency_ms(samples: list) -> dict:
+    samples = sorted(samples)
+    return {
+        "mean": round(sum(samples) / len(samples) * 1000, 3),
+        "p50": round(percentile(samples, 50) * 1000, 3),
+        "p95": round(percentile(samples, 95) * 1000, 3),
+    }
+
+
+async def summed_statuses(db, budgets: list, day) -> list:
+    """What the status costs without counters: one SUM per budget"""
+    from sqlalchemy import func, select
+
+    from api.accounts.models import Accounts
+    from api.orders.models import Orders
+    from services.budget_spend import next_period_start, period_start
+
+    spent = []
+    for budget in budgets:
+        start = period_start(day, budget.period)
+        stmt = (
+            select(func.coalesce(-func.sum(Orders.amount_minor), 0))
+            .join(Accounts, Accounts.id == Orders.account_id)
+            .where(
+                Accounts.owner_id == budget.owner_id,
+                Orders.order_type == "Expense",
+                Orders.created_at >= start,
+                Orders.created_at < next_period_start(start, budget.period),
+            )
+        )
+        if budget.account_id is not None:
+            stmt = stmt.where(Orders.account_id == budget.account_id)
+        if budget.category is not None:
+            stmt = stmt.where(Orders.category == budget.category)
+        spent.append(await db.scalar(stmt))
+    return spent
+
+
+async def time_writes(users: list, count: int, rng: random.Random) -> list:
+    """Seconds per create_order transaction on the users' accounts"""
+    from api.orders.schemas import OrderBase
+    from database.core import async_session
+    from services.orders import create_order
+
+    samples, created = [], []
+    async with async_session() as db:
+        for _ in range(count):
+            user_id, account_id = rng.choice(users)
+            order = OrderBase(
+                account_id=account_id,
+                description="budget benchmark",
+                order_type="Expense",
+                category=rng.choice(("food", "housing", None)),
+                amount=-rng.randint(1, 10_000) / 100,
+            )
+            started = time.perf_counter()
+            db_order = await create_order(db, {"id": user_id}, order)
+            await db.commit()
+            samples.append(time.perf_counter() - started)
+            created.append(db_order.id)
+    return samples, created
+
+
+async def run(args) -> dict:
+    from main import app
+
+    async with app.router.lifespan_context(app):
+        return await benchmark(args)
+
+
+async def benchmark(args) -> dict:
+    from sqlalchemy import func, select
+
+    from api.accounts.models import Accounts
+    from api.budgets.models import Budgets
+    from api.budgets.schemas import BudgetBase
+    from api.orders.models import Orders
+    from core.money import to_minor
+    from database.core import async_session
+    from services import budgets as budget_service
+    from services.accounts import delete_budgets, delete_orders_chunked
+
+    counts = await dataset_counts()
+    if not counts["users"]:
+        # In a thread: the scheduler's transactions need the event loop to end
+        await asyncio.to_thread(seed, dataset_size(args), args.seed, log)
+        counts = await dataset_counts()
+
+    rng = random.Random(args.seed)
+    # The users' busiest accounts, most active users first
+    async with async_session() as db:
+        busiest = (
+            await db.execute(
+                select(Accounts.owner_id, Accounts.id, func.count(Orders.id))
+                .join(Orders, Orders.account_id == Accounts.id)
+                .group_by(Accounts.owner_id, Accounts.id)
+                .order_by(func.count(Orders.id).desc())
+            )
+        ).all()
+    users = {}
+    for owner_id, account_id, _ in busiest:
+        users.setdefault(owner_id, account_id)
+    users = list(users.items())[: args.users]
+
+    baseline, baseline_ids = await time_writes(users, args.writes, rng)
+    log(f"writes without budgets {latency_ms(baseline)['mean']:8.3f} ms")
+
+    backfills, budget_ids = [], []
+    async with async_session() as db:
+        for user_id, account_id in users:
+            for data in (
+                BudgetBase(name="everything", period="monthly", limit=2_000),
+                BudgetBase(name="food", category="food", period="monthly", limit=400),
+                BudgetBase(
+                    name="busiest", account_id=account_id, period="weekly", limit=300
+                ),
+            ):
+                started = time.perf_counter()
+                budget = await budget_service.create_budget(db, {"id": user_id}, data)
+                await db.commit()
+                backfills.append(time.perf_counter() - started)
+                budget_ids.append(budget.id)
+    log(f"backfill per budget    {latency_ms(backfills)['mean']:8.3f} ms")
+
+    with_budgets, budget_order_ids = await time_writes(users, args.writes, rng)
+    log(f"writes with budgets    {latency_ms(with_budgets)['mean']:8.3f} ms")
+
+    # The last day of the seeded history, so the periods have orders
+    day = (SEED_NOW - timedelta(days=1)).date()
+    counters, summed, mismatches = [], [], 0
+    async with async_session() as db:
+        for _ in range(args.reads):
+            user_id, _ = rng.choice(users)
+            started = time.perf_counter()
+            budgets = await budget_service.user_budgets(db, user_id)
+            statuses = await budget_service.budget_statuses(db, budgets, day)
+            counters.append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            budgets = await budget_service.user_budgets(db, user_id)
+            spent = await summed_statuses(db, budgets, day)
+            summed.append(time.perf_counter() - started)
+            mismatches += sum(
+                to_minor(status["spent"]) != minor
+                for status, minor in zip(statuses, spent)
+            )
+    log(
+        f"status from counters   {latency_ms(counters)['mean']:8.3f} ms  "
+        f"summed {latency_ms(summed)['mean']:8.3f} ms  mismatches {mismatches}"
+    )
+
+    async with async_session() as db:
+        report = await budget_service.reconcile(db, fix=False)
+    log(f"reconcile              {report['elapsed_seconds'] * 1000:8.1f} ms")
+
+    async with async_session() as db:
+        await delete_budgets(db, Budgets.id.in_(budget_ids))
+        await delete_orders_chunked(db, Orders.id.in_(baseline_ids + budget_order_ids))
+        await db.commit()
+
+    from sqlalchemy.engine import make_url
+
+    from database.core import get_async_db_url
+
+    return {
+        "benchmark": "budgets",
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(get_async_db_url()).drivername,
+            "dataset": counts,
+            "users": len(users),
+            "budgets": len(budget_ids),
+            "reads": args.reads,
+            "writes": args.writes,
+        },
+        "backfill_ms": latency_ms(backfills),
+        "write_ms": {
+            "without_budgets": latency_ms(baseline),
+            "with_budgets": latency_ms(with_budgets),
+        },
+        "status_ms": {
+            "counters": latency_ms(counters),
+            "summed_orders": latency_ms(summed),
+        },
+        "status_mismatches": mismatches,
+        "reconcile": {
+            "elapsed_ms": round(report["elapsed_seconds"] * 1000, 1),
+            "counters": report["counters"],
+            "drifted": report["drifted"],
+        },
+    }
+
+
+def main():
+    args = parse_args()
+    if args.db_url:
+        os.environ["DB_URL"] = args.db_url
+        os.environ.pop("ASYNC_DB_URL", None)
+    report = asyncio.run(run(args))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
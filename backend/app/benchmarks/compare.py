@@ -0,0 +1,101 @@
+"""Diff two benchmarks.endpoints result files
+
+Prints the change of throughput and latency percentiles per scenario and
+exits with status 1 when a scenario regressed by more than --threshold
+percent (lower req/s, or higher p50/p95), so it can gate CI.
+
+    python -m benchmarks.compare results/base.json results/head.json
+"""
+
+import argparse
+import json
+import sys
+
+# (metric path, label, True when higher is better)
+METRICS = (
+    (("rps",), "req/s", True),
+    (("latency_ms", "p50"), "p50 ms", False),
+    (("latency_ms", "p95"), "p95 ms", False),
+    (("latency_ms", "p99"), "p99 ms", False),
+    (("queries_per_request",), "queries", False),
+)
+# p99 and query counts are shown, not gated: too noisy / not a timing
+GATED = {"req/s", "p50 ms", "p95 ms"}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("head")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent")
+    parser.add_argument("--json", action="store_true", help="machine readable")
+    return parser.parse_args(argv)
+
+
+def lookup(result: dict, path: tuple) -> float:
+    for key in path:
+        result = result[key]
+    return result
+
+
+def change(base: float, head: float) -> float:
+    if not base:
+        return 0.0
+    return (head - base) / base * 100
+
+
+def compare(base: dict, head: dict, threshold: float) -> dict:
+    """Per scenario and metric: base, head, change % and regression flag"""
+    diff = {}
+    for name in base["results"]:
+        if name not in head["results"]:
+            continue
+        rows = {}
+        for path, label, higher_is_better in METRICS:
+            before = lookup(base["results"][name], path)
+            after = lookup(head["results"][name], path)
+            pct = change(before, after)
+            worse = -pct if higher_is_better else pct
+            rows[label] = {
+                "base": before,
+                "head": after,
+                "change_pct": round(pct, 2),
+                "regression": label in GATED and worse > threshold,
+            }
+        diff[name] = rows
+    return diff
+
+
+def print_table(base: dict, head: dict, diff: dict):
+    commits = [(run["meta"]["git"]["commit"] or "?")[:10] for run in (base, head)]
+    print(f"base {commits[0]}  head {commits[1]}")
+    if base["meta"]["dataset"] != head["meta"]["dataset"]:
+        print("warning: the runs used different datasets", file=sys.stderr)
+    for name, rows in diff.items():
+        print(f"\n{name}")
+        for label, row in rows.items():
+            flag = "  REGRESSION" if row["regression"] else ""
+            print(
+                f"  {label:8} {row['base']:12.2f} -> {row['head']:12.2f}"
+                f"  {row['change_pct']:+8.1f}%{flag}"
+            )
+
+
+def main():
+    args = parse_args()
+    with open(args.base) as base_file, open(args.head) as head_file:
+        base, head = json.load(base_file), json.load(head_file)
+    diff = compare(base, head, args.threshold)
+    if args.json:
+        json.dump(diff, sys.stdout, indent=2)
+        print()
+    else:
+        print_table(base, head, diff)
+    regressed = any(
+        row["regression"] for rows in diff.values() for row in rows.values()
+    )
+    sys.exit(1 if regressed else 0)
+
+
+if __name__ == "__main__":
+    main()
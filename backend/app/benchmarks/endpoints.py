@@ -0,0 +1,391 @@
+"""Throughput and latency of the API endpoints, driven in-process over ASGI
+
+Each scenario sends --requests requests from --concurrency clients (one
+seeded user each, see benchmarks.seed) after a short warmup, and reports
+requests/s, latency percentiles and database queries per request. An empty
+database is seeded first at --scale.
+
+    python -m benchmarks.endpoints --db-url sqlite:////tmp/bench.db \\
+        --scale medium --output results/$(git rev-parse --short HEAD).json
+
+Results are JSON, compare two runs with benchmarks.compare. order_create
+adds rows, so it runs last and repeated runs drift slightly; reseed for
+numbers meant to be compared across many commits.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from benchmarks.seed import SCALES, SEED_PASSWORD, dataset_size, seed, username
+
+PAGE_LIMIT = 500
+
+
+class Worker:
+    """One simulated client: its credentials and where it is in a listing"""
+
+    def __init__(self, index: int, headers: dict, account_id: str):
+        self.index = index
+        self.headers = headers
+        self.account_id = account_id
+        self.cursor = None
+        self.etag = None
+        self.sent = 0
+
+
+async def login(client, worker: Worker, admin: dict):
+    return await client.post(
+        "/api/user/token",
+        data={"username": username(worker.index), "password": SEED_PASSWORD},
+    )
+
+
+async def accounts_list(client, worker: Worker, admin: dict):
+    return await client.get("/api/account/", headers=worker.headers)
+
+
+async def accounts_with_orders(client, worker: Worker, admin: dict):
+    return await client.get(
+        "/api/account/", params={"include_orders": "true"}, headers=worker.headers
+    )
+
+
+async def accounts_poll(client, worker: Worker, admin: dict):
+    """A polling client revalidating with If-None-Match (304 when unchanged)"""
+    headers = dict(worker.headers)
+    if worker.etag:
+        headers["If-None-Match"] = worker.etag
+    response = await client.get(
+        "/api/account/", params={"include_orders": "true"}, headers=headers
+    )
+    worker.etag = response.headers.get("etag", worker.etag)
+    return response
+
+
+async def orders_page(client, worker: Worker, admin: dict):
+    return await client.get("/api/order/", params={"limit": 50}, headers=worker.headers)
+
+
+async def orders_search(client, worker: Worker, admin: dict):
+    return await client.get(
+        "/api/order/search", params={"q": "groc"}, headers=worker.headers
+    )
+
+
+async def balance_history(client, worker: Worker, admin: dict):
+    return await client.get(
+        f"/api/account/{worker.account_id}/balance-history",
+        params={"start": "2023-01-01", "end": "2024-12-31"},
+        headers=worker.headers,
+    )
+
+
+async def admin_net_worth(client, worker: Worker, admin: dict):
+    """Superuser report over every account, with a year of daily history"""
+    return await client.get(
+        "/api/analytics/net-worth",
+        params={"all_users": "true", "start": "2024-01-01", "end": "2024-12-31"},
+        headers=admin,
+    )
+
+
+def walk_all(path: str, items: str):
+    """Admin listing, each client following next_cursor to the end and over"""
+
+    async def request(client, worker: Worker, admin: dict):
+        params = {"limit": PAGE_LIMIT}
+        if worker.cursor:
+            params["cursor"] = worker.cursor
+        response = await client.get(path, params=params, headers=admin)
+        if response.status_code == 200:
+            worker.cursor = response.json()["next_cursor"]
+        return response
+
+    request.__name__ = f"walk_{items}"
+    return request
+
+
+async def order_create(client, worker: Worker, admin: dict):
+    worker.sent += 1
+    return await client.post(
+        "/api/order/",
+        json={
+            "account_id": worker.account_id,
+            "description": f"bench {worker.sent}",
+            "order_type": "Expense",
+            "amount": -1.25,
+        },
+        headers=worker.headers,
+    )
+
+
+# name -> (request function, share of --requests it sends)
+SCENARIOS = {
+    # bcrypt bound by design, a tenth of the requests is plenty
+    "login": (login, 0.1),
+    "accounts_list": (accounts_list, 1),
+    "accounts_with_orders": (accounts_with_orders, 1),
+    "accounts_poll": (accounts_poll, 1),
+    "orders_page": (orders_page, 1),
+    "orders_search": (orders_search, 1),
+    "balance_history": (balance_history, 1),
+    "admin_net_worth": (admin_net_worth, 1),
+    "admin_users_all": (walk_all("/api/user/all", "users"), 1),
+    "admin_accounts_all": (walk_all("/api/account/all", "accounts"), 1),
+    "admin_orders_all": (walk_all("/api/order/all", "orders"), 1),
+    "order_create": (order_create, 1),
+}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db-url", default=None, help="defaults to DB_URL")
+    parser.add_argument(
+        "--read-db-url",
+        default=None,
+        help="read replica for the GET endpoints; a SQLite file is refreshed "
+        "from the primary before the run",
+    )
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--requests", type=int, default=500, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=20, help="per scenario")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"comma separated, from: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--output", default=None, help="JSON file, else stdout")
+    return parser.parse_args(argv)
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    """Nearest-rank percentile"""
+    if not sorted_values:
+        return 0.0
+    rank = max(
+        0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1)
+    )
+    return sorted_values[rank]
+
+
+def summarize(latencies: list, statuses: Counter, seconds: float, queries) -> dict:
+    latencies = sorted(latencies)
+    ms = [value * 1000 for value in latencies]
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": sum(n for status, n in statuses.items() if status >= 400),
+        "statuses": {str(status): n for status, n in sorted(statuses.items())},
+        "seconds": round(seconds, 4),
+        "rps": round(count / seconds, 2) if seconds else 0.0,
+        "latency_ms": {
+            "mean": round(sum(ms) / count, 3) if count else 0.0,
+            "p50": round(percentile(ms, 50), 3),
+            "p90": round(percentile(ms, 90), 3),
+            "p95": round(percentile(ms, 95), 3),
+            "p99": round(percentile(ms, 99), 3),
+            "max": round(ms[-1], 3) if ms else 0.0,
+        },
+        "queries_per_request": round(queries, 2),
+    }
+
+
+async def run_scenario(
+    client, workers: list, admin: dict, func, total: int, warmup: int
+):
+    from core.instrumentation import request_queries
+
+    async def drive(worker: Worker, count: int, latencies: list, statuses: Counter):
+        for _ in range(count):
+            started = time.perf_counter()
+            response = await func(client, worker, admin)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    def split(count: int) -> list:
+        share, extra = divmod(count, len(workers))
+        return [share + (i < extra) for i in range(len(workers))]
+
+    await asyncio.gather(
+        *(drive(w, n, [], Counter()) for w, n in zip(workers, split(warmup)))
+    )
+
+    latencies, statuses = [], Counter()
+    queries_before, requests_before = request_queries.total()
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(drive(w, n, latencies, statuses) for w, n in zip(workers, split(total)))
+    )
+    seconds = time.perf_counter() - started
+    queries_after, requests_after = request_queries.total()
+    served = requests_after - requests_before
+    queries = (queries_after - queries_before) / served if served else 0.0
+    return summarize(latencies, statuses, seconds, queries)
+
+
+def git_revision() -> dict:
+    def git(*args):
+        try:
+            return subprocess.run(
+                ["git", *args], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "HEAD"),
+        "dirty": bool(git("status", "--porcelain")),
+    }
+
+
+async def dataset_counts() -> dict:
+    from sqlalchemy import func, select
+
+    from api.accounts.models import Accounts
+    from api.orders.models import Orders
+    from api.users.models import Users
+    from database.core import async_session
+
+    async with async_session() as db:
+        return {
+            name: await db.scalar(select(func.count()).select_from(model))
+            for name, model in (
+                ("users", Users),
+                ("accounts", Accounts),
+                ("orders", Orders),
+            )
+        }
+
+
+async def prepare_workers(client, count: int) -> list:
+    """Logs in the first `count` seeded users, one per client"""
+    workers = []
+    for index in range(count):
+        response = await client.post(
+            "/api/user/token",
+            data={"username": username(index), "password": SEED_PASSWORD},
+        )
+        response.raise_for_status()
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        accounts = (await client.get("/api/account/", headers=headers)).json()
+        workers.append(Worker(index, headers, accounts[0]["id"]))
+    return workers
+
+
+async def run(args) -> dict:
+    from main import app
+
+    # ASGITransport sends no lifespan events, run the app's startup here
+    async with app.router.lifespan_context(app):
+        return await benchmark(args, app)
+
+
+async def benchmark(args, app) -> dict:
+    import httpx
+
+    from core.config import settings
+
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    counts = await dataset_counts()
+    if not counts["users"]:
+        # In a thread: the scheduler's transactions need the event loop to end
+        await asyncio.to_thread(seed, dataset_size(args), args.seed, log)
+        counts = await dataset_counts()
+    if counts["users"] < args.concurrency:
+        raise SystemExit("Fewer seeded users than --concurrency")
+    if args.read_db_url and args.read_db_url.startswith("sqlite"):
+        from database.replica import copy_sqlite
+
+        copy_sqlite(settings.DB_URL, args.read_db_url)
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    async with httpx.AsyncClient(
+        transport=transport, base_url="http://bench", timeout=None
+    ) as client:
+        workers = await prepare_workers(client, args.concurrency)
+        response = await client.post(
+            "/api/user/token",
+            data={
+                "username": settings.SUPERUSER_USERNAME,
+                "password": settings.SUPERUSER_PASSWORD,
+            },
+        )
+        admin = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        results = {}
+        for name in names:
+            func, share = SCENARIOS[name]
+            total = max(args.concurrency, int(args.requests * share))
+            warmup = max(args.concurrency, int(args.warmup * share))
+            for worker in workers:
+                worker.cursor = None
+            results[name] = await run_scenario(
+                client, workers, admin, func, total, warmup
+            )
+            latency = results[name]["latency_ms"]
+            log(
+                f"{name:22} {results[name]['rps']:9.1f} req/s  "
+                f"p50 {latency['p50']:8.2f} ms  p95 {latency['p95']:8.2f} ms  "
+                f"errors {results[name]['errors']}"
+            )
+
+    from sqlalchemy.engine import make_url
+
+    from database.core import get_async_db_url
+
+    return {
+        "benchmark": "endpoints",
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "database": make_url(get_async_db_url()).drivername,
+            "read_replica": bool(args.read_db_url),
+            "dataset": counts,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "warmup": args.warmup,
+        },
+        "results": results,
+    }
+
+
+def log(*parts, end="\n"):
+    print(*parts, end=end, file=sys.stderr, flush=True)
+
+
+def main():
+    args = parse_args()
+    if args.db_url:
+        os.environ["DB_URL"] = args.db_url
+        os.environ.pop("ASYNC_DB_URL", None)
+    if args.read_db_url:
+        os.environ["READ_DB_URL"] = args.read_db_url
+    report = asyncio.run(run(args))
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
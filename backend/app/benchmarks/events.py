@@ -0,0 +1,135 @@
+"""Cost of the live update broker: idle streams and fan-out
+
+Opens --subscribers SSE streams (services.events.stream, consumed in
+process like the ASGI server would) spread over --users users, measures
+the memory each idle stream holds, then publishes --events events to
+random users and reports publish throughput and the time until every
+stream has received its events. A last phase leaves one stream
+unconsumed to check that backpressure collapses its backlog into a
+single resync event instead of growing.
+
+    python -m benchmarks.events --subscribers 5000 --users 500 --events 2000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from benchmarks.endpoints import git_revision
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="JSON file, else stdout")
+    return parser.parse_args(argv)
+
+
+async def consume(user_id: str, received: list, index: int):
+    from services.events import stream
+
+    async for message in stream(user_id):
+        if message.startswith("event:"):
+            received[index] += 1
+
+
+async def benchmark(args) -> dict:
+    from core.config import settings
+    from services.events import EventBroker, frame, get_broker
+
+    broker = get_broker()
+
+    rng = random.Random(args.seed)
+    users = [f"user-{index}" for index in range(args.users)]
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    subscribers = [users[index % len(users)] for index in range(args.subscribers)]
+    received = [0] * len(subscribers)
+    tasks = [
+        asyncio.create_task(consume(user_id, received, index))
+        for index, user_id in enumerate(subscribers)
+    ]
+    # Let every stream subscribe, send its preamble and park on its queue
+    for _ in range(3):
+        await asyncio.sleep(0)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    idle_bytes = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+
+    expected = [0] * len(subscribers)
+    by_user = {}
+    for index, user_id in enumerate(subscribers):
+        by_user.setdefault(user_id, []).append(index)
+
+    started = time.perf_counter()
+    for number in range(args.events):
+        user_id = rng.choice(users)
+        broker.publish([user_id], frame("order.created", {"n": number}))
+        for index in by_user.get(user_id, ()):
+            expected[index] += 1
+        if number % settings.EVENTS_QUEUE_SIZE == 0:
+            # Yield now and then, as request handlers do between commits
+            await asyncio.sleep(0)
+    published = time.perf_counter() - started
+    while received != expected:
+        await asyncio.sleep(0)
+    delivered = time.perf_counter() - started
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # Backpressure: a stream nobody reads stays at one queue's worth
+    slow = EventBroker(settings.EVENTS_QUEUE_SIZE, 1)
+    stalled = slow.subscribe("slow")
+    for number in range(settings.EVENTS_QUEUE_SIZE * 10):
+        slow.publish(["slow"], frame("order.created", {"n": number}))
+
+    return {
+        "benchmark": "events",
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "subscribers": args.subscribers,
+            "users": args.users,
+            "events": args.events,
+            "queue_size": settings.EVENTS_QUEUE_SIZE,
+        },
+        "idle_bytes_per_subscriber": round(idle_bytes / max(1, args.subscribers)),
+        "publish_per_second": round(args.events / published) if published else 0,
+        "deliveries": sum(expected),
+        "deliveries_per_second": round(sum(expected) / delivered) if delivered else 0,
+        "all_delivered_ms": round(delivered * 1000, 2),
+        "slow_stream": {
+            "published": slow.published,
+            "queued": stalled.queue.qsize(),
+            "resyncs": slow.resyncs,
+        },
+        "broker": broker.snapshot(),
+    }
+
+
+def main():
+    args = parse_args()
+    report = asyncio.run(benchmark(args))
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""Synthetic dataset for the benchmarks: users, accounts and their orders
+
+Rows are generated from a seeded RNG (ids included), so the same --seed and
+--scale always produce the same database. Every user shares one password
+(SEED_PASSWORD, hashed once) so scenarios can log in as any of them, and
+each account balance equals its opening amount plus its orders.
+
+    python -m benchmarks.seed --scale large --db-url sqlite:////tmp/bench.db
+
+Scales: small (200 users, 2k accounts, 50k orders), medium (1k / 20k /
+500k) and large (5k users, 100k accounts, 2M orders).
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+SCALES = {
+    "small": {"users": 200, "accounts": 2_000, "orders": 50_000},
+    "medium": {"users": 1_000, "accounts": 20_000, "orders": 500_000},
+    "large": {"users": 5_000, "accounts": 100_000, "orders": 2_000_000},
+}
+SEED_PASSWORD = "bench-password"
+CURRENCIES = ("USD", "USD", "USD", "EUR", "EUR", "GBP", "JPY", "CHF")
+ACCOUNT_NAMES = ("Checking", "Savings", "Credit card", "Cash", "Brokerage", "Travel")
+EXPENSES = (
+    "groceries",
+    "rent",
+    "electricity",
+    "internet",
+    "restaurant",
+    "fuel",
+    "train ticket",
+    "pharmacy",
+    "gym",
+    "streaming",
+    "insurance",
+    "coffee",
+)
+# Budget category of each expense (incomes have none)
+CATEGORIES = {
+    "groceries": "food",
+    "restaurant": "food",
+    "coffee": "food",
+    "rent": "housing",
+    "electricity": "housing",
+    "internet": "housing",
+    "insurance": "housing",
+    "fuel": "transport",
+    "train ticket": "transport",
+    "pharmacy": "health",
+    "gym": "health",
+    "streaming": "leisure",
+}
+INCOMES = ("salary", "refund", "transfer in", "dividends", "gift")
+# Orders are spread over this many days before SEED_NOW
+HISTORY_DAYS = 730
+SEED_NOW = datetime(2025, 1, 1)
+INSERT_BATCH = 20_000
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=SCALES, default="small")
+    parser.add_argument("--users", type=int, help="overrides the scale")
+    parser.add_argument("--accounts", type=int, help="overrides the scale")
+    parser.add_argument("--orders", type=int, help="overrides the scale")
+    parser.add_argument("--db-url", default=None, help="defaults to DB_URL")
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args(argv)
+
+
+def dataset_size(args) -> dict:
+    size = dict(SCALES[args.scale])
+    for key in size:
+        if getattr(args, key, None) is not None:
+            size[key] = getattr(args, key)
+    return size
+
+
+def seeded_uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def username(index: int) -> str:
+    return f"bench-user-{index}"
+
+
+def generate_users(rng: random.Random, n_users: int, hashed_password: str):
+    return [
+        {
+            "id": seeded_uuid(rng),
+            "username": username(i),
+            "hashed_password": hashed_password,
+        }
+        for i in range(n_users)
+    ]
+
+
+def generate_accounts(rng: random.Random, users: list, n_accounts: int):
+    """Every user gets at least one account, the rest are spread at random"""
+    accounts = []
+    for i in range(n_accounts):
+        owner = users[i] if i < len(users) else rng.choice(users)
+        accounts.append(
+            {
+                "id": seeded_uuid(rng),
+                "owner_id": owner["id"],
+                "name": f"{rng.choice(ACCOUNT_NAMES)} {i}",
+                "currency": rng.choice(CURRENCIES),
+                "money_minor": rng.randint(0, 500_000),
+            }
+        )
+    return accounts
+
+
+def generate_orders(rng: random.Random, accounts: list, n_orders: int):
+    """Yields order rows; account activity is skewed so some accounts are busy"""
+    weights = [rng.paretovariate(1.5) for _ in accounts]
+    for chunk_start in range(0, n_orders, INSERT_BATCH):
+        chunk = min(INSERT_BATCH, n_orders - chunk_start)
+        for account in rng.choices(accounts, weights=weights, k=chunk):
+            if rng.random() < 0.8:
+                order_type = "Expense"
+                description = rng.choice(EXPENSES)
+                amount = -rng.randint(100, 20_000)
+            else:
+                order_type = "Add"
+                description = rng.choice(INCOMES)
+                amount = rng.randint(1_000, 300_000)
+            created_at = SEED_NOW - timedelta(
+                seconds=rng.randint(0, HISTORY_DAYS * 86_400)
+            )
+            yield {
+                "id": seeded_uuid(rng),
+                "created_by": account["owner_id"],
+                "account_id": account["id"],
+                "created_at": created_at,
+                "updated_at": None,
+                "description": description,
+                "order_type": order_type,
+                "category": CATEGORIES.get(description),
+                "amount_minor": amount,
+            }
+
+
+def batched(rows, size: int):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def seed(size: dict, seed_value: int = 0, log=print) -> dict:
+    """Fills the DB_URL database, which must not hold any user yet"""
+    from sqlalchemy import bindparam, func, insert, select, update
+
+    from api.accounts.models import Accounts
+    from api.orders.models import Orders
+    from api.users.models import Users
+    from core.security import hash_password
+    from database.core import get_engine
+    from database.migrations import init_schema
+    from services.balance_history import rebuild_snapshots
+
+    engine = get_engine()
+    init_schema(engine)
+    with engine.connect() as conn:
+        if conn.scalar(select(func.count()).select_from(Users)):
+            raise SystemExit("The database already holds users, seed an empty one")
+
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    users = generate_users(rng, size["users"], hash_password(SEED_PASSWORD))
+    accounts = generate_accounts(rng, users, size["accounts"])
+    with engine.begin() as conn:
+        for batch in batched(users, INSERT_BATCH):
+            conn.execute(insert(Users), batch)
+        for batch in batched(accounts, INSERT_BATCH):
+            conn.execute(insert(Accounts), batch)
+    log(f"{len(users)} users, {len(accounts)} accounts")
+
+    deltas = {}
+    inserted = 0
+    for batch in batched(generate_orders(rng, accounts, size["orders"]), INSERT_BATCH):
+        with engine.begin() as conn:
+            conn.execute(insert(Orders), batch)
+        for row in batch:
+            deltas[row["account_id"]] = (
+                deltas.get(row["account_id"], 0) + row["amount_minor"]
+            )
+        inserted += len(batch)
+        log(f"  {inserted}/{size['orders']} orders", end="\r")
+    log()
+
+    # Balances = opening amount + orders, one executemany over the accounts
+    with engine.begin() as conn:
+        conn.execute(
+            update(Accounts)
+            .where(Accounts.id == bindparam("b_id"))
+            .values(money_minor=Accounts.money_minor + bindparam("b_delta")),
+            [{"b_id": key, "b_delta": delta} for key, delta in deltas.items()],
+        )
+        rebuild_snapshots(conn)
+    elapsed = time.perf_counter() - started
+    log(f"seeded in {elapsed:.1f}s")
+    return size
+
+
+def main():
+    args = parse_args()
+    if args.db_url:
+        os.environ["DB_URL"] = args.db_url
+        os.environ.pop("ASYNC_DB_URL", None)
+
+    def log(*parts, end="\n"):
+        print(*parts, end=end, file=sys.stderr, flush=True)
+
+    seed(dataset_size(args), args.seed, log)
+
+
+if __name__ == "__main__":
+    main()
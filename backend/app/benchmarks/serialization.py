@@ -0,0 +1,119 @@
+"""Serialization cost of the account listings, before and after response models
+
+Builds accounts with embedded orders in memory (no database) and times:
+
+- orm_jsonable: the old path, ORM objects through jsonable_encoder + json
+- response_model: the same payload through AccountWithOrders and Pydantic's
+  JSON serializer, which FastAPI uses when a response_model is declared
+- without_orders: the default list view (include_orders=false)
+
+    python -m benchmarks.serialization --accounts 200 --orders 200 --json
+"""
+
+import argparse
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import List
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--orders", type=int, default=200, help="per account")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="machine readable")
+    return parser.parse_args()
+
+
+def build_accounts(n_accounts: int, n_orders: int) -> list:
+    from api.accounts.models import Accounts
+    from api.orders.models import Orders
+    from sqlalchemy.orm.attributes import set_committed_value
+
+    accounts = []
+    for a in range(n_accounts):
+        account = Accounts(
+            id=str(uuid.uuid4()),
+            owner_id="bench-user",
+            name=f"Account {a}",
+            currency="USD",
+            money_minor=a * 100,
+        )
+        # As loaded by joinedload: the collection is set, order.account is not
+        set_committed_value(
+            account,
+            "orders",
+            [
+                Orders(
+                    id=str(uuid.uuid4()),
+                    created_by="bench-user",
+                    account_id=account.id,
+                    created_at=datetime(2024, 1, 1 + o % 28),
+                    description=f"order {o}",
+                    order_type="Expense",
+                    amount_minor=-o,
+                )
+                for o in range(n_orders)
+            ],
+        )
+        accounts.append(account)
+    return accounts
+
+
+def best_of(repeat: int, func) -> tuple:
+    timings, size = [], 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        size = len(func())
+        timings.append(time.perf_counter() - started)
+    return min(timings), size
+
+
+def main():
+    args = parse_args()
+    from fastapi.encoders import jsonable_encoder
+    from pydantic import TypeAdapter
+
+    from api.accounts.schemas import AccountResponse, AccountWithOrders
+
+    accounts = build_accounts(args.accounts, args.orders)
+    with_orders = TypeAdapter(List[AccountWithOrders])
+    without_orders = TypeAdapter(List[AccountResponse])
+
+    scenarios = {
+        "orm_jsonable": lambda: json.dumps(jsonable_encoder(accounts)).encode(),
+        "response_model": lambda: with_orders.dump_json(
+            with_orders.validate_python(accounts, from_attributes=True)
+        ),
+        "without_orders": lambda: without_orders.dump_json(
+            without_orders.validate_python(accounts, from_attributes=True)
+        ),
+    }
+    results = {}
+    for name, func in scenarios.items():
+        seconds, size = best_of(args.repeat, func)
+        results[name] = {"seconds": round(seconds, 6), "bytes": size}
+
+    report = {
+        "benchmark": "serialization",
+        "accounts": args.accounts,
+        "orders_per_account": args.orders,
+        "results": results,
+    }
+    if args.json:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+        return
+    baseline = results["orm_jsonable"]["seconds"]
+    for name, result in results.items():
+        print(
+            f"{name:16} {result['seconds'] * 1000:9.1f} ms "
+            f"{result['bytes'] / 1024:9.0f} KiB  x{baseline / result['seconds']:.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""Cold start cost of the app: imports, startup (lifespan) and first requests
+
+Each run is a fresh interpreter under `python -X importtime` that imports
+main, runs the lifespan startup, logs in as the superuser and sends one
+authenticated request. Reported are the medians over --runs (after one
+unmeasured run that creates the schema and warms the bytecode cache),
+the import time of each app module and the import time spent in each
+third-party package (self time, so nothing is counted twice). Packages
+the app defers until first use (jose, numpy, ...) show up when the first
+requests import them.
+
+    python -m benchmarks.startup --runs 7 --output results/startup.json
+
+Exits with status 1 when a median exceeds its budget. BUDGETS_MS holds the
+defaults, --budget overrides or adds one, for a phase (import, startup,
+first_login, first_request), an app module (api.users.routes) or a
+package (numpy):
+
+    python -m benchmarks.startup --budget import=600 --budget numpy=0
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from benchmarks.endpoints import git_revision
+
+# Medians in milliseconds on the reference CI machine, tune them with it
+BUDGETS_MS = {
+    "import": 1000,
+    "startup": 500,
+    "first_login": 150,
+    "first_request": 150,
+}
+PHASES = ("import", "startup", "first_login", "first_request")
+APP_PACKAGES = {"main", "api", "core", "database", "services", "benchmarks"}
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = """
+import asyncio
+import json
+import time
+
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+
+import httpx
+from core.config import settings
+
+
+async def probe():
+    timings = {"import": imported - started}
+    started_up = time.perf_counter()
+    async with main.app.router.lifespan_context(main.app):
+        timings["startup"] = time.perf_counter() - started_up
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://probe") as c:
+            sent = time.perf_counter()
+            response = await c.post(
+                "/api/user/token",
+                data={
+                    "username": settings.SUPERUSER_USERNAME,
+                    "password": settings.SUPERUSER_PASSWORD,
+                },
+            )
+            timings["first_login"] = time.perf_counter() - sent
+            token = response.json()["access_token"]
+            sent = time.perf_counter()
+            response = await c.get(
+                "/api/account/all", headers={"Authorization": f"Bearer {token}"}
+            )
+            response.raise_for_status()
+            timings["first_request"] = time.perf_counter() - sent
+    print(json.dumps({name: value * 1000 for name, value in timings.items()}))
+
+
+asyncio.run(probe())
+"""
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--db-url", default=None, help="defaults to a temp SQLite")
+    parser.add_argument("--top", type=int, default=15, help="modules and packages")
+    parser.add_argument(
+        "--budget",
+        action="append",
+        default=[],
+        metavar="NAME=MS",
+        help="phase, app module or package budget, repeatable",
+    )
+    parser.add_argument("--output", default=None, help="JSON file, else stdout")
+    return parser.parse_args(argv)
+
+
+def parse_importtime(stderr: str) -> tuple:
+    """({app module: cumulative ms}, {package: self ms}) of one -X importtime log"""
+    modules, packages = {}, defaultdict(float)
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "| imported package" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:") :].split("|")
+            self_ms, cumulative_ms = int(self_us) / 1000, int(cumulative_us) / 1000
+        except ValueError:
+            continue
+        name = name.strip()
+        package = name.split(".")[0]
+        if package in APP_PACKAGES:
+            modules[name] = cumulative_ms
+        else:
+            packages[package] += self_ms
+    return modules, dict(packages)
+
+
+def run_once(env: dict) -> dict:
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode:
+        raise SystemExit(f"probe failed:\n{process.stderr[-2000:]}")
+    modules, packages = parse_importtime(process.stderr)
+    return {
+        "phases": json.loads(process.stdout.strip().splitlines()[-1]),
+        "modules": modules,
+        "packages": packages,
+    }
+
+
+def medians(samples: list) -> dict:
+    names = set().union(*samples)
+    return {
+        name: round(statistics.median(s.get(name, 0.0) for s in samples), 2)
+        for name in names
+    }
+
+
+def top(values: dict, count: int) -> dict:
+    return dict(sorted(values.items(), key=lambda item: -item[1])[:count])
+
+
+def check_budgets(report: dict, budgets: dict) -> list:
+    """Names whose median exceeds their budget, with both values"""
+    lookup = {
+        **report["packages_self_ms"],
+        **report["modules_cumulative_ms"],
+        **report["phases_ms"],
+    }
+    return [
+        {"name": name, "median_ms": lookup.get(name, 0.0), "budget_ms": budget}
+        for name, budget in budgets.items()
+        if lookup.get(name, 0.0) > budget
+    ]
+
+
+def parse_budgets(overrides: list) -> dict:
+    budgets = dict(BUDGETS_MS)
+    for override in overrides:
+        name, _, value = override.partition("=")
+        try:
+            budgets[name.strip()] = float(value)
+        except ValueError:
+            raise SystemExit(f"Invalid budget {override!r}, expected NAME=MS")
+    return budgets
+
+
+def main():
+    args = parse_args()
+    budgets = parse_budgets(args.budget)
+    env = dict(os.environ)
+    # The unmeasured run writes the bytecode the measured ones load
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    if args.db_url:
+        env["DB_URL"] = args.db_url
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "startup.db")
+        env["DB_URL"] = f"sqlite:///{path}"
+    env.pop("ASYNC_DB_URL", None)
+
+    run_once(env)
+    runs = []
+    for index in range(args.runs):
+        runs.append(run_once(env))
+        phases = runs[-1]["phases"]
+        print(
+            f"run {index + 1}: "
+            + "  ".join(f"{name} {phases[name]:7.1f} ms" for name in PHASES),
+            file=sys.stderr,
+        )
+
+    modules = medians([run["modules"] for run in runs])
+    packages = medians([run["packages"] for run in runs])
+    report = {
+        "benchmark": "startup",
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git": git_revision(),
+            "python": sys.version.split()[0],
+            "runs": args.runs,
+        },
+        "phases_ms": medians([run["phases"] for run in runs]),
+        "modules_cumulative_ms": modules,
+        "packages_self_ms": packages,
+    }
+    report["over_budget"] = check_budgets(report, budgets)
+    report["budgets_ms"] = budgets
+    report["modules_cumulative_ms"] = top(modules, args.top)
+    report["packages_self_ms"] = top(packages, args.top)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+            output.write("\n")
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    for breach in report["over_budget"]:
+        print(
+            f"over budget: {breach['name']} {breach['median_ms']:.1f} ms "
+            f"> {breach['budget_ms']:.1f} ms",
+            file=sys.stderr,
+        )
+    sys.exit(1 if report["over_budget"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,116 @@
+from functools import lru_cache
+from typing import Literal, Optional
+
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     DB_URL: str
+    # Defaults to DB_URL with its async driver (aiosqlite / asyncpg)
+    ASYNC_DB_URL: Optional[str] = None
+    # Optional read replica serving the GET endpoints (sync or async URL); a
+    # client reads from the primary for a while after each of its writes
+    READ_DB_URL: Optional[str] = None
+    READ_YOUR_WRITES_SECONDS: int = 5
     SECRET_KEY: str
     ALGORITHM: str
     SUPERUSER_USERNAME: str
     SUPERUSER_PASSWORD: str
     SUPERUSER_ID: str
+    # Server launched by start_server.py: "production" runs SERVER_WORKERS
+    # processes (default: one per core) with uvloop / httptools if installed
+    SERVER_MODE: Literal["dev", "production"] = "dev"
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: Optional[int] = None
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEPALIVE_TIMEOUT: int = 5
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    SERVER_LIMIT_CONCURRENCY: Optional[int] = None
+    SERVER_ACCESS_LOG: bool = True
+    # Create / upgrade the schema when the app starts (lifespan); start_server.py
+    # does it once itself and turns this off for its workers
+    INIT_SCHEMA_ON_STARTUP: bool = True
+    # Connection pool (ignored by in-memory SQLite)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # SQLite pragmas set on every connection
+    SQLITE_JOURNAL_MODE: Literal["WAL", "DELETE", "TRUNCATE", "MEMORY"] = "WAL"
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL"] = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 30_000
+    # bcrypt runs in a bounded pool: workers + queue size = max in flight
+    PASSWORD_POOL_WORKERS: int = 4
+    PASSWORD_POOL_QUEUE_SIZE: int = 32
+    # Validated JWTs kept in memory (0 disables the cache)
+    TOKEN_CACHE_SIZE: int = 10_000
+    # Keyset pagination of the list endpoints
+    PAGE_SIZE_DEFAULT: int = 50
+    PAGE_SIZE_MAX: int = 500
+    # Orders removed per DELETE (and commit) by account / user deletion
+    DELETE_CHUNK_SIZE: int = 10_000
+    # Longest range served by the balance history endpoint, and its default
+    BALANCE_HISTORY_MAX_DAYS: int = 3660
+    BALANCE_HISTORY_DEFAULT_DAYS: int = 30
+    # Rows fetched per round trip by the streaming (ndjson) responses
+    STREAM_BATCH_SIZE: int = 1000
+    # Orders embedded per account by the account endpoints (include_orders)
+    EMBEDDED_ORDERS_DEFAULT: int = 50
+    EMBEDDED_ORDERS_MAX: int = 500
+    # Bulk order import: rows per INSERT batch and per-row errors reported
+    IMPORT_BATCH_SIZE: int = 1000
+    IMPORT_BATCH_SIZE_MAX: int = 10_000
+    IMPORT_MAX_REPORTED_ERRORS: int = 100
+    # Operations accepted by one POST /batch request
+    BATCH_MAX_OPERATIONS: int = 1000
+    # Live updates (GET /events): events queued per stream before it is
+    # told to resync, open streams per worker, idle keep-alive interval
+    EVENTS_QUEUE_SIZE: int = 100
+    EVENTS_MAX_SUBSCRIBERS: int = 10_000
+    EVENTS_KEEPALIVE_SECONDS: float = 15
+    EVENTS_RETRY_MS: int = 3000
+    # Recurring orders: scheduler tick interval, definitions booked per
+    # transaction and occurrences of one definition per transaction
+    SCHEDULER_ENABLED: bool = True
+    SCHEDULER_INTERVAL_SECONDS: float = 60
+    SCHEDULER_BATCH_SIZE: int = 500
+    SCHEDULER_MAX_OCCURRENCES: int = 400
+    # Budget counter drift rows listed by POST /budgets/reconcile
+    BUDGET_DRIFT_REPORT_MAX: int = 100
+    # Rows buffered per Parquet row group by the order export
+    EXPORT_PARQUET_ROW_GROUP_SIZE: int = 50_000
+    # Users whose analytics results are kept in memory, and results kept
+    # per user (each date range / currency / top-N asked for is one)
+    ANALYTICS_CACHE_USERS: int = 1000
+    ANALYTICS_CACHE_KEYS_PER_USER: int = 16
+    # Full-text search of order descriptions: "auto" picks FTS5 on SQLite
+    # and a tsvector GIN index on PostgreSQL, "like" is an unindexed scan
+    SEARCH_BACKEND: Literal["auto", "fts5", "postgres", "like"] = "auto"
+    # Currency of the net worth report when the request names none
+    FX_DEFAULT_CURRENCY: str = "USD"
+    # Request / query metrics served at /metrics (bearer token optional);
+    # requests issuing more queries than the threshold are logged (0: off)
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    QUERY_COUNT_WARN_THRESHOLD: int = 30
 
     class Config:
         env_file = "../.env"
 
 
-settings = Settings()
+@lru_cache(maxsize=None)
+def get_settings() -> Settings:
+    """Reads the environment and the env file once, on first use"""
+    return Settings()
+
+
+class LazySettings:
+    """`settings` proxy: importing this module does not read anything yet"""
+
+    def __getattr__(self, name: str):
+        return getattr(get_settings(), name)
+
+
+settings = LazySettings()
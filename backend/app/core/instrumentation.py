@@ -0,0 +1,176 @@
+"""Request timing, per-query tracking and the N+1 detector
+
+MetricsMiddleware times every HTTP request and opens a QueryLog in a context
+variable; the cursor event hooks installed by instrument_engine add each
+statement to the log of the request that issued it (the context follows
+the request into SQLAlchemy's greenlets and FastAPI's threadpool).
+"""
+
+import logging
+import time
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from core.config import settings
+from core.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250, 1000)
+QUERY_KINDS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "PRAGMA"}
+# Label of requests no route matched (keeps 404 scans out of the label set)
+UNMATCHED_ROUTE = "unmatched"
+
+http_requests = registry.counter(
+    "http_requests_total", "HTTP requests", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency, until the response body is sent",
+    ("method", "route"),
+)
+request_queries = registry.histogram(
+    "http_request_db_queries",
+    "Database queries issued per HTTP request",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+request_query_duration = registry.histogram(
+    "http_request_db_duration_seconds",
+    "Time per HTTP request spent executing database queries",
+    ("method", "route"),
+)
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Database query latency", ("statement",)
+)
+query_threshold_exceeded = registry.counter(
+    "http_request_db_query_threshold_exceeded_total",
+    "Requests issuing more queries than QUERY_COUNT_WARN_THRESHOLD",
+    ("method", "route"),
+)
+
+
+class QueryLog:
+    """Queries issued while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.statements = StatementCounter()
+        # Batches do several requests' work, see expect_operations
+        self.operations = 1
+
+    def record(self, statement: str, duration: float):
+        self.count += 1
+        self.duration += duration
+        self.statements[statement] += 1
+
+
+current_queries: ContextVar[Optional[QueryLog]] = ContextVar(
+    "current_queries", default=None
+)
+
+
+def expect_operations(count: int):
+    """The current request does `count` operations' worth of queries
+
+    Scales its QUERY_COUNT_WARN_THRESHOLD, so a batch is only flagged when
+    its operations themselves issue too many queries.
+    """
+    queries = current_queries.get()
+    if queries is not None:
+        queries.operations = max(1, count)
+
+
+def statement_kind(statement: str) -> str:
+    words = statement.split(None, 1)
+    kind = words[0].upper() if words else ""
+    return kind if kind in QUERY_KINDS else "OTHER"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, many):
+    context._query_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, many):
+    duration = time.perf_counter() - context._query_started
+    db_query_duration.observe(duration, statement_kind(statement))
+    queries = current_queries.get()
+    if queries is not None:
+        queries.record(statement, duration)
+
+
+def instrument_engine(sync_engine):
+    """Times every statement of `sync_engine` (pass .sync_engine for async)"""
+    if settings.METRICS_ENABLED:
+        event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def route_template(scope: dict) -> str:
+    """The matched path template (`/api/order/{order_id}`), not the raw path"""
+    route = getattr(scope.get("route"), "path", None)
+    if route is None:
+        return UNMATCHED_ROUTE
+    # Routes of included routers may only know their path below the
+    # router prefix; take the prefix back from the request path
+    segments = scope["path"].split("/")
+    prefix_length = len(segments) - len(route.split("/")) + 1
+    return "/".join(segments[:prefix_length]) + route
+
+
+def check_query_count(method: str, route: str, queries: QueryLog):
+    """Flags requests whose query count suggests an N+1 pattern"""
+    threshold = settings.QUERY_COUNT_WARN_THRESHOLD * queries.operations
+    if threshold <= 0 or queries.count <= threshold:
+        return
+    query_threshold_exceeded.inc(method, route)
+    statement, repeats = queries.statements.most_common(1)[0]
+    logger.warning(
+        "%s %s issued %d queries (threshold %d); most repeated (%dx): %s",
+        method,
+        route,
+        queries.count,
+        threshold,
+        repeats,
+        " ".join(statement.split())[:200],
+    )
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and queries per route"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        queries = QueryLog()
+        token = current_queries.set(queries)
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration = time.perf_counter() - started
+            current_queries.reset(token)
+            method = scope["method"]
+            route = route_template(scope)
+            http_requests.inc(method, route, str(status))
+            http_request_duration.observe(duration, method, route)
+            request_queries.observe(queries.count, method, route)
+            request_query_duration.observe(queries.duration, method, route)
+            check_query_count(method, route, queries)
@@ -0,0 +1,144 @@
+import threading
+from typing import Iterable
+
+# Prometheus' default latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per label combination"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: tuple = ()):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self._values: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for labels, value in values:
+            yield f"{self.name}{_labels(self.label_names, labels)} {_number(value)}"
+
+
+class Histogram:
+    """Cumulative bucket histogram, one set of buckets per label combination"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, doc: str, labels: tuple = (), buckets=None):
+        self.name = name
+        self.doc = doc
+        self.label_names = labels
+        self.buckets = tuple(buckets or LATENCY_BUCKETS)
+        # labels -> [count per bucket..., sum, count]
+        self._values: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def total(self) -> tuple:
+        """(sum, count) over every label combination"""
+        with self._lock:
+            series = self._values.values()
+            return sum(s[-2] for s in series), sum(s[-1] for s in series)
+
+    def samples(self) -> Iterable[str]:
+        with self._lock:
+            values = [(labels, list(series)) for labels, series in self._values.items()]
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = _labels(self.label_names, labels, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            # Observations above the last bucket only show up in +Inf
+            inf = _labels(self.label_names, labels, 'le="+Inf"')
+            yield f"{self.name}_bucket{inf} {series[-1]}"
+            plain = _labels(self.label_names, labels)
+            yield f"{self.name}_sum{plain} {_number(series[-2])}"
+            yield f"{self.name}_count{plain} {series[-1]}"
+
+
+class Registry:
+    """Metrics rendered by /metrics, plus values read from collectors
+
+    Collectors return `{metric_name: (type, doc, {labels_tuple: value})}`
+    and are called at scrape time, so the pools and caches that already keep
+    their own counters don't need to report anywhere.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def counter(self, name: str, doc: str, labels: tuple = ()) -> Counter:
+        metric = Counter(name, doc, labels)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(
+        self, name: str, doc: str, labels: tuple = (), buckets=None
+    ) -> Histogram:
+        metric = Histogram(name, doc, labels, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def collector(self, label_names: tuple):
+        def register(func):
+            self._collectors.append((label_names, func))
+            return func
+
+        return register
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        for label_names, func in self._collectors:
+            for name, (kind, doc, values) in func().items():
+                lines.append(f"# HELP {name} {doc}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in values.items():
+                    lines.append(
+                        f"{name}{_labels(label_names, labels)} {_number(value)}"
+                    )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
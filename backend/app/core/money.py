@@ -0,0 +1,19 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+
+# Money is stored as integer hundredths of the account currency. That is exact
+# for two-decimal currencies and for zero-decimal ones such as XPF or JPY.
+MINOR_PER_UNIT = 100
+
+
+def to_minor(amount: float) -> int:
+    """Converts an API amount (e.g. 12.34) to minor units (1234)"""
+    return int(
+        (Decimal(str(amount)) * MINOR_PER_UNIT).quantize(
+            Decimal(1), rounding=ROUND_HALF_EVEN
+        )
+    )
+
+
+def from_minor(minor: int) -> float:
+    """Converts minor units (1234) back to an API amount (12.34)"""
+    return (minor or 0) / MINOR_PER_UNIT
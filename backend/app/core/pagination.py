@@ -0,0 +1,121 @@
+import base64
+import json
+from datetime import date, datetime
+from typing import Annotated, Callable, Literal, Optional
+
+from fastapi import Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Date, DateTime, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from database.core import read_sessionmaker
+
+
+class PageParams:
+    """Query parameters shared by the paginated list endpoints"""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(
+            default=None, description="next_cursor of the previous page"
+        ),
+        limit: int = Query(
+            default=settings.PAGE_SIZE_DEFAULT, ge=1, le=settings.PAGE_SIZE_MAX
+        ),
+        format: Literal["json", "ndjson"] = Query(
+            default="json", description="ndjson streams every row, ignoring paging"
+        ),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.format = format
+
+
+page_dependency = Annotated[PageParams, Depends()]
+
+
+def encode_cursor(values: list) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, date) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: list) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError
+        return [_decode_value(v, c) for v, c in zip(values, columns)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _decode_value(value, column):
+    """A cursor value as the column's type; cursors come from clients"""
+    if value is None:
+        return None
+    if isinstance(column.type, (Date, DateTime)) and not isinstance(value, str):
+        raise ValueError
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if isinstance(column.type, Date):
+        return date.fromisoformat(value)
+    # Only scalars can be bound: no lists or objects
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError
+    return value
+
+
+async def paginate(db: AsyncSession, stmt, columns: list, page: PageParams):
+    """Returns (rows, next_cursor) of a keyset page ordered by `columns`
+
+    `columns` must end with a unique column so the ordering is total.
+    """
+    if page.cursor:
+        values = decode_cursor(page.cursor, columns)
+        if len(columns) == 1:
+            stmt = stmt.where(columns[0] > values[0])
+        else:
+            stmt = stmt.where(tuple_(*columns) > tuple_(*values))
+
+    stmt = stmt.order_by(*columns).limit(page.limit + 1)
+    rows = (await db.scalars(stmt)).unique().all()
+
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        next_cursor = encode_cursor([getattr(rows[-1], c.key) for c in columns])
+    return rows, next_cursor
+
+
+def stream_ndjson(
+    stmt,
+    columns: list,
+    serialize: Optional[Callable] = None,
+    serialize_batch: Optional[Callable] = None,
+) -> StreamingResponse:
+    """Streams every row of `stmt` as one JSON document per line
+
+    Rows are pulled `STREAM_BATCH_SIZE` at a time from a dedicated session,
+    so memory stays flat whatever the size of the result. Either
+    `serialize(row)` returns the document of a row, or the coroutine
+    `serialize_batch(db, rows)` those of a whole batch, so that what the
+    rows embed can be loaded with one query per batch.
+    """
+    stmt = stmt.order_by(*columns).execution_options(
+        yield_per=settings.STREAM_BATCH_SIZE
+    )
+
+    sessionmaker = read_sessionmaker()
+
+    async def lines():
+        async with sessionmaker() as db:
+            result = await db.stream_scalars(stmt)
+            async for rows in result.partitions():
+                if serialize_batch is not None:
+                    documents = await serialize_batch(db, rows)
+                else:
+                    documents = [serialize(row) for row in rows]
+                yield "".join(document + "\n" for document in documents)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
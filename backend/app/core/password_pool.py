@@ -0,0 +1,111 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException
+
+from core.metrics import registry
+
+wait_duration = registry.histogram(
+    "password_pool_wait_seconds", "Time bcrypt jobs waited for a worker"
+)
+compute_duration = registry.histogram(
+    "password_pool_compute_seconds", "Time bcrypt jobs ran on a worker"
+)
+
+
+class PasswordPoolStats:
+    """Queue wait vs compute time of the password jobs"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.compute_total = 0.0
+        self.compute_max = 0.0
+
+    def record(self, wait: float, compute: float):
+        with self._lock:
+            self.completed += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+            self.compute_total += compute
+            self.compute_max = max(self.compute_max, compute)
+        wait_duration.observe(wait)
+        compute_duration.observe(compute)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            done = self.completed or 1
+            return {
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_avg_ms": self.wait_total / done * 1000,
+                "wait_max_ms": self.wait_max * 1000,
+                "compute_avg_ms": self.compute_total / done * 1000,
+                "compute_max_ms": self.compute_max * 1000,
+            }
+
+
+class PasswordPool:
+    """Bounded thread pool running bcrypt work off the event loop
+
+    At most `workers` jobs run at once and `queue_size` more may wait;
+    anything beyond that is refused with a 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, queue_size: int):
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="password"
+        )
+        self.capacity = workers + queue_size
+        # Only touched from the event loop thread
+        self.pending = 0
+        self.stats = PasswordPoolStats()
+
+    async def run(self, func, *args):
+        if self.pending >= self.capacity:
+            self.stats.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many login requests, please retry",
+                headers={"Retry-After": "1"},
+            )
+
+        queued_at = time.perf_counter()
+
+        def job():
+            started_at = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.stats.record(
+                    started_at - queued_at, time.perf_counter() - started_at
+                )
+
+        loop = asyncio.get_running_loop()
+        future = self._executor.submit(job)
+        self.pending += 1
+        # The slot is freed when the job ends, not when its caller stops
+        # waiting: a disconnected client's bcrypt job may still be running.
+        # Cancelling the wait cancels a job that has not started yet.
+        future.add_done_callback(lambda _: self._release(loop))
+        return await asyncio.wrap_future(future)
+
+    def _release(self, loop: asyncio.AbstractEventLoop):
+        try:
+            loop.call_soon_threadsafe(self._done)
+        except RuntimeError:
+            # The loop is closed, nobody is counting any more
+            pass
+
+    def _done(self):
+        self.pending -= 1
+
+    def snapshot(self) -> dict:
+        return {"pending": self.pending, "capacity": self.capacity} | (
+            self.stats.snapshot()
+        )
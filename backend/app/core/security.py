@@ -1,38 +1,75 @@
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Annotated
 
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import settings
+from core.password_pool import PasswordPool
+from core.token_cache import TokenCache
 from api.users.models import Users
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="api/user/token")
 
 
+@lru_cache(maxsize=None)
+def get_password_pool() -> PasswordPool:
+    """Created on first use, sized by the settings of that moment"""
+    return PasswordPool(
+        settings.PASSWORD_POOL_WORKERS, settings.PASSWORD_POOL_QUEUE_SIZE
+    )
+
+
+@lru_cache(maxsize=None)
+def get_token_cache() -> TokenCache:
+    return TokenCache(settings.TOKEN_CACHE_SIZE)
+
+
+# passlib and jose are imported on first use, which keeps them (a good share
+# of the import time) off the startup path of the app and of scripts
+
+
+@lru_cache(maxsize=None)
+def pwd_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
 def hash_password(password: str):
-    return pwd_context.hash(password)
+    return pwd_context().hash(password)
 
 
 def verify_password(password: str, hashed_password: str):
-    return pwd_context.verify(password, hashed_password)
+    return pwd_context().verify(password, hashed_password)
+
+
+async def hash_password_async(password: str):
+    """hash_password on the password pool (503 when saturated)"""
+    return await get_password_pool().run(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed_password: str):
+    """verify_password on the password pool (503 when saturated)"""
+    return await get_password_pool().run(verify_password, password, hashed_password)
 
 
-def authenticate_user(username: str, password: str, db):
-    user = db.query(Users).filter(Users.username == username).first()
+async def authenticate_user(username: str, password: str, db: AsyncSession):
+    user = await db.scalar(select(Users).where(Users.username == username))
 
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
 
-def authenticate_superuser_or_user(username: str, password: str, db):
+async def authenticate_superuser_or_user(
+    username: str, password: str, db: AsyncSession
+):
     """Authenticate either superuser or regular user"""
     # Check if it's superuser first
     if (
@@ -42,7 +79,7 @@ def authenticate_superuser_or_user(username: str, password: str, db):
         return {"username": username, "id": settings.SUPERUSER_ID, "is_superuser": True}
 
     # Otherwise, authenticate regular user
-    user = authenticate_user(username, password, db)
+    user = await authenticate_user(username, password, db)
     if user:
         return {"username": user.username, "id": str(user.id), "is_superuser": False}
 
@@ -50,6 +87,12 @@ def authenticate_superuser_or_user(username: str, password: str, db):
 
 
 def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
+    cached = get_token_cache().get(token)
+    if cached is not None:
+        return cached
+
+    from jose import jwt, JWTError
+
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
         username: str = payload.get("sub")
@@ -57,7 +100,11 @@ def get_current_user(token: Annotated[str, Depends(oauth2_bearer)]):
         if username is None or user_id is None:
             raise HTTPException(status_code=401, detail="Could not validate user")
 
-        return {"username": username, "id": user_id}
+        user = {"username": username, "id": user_id}
+        # Only tokens that passed validation and carry an expiry are cached
+        if payload.get("exp") is not None:
+            get_token_cache().put(token, user, payload["exp"])
+        return user
     except JWTError:
         raise HTTPException(status_code=401, detail="Could not validate user")
 
@@ -66,6 +113,8 @@ def create_access_token(data: dict, expires_delta: timedelta = timedelta(minutes
     encode = data.copy()
     expire = datetime.utcnow() + expires_delta
     encode.update({"exp": expire})
+    from jose import jwt
+
     return jwt.encode(encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
 
 
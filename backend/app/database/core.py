@@ -1,17 +1,245 @@
-from sqlalchemy import create_engine
+import importlib
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from core.config import settings
+from core.instrumentation import instrument_engine
+from database.replica import read_only_listener, reads_from_primary
+from database.pool import (
+    PoolStats,
+    is_sqlite_memory,
+    pool_options,
+    set_sqlite_pragmas,
+    timed_pool_class,
+)
+
+# Async drivers used when ASYNC_DB_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_url(url: str) -> str:
+    """Returns the async flavour of a sync database URL"""
+    db_url = make_url(url)
+    backend = db_url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for '{backend}'")
+    return db_url.set(drivername=ASYNC_DRIVERS[backend]).render_as_string(
+        hide_password=False
+    )
+
+
+def engine_options(url: str, queue_pool: type, stats: PoolStats) -> dict:
+    db_url = make_url(url)
+    options = pool_options(db_url)
+    if not is_sqlite_memory(db_url):
+        options["poolclass"] = timed_pool_class(queue_pool, stats)
+    return options
+
+
+def apply_pragmas(sync_engine):
+    if sync_engine.dialect.name == "sqlite":
+        event.listen(sync_engine, "connect", set_sqlite_pragmas)
+
+
+sync_pool_stats = PoolStats()
+async_pool_stats = PoolStats()
+read_pool_stats = PoolStats()
+
+# The engines are created on first use, from the settings of that moment,
+# so that importing the app or a model opens and configures nothing
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """Sync engine: scripts, schema creation and tests"""
+    engine = create_engine(
+        settings.DB_URL,
+        future=True,
+        echo=False,
+        **engine_options(settings.DB_URL, QueuePool, sync_pool_stats),
+    )
+    apply_pragmas(engine)
+    instrument_engine(engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_async_db_url() -> str:
+    return settings.ASYNC_DB_URL or get_async_url(settings.DB_URL)
+
+
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """Async engine: request path"""
+    url = get_async_db_url()
+    engine = create_async_engine(
+        url, echo=False, **engine_options(url, AsyncAdaptedQueuePool, async_pool_stats)
+    )
+    apply_pragmas(engine.sync_engine)
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_read_engine() -> Optional[AsyncEngine]:
+    """Read engine: GET endpoints, when READ_DB_URL points at a replica"""
+    if not settings.READ_DB_URL:
+        return None
+    url = get_async_url(settings.READ_DB_URL)
+    engine = create_async_engine(
+        url, echo=False, **engine_options(url, AsyncAdaptedQueuePool, read_pool_stats)
+    )
+    apply_pragmas(engine.sync_engine)
+    event.listen(engine.sync_engine, "connect", read_only_listener(engine.dialect.name))
+    instrument_engine(engine.sync_engine)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_sessionmaker() -> async_sessionmaker:
+    """Sessions of the primary"""
+    return async_sessionmaker(
+        bind=get_async_engine(),
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_replica_sessionmaker() -> async_sessionmaker:
+    """Sessions of the replica, or of the primary when there is none"""
+    read_engine = get_read_engine()
+    if read_engine is None:
+        return get_sessionmaker()
+    return async_sessionmaker(
+        bind=read_engine,
+        class_=AsyncSession,
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+@lru_cache(maxsize=None)
+def get_sync_sessionmaker() -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
 
-engine = create_engine(settings.DB_URL, future=True, echo=False)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def async_session() -> AsyncSession:
+    """A new session of the primary, for code outside of a request"""
+    return get_sessionmaker()()
+
+
+# Cached in the order they must be disposed of
+ENGINE_GETTERS = (get_async_engine, get_read_engine, get_engine)
+CACHED_GETTERS = ENGINE_GETTERS + (
+    get_async_db_url,
+    get_sessionmaker,
+    get_replica_sessionmaker,
+    get_sync_sessionmaker,
+)
+
+
+def created_engines() -> list:
+    """The engines created so far, without creating the others"""
+    engines = []
+    for getter in ENGINE_GETTERS:
+        if getter.cache_info().currsize and getter() is not None:
+            engines.append(getter())
+    return engines
+
+
+async def dispose_engines():
+    """Closes the pools of the engines created so far
+
+    The next use creates new engines, from the settings of that moment.
+    """
+    for engine in created_engines():
+        if isinstance(engine, AsyncEngine):
+            await engine.dispose()
+        else:
+            engine.dispose()
+    for getter in CACHED_GETTERS:
+        getter.cache_clear()
+
 
 Base = declarative_base()
 
 
+# Modules of the INSERT constructs with on_conflict_do_update, per dialect,
+# imported on first use (the PostgreSQL one is slow to import)
+UPSERTS = {
+    "sqlite": "sqlalchemy.dialects.sqlite",
+    "postgresql": "sqlalchemy.dialects.postgresql",
+}
+
+
+def upsert(bind, table):
+    """INSERT ... ON CONFLICT for the dialect of `bind` (session or connection)"""
+    dialect = bind.get_bind().dialect if hasattr(bind, "get_bind") else bind.dialect
+    return importlib.import_module(UPSERTS[dialect.name]).insert(table)
+
+
+async def begin_write(db: AsyncSession):
+    """Opens the session's transaction for writing, before any SAVEPOINT
+
+    pysqlite only starts a transaction at the first INSERT / UPDATE /
+    DELETE, so a SAVEPOINT issued before that is the outermost transaction
+    and releasing it commits. BEGIN IMMEDIATE opens the real transaction
+    (and takes the write lock up front, instead of failing to upgrade a
+    read snapshot later); other databases already have one.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        await db.execute(text("BEGIN IMMEDIATE"))
+
+
+def pool_status() -> dict:
+    """Checkout waits and in-use connections of every engine created so far"""
+    status = {}
+    for name, getter, stats in (
+        ("async", get_async_engine, async_pool_stats),
+        ("sync", get_engine, sync_pool_stats),
+        ("read", get_read_engine, read_pool_stats),
+    ):
+        if getter.cache_info().currsize and getter() is not None:
+            status[name] = stats.snapshot(getter().pool)
+    return status
+
+
 def get_db():
-    db = SessionLocal()
+    db = get_sync_sessionmaker()()
     try:
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
+
+def read_sessionmaker() -> async_sessionmaker:
+    """The replica's sessions, unless this client must read its own writes"""
+    if reads_from_primary():
+        return get_sessionmaker()
+    return get_replica_sessionmaker()
+
+
+async def get_read_db():
+    """Session of the read-only GET endpoints (see database.replica)"""
+    async with read_sessionmaker()() as db:
+        yield db
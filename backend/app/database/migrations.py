@@ -0,0 +1,215 @@
+"""In-place schema upgrades for databases created before a model change
+
+`create_all` only creates missing tables, it never alters existing ones.
+Each migration below upgrades an existing database by one version and is
+recorded in the `schema_version` table. Run them with
+
+    python -m database.migrations
+
+or let `init_schema` do it at startup.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    name VARCHAR NOT NULL,
+    applied_at TIMESTAMP NOT NULL
+)
+"""
+
+
+def _typed_money_and_timestamps(conn: Connection):
+    """Float money -> integer minor units, String dates -> timestamps, indexes"""
+    if conn.dialect.name == "sqlite":
+        # SQLite cannot alter column types: rebuild both tables
+        conn.execute(text("""
+                CREATE TABLE accounts__new (
+                    id VARCHAR NOT NULL PRIMARY KEY,
+                    owner_id VARCHAR REFERENCES users (id),
+                    name VARCHAR,
+                    currency VARCHAR,
+                    money_minor BIGINT NOT NULL
+                )
+                """))
+        conn.execute(text("""
+                INSERT INTO accounts__new (id, owner_id, name, currency, money_minor)
+                SELECT id, owner_id, name, currency,
+                       CAST(ROUND(COALESCE(money, 0) * 100) AS INTEGER)
+                FROM accounts
+                """))
+        conn.execute(text("""
+                CREATE TABLE orders__new (
+                    id VARCHAR NOT NULL PRIMARY KEY,
+                    created_by VARCHAR REFERENCES users (id),
+                    account_id VARCHAR REFERENCES accounts (id),
+                    created_at DATETIME NOT NULL,
+                    updated_at DATETIME,
+                    description VARCHAR,
+                    order_type VARCHAR,
+                    amount_minor BIGINT NOT NULL
+                )
+                """))
+        conn.execute(text("""
+                INSERT INTO orders__new (id, created_by, account_id, created_at,
+                    updated_at, description, order_type, amount_minor)
+                SELECT id, created_by, account_id,
+                       COALESCE(NULLIF(created_at, ''), CURRENT_TIMESTAMP),
+                       NULLIF(updated_at, ''), description, order_type,
+                       CAST(ROUND(COALESCE(amount, 0) * 100) AS INTEGER)
+                FROM orders
+                """))
+        for table in ("orders", "accounts"):
+            conn.execute(text(f"DROP TABLE {table}"))
+            conn.execute(text(f"ALTER TABLE {table}__new RENAME TO {table}"))
+            conn.execute(text(f"CREATE INDEX ix_{table}_id ON {table} (id)"))
+    else:
+        conn.execute(text("ALTER TABLE accounts RENAME COLUMN money TO money_minor"))
+        conn.execute(
+            text(
+                "ALTER TABLE accounts ALTER COLUMN money_minor TYPE BIGINT "
+                "USING ROUND(COALESCE(money_minor, 0) * 100)::BIGINT"
+            )
+        )
+        conn.execute(text("ALTER TABLE accounts ALTER COLUMN money_minor SET NOT NULL"))
+        conn.execute(text("ALTER TABLE orders RENAME COLUMN amount TO amount_minor"))
+        conn.execute(
+            text(
+                "ALTER TABLE orders ALTER COLUMN amount_minor TYPE BIGINT "
+                "USING ROUND(COALESCE(amount_minor, 0) * 100)::BIGINT"
+            )
+        )
+        conn.execute(text("ALTER TABLE orders ALTER COLUMN amount_minor SET NOT NULL"))
+        conn.execute(
+            text(
+                "ALTER TABLE orders ALTER COLUMN created_at TYPE TIMESTAMP "
+                "USING COALESCE(NULLIF(created_at, ''), now()::TEXT)::TIMESTAMP"
+            )
+        )
+        conn.execute(text("ALTER TABLE orders ALTER COLUMN created_at SET NOT NULL"))
+        conn.execute(
+            text(
+                "ALTER TABLE orders ALTER COLUMN updated_at TYPE TIMESTAMP "
+                "USING NULLIF(updated_at, '')::TIMESTAMP"
+            )
+        )
+
+    conn.execute(text("CREATE INDEX ix_accounts_owner_id ON accounts (owner_id)"))
+    conn.execute(
+        text(
+            "CREATE INDEX ix_orders_account_id_created_at "
+            "ON orders (account_id, created_at)"
+        )
+    )
+    conn.execute(
+        text(
+            "CREATE INDEX ix_orders_created_by_created_at "
+            "ON orders (created_by, created_at)"
+        )
+    )
+
+
+def _balance_snapshots(conn: Connection):
+    """Daily balance snapshot table, backfilled from the existing orders"""
+    from api.accounts.models import BalanceSnapshots
+    from services.balance_history import rebuild_snapshots
+
+    BalanceSnapshots.__table__.create(conn, checkfirst=True)
+    rebuild_snapshots(conn)
+
+
+def _order_search_index(conn: Connection):
+    """Full-text index of the order descriptions (see services.search)"""
+    from services.search import install_search_index
+
+    install_search_index(conn)
+
+
+def _order_category(conn: Connection):
+    """Spending category of the orders, which budgets are scoped to"""
+    conn.execute(text("ALTER TABLE orders ADD COLUMN category VARCHAR"))
+
+
+def _order_search_index_by_id(conn: Connection):
+    """FTS5 order index keyed by orders.id instead of the rowid"""
+    from services.search import Fts5Backend, install_search_index
+
+    if conn.dialect.name != "sqlite":
+        return
+    Fts5Backend().uninstall(conn)
+    install_search_index(conn)
+
+
+# (version, name, upgrade) in the order they must run
+MIGRATIONS = [
+    (1, "typed_money_and_timestamps", _typed_money_and_timestamps),
+    (2, "balance_snapshots", _balance_snapshots),
+    (3, "order_search_index", _order_search_index),
+    (4, "order_category", _order_category),
+    (5, "order_search_index_by_id", _order_search_index_by_id),
+]
+
+
+def _applied_version(conn: Connection) -> int:
+    return conn.execute(
+        text("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    ).scalar_one()
+
+
+def _stamp(conn: Connection, version: int, name: str):
+    conn.execute(
+        text(
+            "INSERT INTO schema_version (version, name, applied_at) "
+            "VALUES (:version, :name, :applied_at)"
+        ),
+        {"version": version, "name": name, "applied_at": datetime.now()},
+    )
+
+
+def upgrade(engine: Engine) -> list:
+    """Runs the migrations newer than the database, returns their names"""
+    applied = []
+    with engine.begin() as conn:
+        conn.execute(text(SCHEMA_VERSION_DDL))
+        current = _applied_version(conn)
+
+    for version, name, migrate in MIGRATIONS:
+        if version <= current:
+            continue
+        # One transaction per migration, so a failure leaves a known version
+        with engine.begin() as conn:
+            migrate(conn)
+            _stamp(conn, version, name)
+        applied.append(name)
+    return applied
+
+
+def init_schema(engine: Engine) -> list:
+    """Creates a fresh database at the latest version or upgrades an old one"""
+    from database.core import Base
+
+    applied = []
+    if inspect(engine).has_table("orders"):
+        applied = upgrade(engine)
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(SCHEMA_VERSION_DDL))
+            for version, name, _ in MIGRATIONS:
+                _stamp(conn, version, name)
+
+    Base.metadata.create_all(bind=engine)
+    return applied
+
+
+if __name__ == "__main__":
+    import api.routes  # noqa: F401 - registers every model on Base.metadata
+    from database.core import get_engine
+
+    engine = get_engine()
+
+    for name in init_schema(engine):
+        print(f"applied {name}")
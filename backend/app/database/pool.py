@@ -0,0 +1,91 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.engine import URL
+
+from core.config import settings
+
+
+class PoolStats:
+    """Checkout wait times of one connection pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record(self, wait: float, timed_out: bool):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self, pool) -> dict:
+        with self._lock:
+            stats = {
+                "pool": type(pool).__bases__[0].__name__,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_total_ms": self.wait_total * 1000,
+                "wait_avg_ms": self.wait_total / (self.checkouts or 1) * 1000,
+                "wait_max_ms": self.wait_max * 1000,
+            }
+        if hasattr(pool, "checkedout"):
+            stats |= {
+                "size": pool.size(),
+                "in_use": pool.checkedout(),
+                "idle": pool.checkedin(),
+                "overflow": pool.overflow(),
+            }
+        return stats
+
+
+def timed_pool_class(base: type, stats: PoolStats) -> type:
+    """Subclass of pool `base` recording how long each checkout waited"""
+
+    class TimedPool(base):
+        def connect(self):
+            started = time.perf_counter()
+            timed_out = False
+            try:
+                return super().connect()
+            except exc.TimeoutError:
+                timed_out = True
+                raise
+            finally:
+                stats.record(time.perf_counter() - started, timed_out)
+
+    TimedPool.__name__ = f"Timed{base.__name__}"
+    return TimedPool
+
+
+def is_sqlite_memory(url: URL) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def pool_options(url: URL) -> dict:
+    """Pool sizing from Settings, for the pools that accept it"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if not is_sqlite_memory(url):
+        options |= {
+            "pool_size": settings.DB_POOL_SIZE,
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "pool_timeout": settings.DB_POOL_TIMEOUT,
+        }
+    return options
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Write friendly SQLite settings, applied to every new connection"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+    cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+    cursor.close()
@@ -0,0 +1,137 @@
+"""Read replica routing and read-your-writes
+
+With READ_DB_URL set, the GET endpoints take their session from the read
+engine (get_read_db). A client that has just written must see its write
+even if the replica lags behind, so ReadYourWritesMiddleware answers every
+request that committed with a short-lived cookie, and requests carrying it
+read from the primary until it expires (READ_YOUR_WRITES_SECONDS). Clients
+that drop cookies read from the replica straight away.
+
+A second SQLite file stands in for a replica locally; copy the primary
+into it (a replication "tick") with
+
+    python -m database.replica
+"""
+
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+PRIMARY_COOKIE = "read_primary"
+
+# Statement making a read engine's connections read-only, per dialect
+READ_ONLY_STATEMENTS = {
+    "sqlite": "PRAGMA query_only = ON",
+    "postgresql": "SET SESSION CHARACTERISTICS AS TRANSACTION READ ONLY",
+}
+
+
+class ReadRouting:
+    """Where the current request reads, and whether it committed"""
+
+    def __init__(self, primary: bool):
+        self.primary = primary
+        self.committed = False
+
+
+current_routing: ContextVar[Optional[ReadRouting]] = ContextVar(
+    "current_routing", default=None
+)
+
+
+def reads_from_primary() -> bool:
+    """True while the current client has to read its own recent writes"""
+    routing = current_routing.get()
+    return routing is not None and routing.primary
+
+
+@event.listens_for(Session, "after_commit")
+def _note_commit(session: Session):
+    # Read sessions never commit, every commit is a write on the primary
+    routing = current_routing.get()
+    if routing is not None:
+        routing.committed = True
+
+
+def read_only_listener(dialect_name: str):
+    """`connect` listener refusing writes on a read engine's connections"""
+    statement = READ_ONLY_STATEMENTS.get(dialect_name)
+
+    def set_read_only(dbapi_connection, connection_record):
+        if statement:
+            cursor = dbapi_connection.cursor()
+            cursor.execute(statement)
+            cursor.close()
+
+    return set_read_only
+
+
+def has_primary_cookie(scope: dict) -> bool:
+    for name, value in scope.get("headers", []):
+        if name == b"cookie" and f"{PRIMARY_COOKIE}=".encode() in value:
+            return True
+    return False
+
+
+class ReadYourWritesMiddleware:
+    """Pins a client to the primary for a while after each of its writes"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        routing = ReadRouting(primary=has_primary_cookie(scope))
+        token = current_routing.set(routing)
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and routing.committed:
+                cookie = (
+                    f"{PRIMARY_COOKIE}=1; Max-Age={settings.READ_YOUR_WRITES_SECONDS}; "
+                    "Path=/; HttpOnly; SameSite=Lax"
+                )
+                message["headers"] = [
+                    *message.get("headers", []),
+                    (b"set-cookie", cookie.encode()),
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_cookie)
+        finally:
+            current_routing.reset(token)
+
+
+def copy_sqlite(source_url: str, target_url: str):
+    """Copies one SQLite database into another with the backup API"""
+    import sqlite3
+
+    from sqlalchemy.engine import make_url
+
+    paths = [make_url(url).database for url in (source_url, target_url)]
+    if not all(paths) or ":memory:" in paths:
+        raise SystemExit("Both DB_URL and READ_DB_URL must be SQLite files")
+    source, target = sqlite3.connect(paths[0]), sqlite3.connect(paths[1])
+    try:
+        source.backup(target)
+    finally:
+        source.close()
+        target.close()
+
+
+if __name__ == "__main__":
+    from sqlalchemy.engine import make_url
+
+    if not settings.READ_DB_URL:
+        raise SystemExit("READ_DB_URL is not set")
+    if make_url(settings.READ_DB_URL).get_backend_name() != "sqlite":
+        raise SystemExit("Only a SQLite stand-in replica can be refreshed here")
+    copy_sqlite(settings.DB_URL, settings.READ_DB_URL)
+    print(f"copied {settings.DB_URL} to {settings.READ_DB_URL}")
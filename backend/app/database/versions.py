@@ -0,0 +1,12 @@
+from sqlalchemy import BigInteger, Column, String
+from database.core import Base
+
+
+class DataVersions(Base):
+    """Change counter of one user's or one account's data (see services.versions)"""
+
+    __tablename__ = "data_versions"
+
+    # "user:<id>", "account:<id>" or a shared key such as "fx"
+    key = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
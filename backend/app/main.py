@@ -1,9 +1,47 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from database.core import Base, engine
+from starlette.concurrency import run_in_threadpool
+
 from api.routes import api_router
+from core.config import settings
+from core.instrumentation import MetricsMiddleware
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Schema setup and the recurring order scheduler before the first request,
+    scheduler stop and pool cleanup after the last one"""
+    from database.core import dispose_engines, get_engine
+    from database.migrations import init_schema
+
+    if settings.INIT_SCHEMA_ON_STARTUP:
+        await run_in_threadpool(init_schema, get_engine())
+    scheduler, stop = None, asyncio.Event()
+    if settings.SCHEDULER_ENABLED:
+        from services.recurring import run_scheduler
 
-app = FastAPI()
+        scheduler = asyncio.create_task(run_scheduler(stop))
+    yield
+    stop.set()
+    if scheduler is not None:
+        await scheduler
+    await dispose_engines()
 
-Base.metadata.create_all(bind=engine)
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(router=api_router)
+
+if settings.READ_DB_URL:
+    from database.replica import ReadYourWritesMiddleware
+
+    app.add_middleware(ReadYourWritesMiddleware)
+
+if settings.METRICS_ENABLED:
+    from api.metrics.routes import router as metrics_router
+
+    app.add_middleware(MetricsMiddleware)
+    # Served outside /api, where Prometheus scrapes by default
+    app.include_router(router=metrics_router)
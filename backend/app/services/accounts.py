@@ -0,0 +1,249 @@
+import uuid
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from api.accounts.models import Accounts, BalanceSnapshots
+from api.accounts.schemas import AccountBase
+from api.budgets.models import Budgets, BudgetSpend
+from api.orders.models import Orders
+from api.recurring.models import RecurringOrders
+from api.users.models import Users
+from core.config import settings
+from core.money import from_minor, to_minor
+from core.security import is_superuser
+from services.balance_history import add_delta, clear_snapshots, record_daily_deltas
+from services.budget_spend import record_spend
+from services.events import publish
+from services.orders import apply_balance_deltas
+from services.versions import mark_changed
+
+
+async def load_recent_orders(db: AsyncSession, account_ids: list, limit: int) -> dict:
+    """Returns `{account_id: [orders]}` with the `limit` newest orders of each
+
+    One query for all accounts, ranked with a window function, instead of
+    joining (and serializing) every order of every account.
+    """
+    recent = {account_id: [] for account_id in account_ids}
+    if not account_ids or limit <= 0:
+        return recent
+
+    ranked = (
+        select(
+            Orders,
+            func.row_number()
+            .over(
+                partition_by=Orders.account_id,
+                order_by=(Orders.created_at.desc(), Orders.id.desc()),
+            )
+            .label("rank"),
+        )
+        .where(Orders.account_id.in_(account_ids))
+        .subquery()
+    )
+    order = aliased(Orders, ranked)
+    rows = await db.scalars(
+        select(order)
+        .where(ranked.c.rank <= limit)
+        .order_by(ranked.c.account_id, ranked.c.rank)
+    )
+    for db_order in rows:
+        recent[db_order.account_id].append(db_order)
+    return recent
+
+
+def account_event(db_acc: Accounts) -> dict:
+    """Payload of the account.created / account.updated events"""
+    return {
+        "id": db_acc.id,
+        "name": db_acc.name,
+        "currency": db_acc.currency,
+        "balance": from_minor(db_acc.money_minor),
+    }
+
+
+async def get_account_for_write(
+    db: AsyncSession, user: dict, account_id: str
+) -> Accounts:
+    """Loads an account the user may modify"""
+    db_acc = await db.get(Accounts, account_id)
+    if not db_acc:
+        raise HTTPException(status_code=404, detail="Account not found")
+    if not is_superuser(user) and user["id"] != db_acc.owner_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return db_acc
+
+
+async def create_account(
+    db: AsyncSession,
+    owner_id: str,
+    acc: AccountBase,
+    account_id: Optional[str] = None,
+) -> Accounts:
+    """`account_id` lets offline clients pick the id, a new uuid4 by default"""
+    db_acc = Accounts(
+        id=account_id or str(uuid.uuid4()),
+        owner_id=owner_id,
+        name=acc.name,
+        currency=acc.currency,
+        money_minor=to_minor(acc.money),
+    )
+    db.add(db_acc)
+    # The opening balance is the first entry of the balance history
+    await db.flush()
+    await record_daily_deltas(db, {(db_acc.id, date.today()): db_acc.money_minor})
+    mark_changed(db, users=[owner_id], accounts=[db_acc.id])
+    publish(db, [owner_id], "account.created", **account_event(db_acc))
+    return db_acc
+
+
+async def update_account(db: AsyncSession, db_acc: Accounts, new_acc: AccountBase):
+    """Renames the account and sets its balance, booking the change today
+
+    Only applied if the balance is still the one we read, otherwise a
+    concurrent order would be lost from the balance history.
+    """
+    old_minor, new_minor = db_acc.money_minor, to_minor(new_acc.money)
+    result = await db.execute(
+        update(Accounts)
+        .where(Accounts.id == db_acc.id, Accounts.money_minor == old_minor)
+        .values(name=new_acc.name, currency=new_acc.currency, money_minor=new_minor)
+        .execution_options(synchronize_session="evaluate")
+    )
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=409, detail="Account balance changed concurrently, retry"
+        )
+    await record_daily_deltas(db, {(db_acc.id, date.today()): new_minor - old_minor})
+    mark_changed(db, users=[db_acc.owner_id], accounts=[db_acc.id])
+    publish(db, [db_acc.owner_id], "account.updated", **account_event(db_acc))
+
+
+async def delete_orders_chunked(
+    db: AsyncSession,
+    condition,
+    chunk_size: Optional[int] = None,
+    commit_chunks: bool = True,
+) -> int:
+    """Deletes the orders matching `condition`, taking them off their balances
+
+    Set-based DELETEs of at most `chunk_size` rows, committed after every
+    full chunk so a large owner never holds the write lock for long; the
+    last chunk is left in the caller's transaction, so small deletes stay a
+    single transaction. Between chunks every balance still equals its
+    opening amount plus its remaining orders, and an interrupted delete can
+    simply be retried. Returns the number of orders deleted.
+
+    commit_chunks=False keeps every chunk in the caller's transaction, for
+    callers that must be all-or-nothing (batches).
+    """
+    chunk_size = chunk_size or settings.DELETE_CHUNK_SIZE
+    deleted = 0
+    while True:
+        chunk = select(Orders.id).where(condition).limit(chunk_size)
+        rows = (
+            await db.execute(
+                delete(Orders)
+                .where(Orders.id.in_(chunk.scalar_subquery()))
+                .returning(
+                    Orders.account_id,
+                    Orders.amount_minor,
+                    Orders.created_by,
+                    Orders.created_at,
+                    Orders.order_type,
+                    Orders.category,
+                )
+                .execution_options(synchronize_session=False)
+            )
+        ).all()
+        deltas, daily = {}, {}
+        for row in rows:
+            deltas[row.account_id] = deltas.get(row.account_id, 0) - row.amount_minor
+            add_delta(daily, row.account_id, row.created_at, -row.amount_minor)
+        await apply_balance_deltas(db, deltas)
+        await record_daily_deltas(db, daily)
+        await record_spend(
+            db,
+            (
+                (
+                    row.account_id,
+                    row.category,
+                    row.order_type,
+                    row.created_at,
+                    -row.amount_minor,
+                )
+                for row in rows
+            ),
+        )
+        mark_changed(db, users={row.created_by for row in rows})
+        deleted += len(rows)
+        if len(rows) < chunk_size:
+            return deleted
+        if commit_chunks:
+            await db.commit()
+
+
+async def reset_account(db: AsyncSession, db_account: Accounts) -> Optional[Accounts]:
+    """Deletes every order of the account and zeroes its balance"""
+    await delete_orders_chunked(db, Orders.account_id == db_account.id)
+    # Opening amount and manual edits go too: the history restarts at zero
+    await clear_snapshots(db, BalanceSnapshots.account_id == db_account.id)
+    mark_changed(db, users=[db_account.owner_id], accounts=[db_account.id])
+    publish(db, [db_account.owner_id], "account.reset", id=db_account.id)
+    return await db.scalar(
+        update(Accounts)
+        .where(Accounts.id == db_account.id)
+        .values(money_minor=0)
+        .returning(Accounts),
+        execution_options={"populate_existing": True},
+    )
+
+
+async def delete_budgets(db: AsyncSession, condition):
+    """Deletes the budgets matching `condition` and their counters"""
+    budget_ids = select(Budgets.id).where(condition)
+    await db.execute(delete(BudgetSpend).where(BudgetSpend.budget_id.in_(budget_ids)))
+    await db.execute(delete(Budgets).where(condition))
+
+
+async def delete_account(
+    db: AsyncSession, db_account: Accounts, commit_chunks: bool = True
+):
+    """Deletes the account and its orders without loading them"""
+    # First, so the scheduler books nothing more between two chunks
+    await db.execute(
+        delete(RecurringOrders).where(RecurringOrders.account_id == db_account.id)
+    )
+    # Owner-wide budgets stay, the deleted orders are taken off their counters
+    await delete_budgets(db, Budgets.account_id == db_account.id)
+    await delete_orders_chunked(
+        db, Orders.account_id == db_account.id, commit_chunks=commit_chunks
+    )
+    await clear_snapshots(db, BalanceSnapshots.account_id == db_account.id)
+    await db.execute(delete(Accounts).where(Accounts.id == db_account.id))
+    mark_changed(db, users=[db_account.owner_id], accounts=[db_account.id])
+    publish(db, [db_account.owner_id], "account.deleted", id=db_account.id)
+
+
+async def delete_user_data(db: AsyncSession, user_id: str):
+    """Deletes the user, their accounts and every order on or by them"""
+    owned_accounts = select(Accounts.id).where(Accounts.owner_id == user_id)
+    await db.execute(
+        delete(RecurringOrders).where(
+            RecurringOrders.account_id.in_(owned_accounts)
+            | (RecurringOrders.created_by == user_id)
+        )
+    )
+    await delete_budgets(db, Budgets.owner_id == user_id)
+    await delete_orders_chunked(db, Orders.account_id.in_(owned_accounts))
+    # Orders they booked on accounts they don't own (superuser moves)
+    await delete_orders_chunked(db, Orders.created_by == user_id)
+    await clear_snapshots(db, BalanceSnapshots.account_id.in_(owned_accounts))
+    await db.execute(delete(Accounts).where(Accounts.owner_id == user_id))
+    await db.execute(delete(Users).where(Users.id == user_id))
+    mark_changed(db, users=[user_id])
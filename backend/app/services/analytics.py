@@ -0,0 +1,171 @@
+"""Spending analytics computed with SQL GROUP BY and cached per user
+
+Results are cached per account owner together with the owner's data
+version (services.versions) they were computed at; a cached result is only
+served while that version is still current, so writes committed by any
+process invalidate it.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts
+from api.orders.models import Orders
+from core.config import settings
+from core.money import from_minor
+from services.versions import read_version, user_key
+
+
+class AnalyticsCache:
+    """LRU of users, each with an LRU of at most `max_keys` results"""
+
+    def __init__(self, max_users: int, max_keys: int):
+        self.max_users = max_users
+        self.max_keys = max_keys
+        # user_id -> (version, {key: value}), both least recently used first
+        self._entries: OrderedDict[str, tuple[int, OrderedDict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str, key: tuple, version: int):
+        with self._lock:
+            cached_version, values = self._entries.get(user_id, (None, {}))
+            value = values.get(key) if cached_version == version else None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(user_id)
+                values.move_to_end(key)
+            return value
+
+    def put(self, user_id: str, key: tuple, value, version: int):
+        with self._lock:
+            cached_version, values = self._entries.get(user_id, (None, {}))
+            if cached_version is not None and cached_version > version:
+                return
+            if cached_version != version:
+                values = OrderedDict()
+            values[key] = value
+            values.move_to_end(key)
+            # Every distinct range is a key: keep only the recent ones
+            while len(values) > self.max_keys:
+                values.popitem(last=False)
+            self._entries[user_id] = (version, values)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "users": len(self._entries),
+                "entries": sum(len(values) for _, values in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@lru_cache(maxsize=None)
+def get_analytics_cache() -> AnalyticsCache:
+    return AnalyticsCache(
+        settings.ANALYTICS_CACHE_USERS, settings.ANALYTICS_CACHE_KEYS_PER_USER
+    )
+
+
+def _month(db: AsyncSession, column):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime("%Y-%m", column)
+
+
+async def compute_summary(
+    db: AsyncSession,
+    owner_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    top: int,
+) -> dict:
+    scope = [Accounts.owner_id == owner_id]
+    if start is not None:
+        scope.append(Orders.created_at >= start)
+    if end is not None:
+        scope.append(Orders.created_at < end)
+
+    def grouped(*columns):
+        return (
+            select(
+                *columns,
+                func.count().label("count"),
+                func.sum(Orders.amount_minor).label("total"),
+            )
+            .select_from(Orders)
+            .join(Accounts, Accounts.id == Orders.account_id)
+            .where(*scope)
+            .group_by(*columns)
+        )
+
+    month = _month(db, Orders.created_at).label("month")
+    monthly = await db.execute(
+        grouped(month, Orders.account_id, Orders.order_type).order_by(
+            month, Orders.account_id, Orders.order_type
+        )
+    )
+    by_type = await db.execute(grouped(Orders.order_type).order_by(Orders.order_type))
+    descriptions = await db.execute(
+        grouped(Orders.description)
+        .order_by(func.count().desc(), Orders.description)
+        .limit(top)
+    )
+
+    def totals(row) -> dict:
+        return {
+            "count": row.count,
+            "total": from_minor(row.total),
+            "average": from_minor(row.total / row.count),
+        }
+
+    return {
+        "monthly": [
+            {
+                "month": row.month,
+                "account_id": row.account_id,
+                "order_type": row.order_type,
+                **totals(row),
+            }
+            for row in monthly
+        ],
+        "by_order_type": [
+            {"order_type": row.order_type, **totals(row)} for row in by_type
+        ],
+        "top_descriptions": [
+            {"description": row.description, **totals(row)} for row in descriptions
+        ],
+    }
+
+
+async def get_summary(
+    db: AsyncSession,
+    owner_id: str,
+    start: Optional[datetime],
+    end: Optional[datetime],
+    top: int,
+) -> dict:
+    key = ("summary", start, end, top)
+    # Read before computing: a write committed meanwhile leaves the result
+    # filed under the older version, where it is never served again
+    version = await read_version(db, user_key(owner_id))
+    cached = get_analytics_cache().get(owner_id, key, version)
+    if cached is not None:
+        return cached
+
+    summary = await compute_summary(db, owner_id, start, end, top)
+    get_analytics_cache().put(owner_id, key, summary, version)
+    return summary
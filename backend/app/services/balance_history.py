@@ -0,0 +1,173 @@
+"""Daily balance snapshots and the balance history served from them
+
+Every write that moves a balance also adds its amount to the snapshot row
+of the day it is dated (an order: the day of its created_at, an account
+edit: today), in the same transaction. The rows of an account therefore
+always add up to its balance, so the balance before a date range is the
+account's balance minus the rows from its first day on. A history costs
+one row per day from its start to today, however many orders the account
+has and however old it is. Existing data is backfilled with
+
+    python -m services.balance_history
+
+which rebuilds every snapshot from the orders (migration 2 runs it once).
+"""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import Date, cast, delete, func, insert, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts, BalanceSnapshots
+from api.orders.models import Orders
+from core.money import from_minor
+from database.core import upsert
+
+# Rows per multi-row upsert (3 parameters each, well under SQLite's limit)
+UPSERT_BATCH = 500
+
+
+def add_delta(deltas: dict, account_id: str, created_at: datetime, amount: int):
+    """Accumulates `amount` into `{(account_id, day): delta}`"""
+    key = (account_id, created_at.date())
+    deltas[key] = deltas.get(key, 0) + amount
+
+
+def _add_to_snapshots(bind):
+    stmt = upsert(bind, BalanceSnapshots)
+    return stmt.on_conflict_do_update(
+        index_elements=[BalanceSnapshots.account_id, BalanceSnapshots.day],
+        set_={"delta_minor": BalanceSnapshots.delta_minor + stmt.excluded.delta_minor},
+    )
+
+
+async def record_daily_deltas(db: AsyncSession, deltas: dict):
+    """Adds `{(account_id, day): delta_minor}` to the snapshot rows"""
+    rows = [
+        {"account_id": account_id, "day": day, "delta_minor": delta}
+        for (account_id, day), delta in deltas.items()
+        if delta
+    ]
+    for start in range(0, len(rows), UPSERT_BATCH):
+        await db.execute(
+            _add_to_snapshots(db).values(rows[start : start + UPSERT_BATCH])
+        )
+
+
+async def clear_snapshots(db: AsyncSession, condition):
+    """Drops the snapshots of the accounts matching `condition` on account_id"""
+    await db.execute(delete(BalanceSnapshots).where(condition))
+
+
+async def balance_history(
+    db: AsyncSession, account_id: str, start: date, end: date
+) -> list:
+    """Closing balance of every day from `start` to `end` (inclusive)
+
+    The opening balance is worked back from the current one, over the rows
+    since `start`, rather than summed over the account's whole past. One
+    statement, so that both come from the same snapshot.
+    """
+    since_start = (
+        select(func.coalesce(func.sum(BalanceSnapshots.delta_minor), 0))
+        .where(BalanceSnapshots.account_id == account_id, BalanceSnapshots.day >= start)
+        .scalar_subquery()
+    )
+    opening = await db.scalar(
+        select(Accounts.money_minor - since_start).where(Accounts.id == account_id)
+    )
+    changes = dict(
+        (
+            await db.execute(
+                select(BalanceSnapshots.day, BalanceSnapshots.delta_minor).where(
+                    BalanceSnapshots.account_id == account_id,
+                    BalanceSnapshots.day >= start,
+                    BalanceSnapshots.day <= end,
+                )
+            )
+        ).all()
+    )
+    points, balance = [], opening or 0
+    for offset in range((end - start).days + 1):
+        day = start + timedelta(days=offset)
+        balance += changes.get(day, 0)
+        points.append({"day": day, "balance": from_minor(balance)})
+    return points
+
+
+def _order_day(conn: Connection):
+    if conn.dialect.name == "sqlite":
+        return func.date(Orders.created_at)
+    return cast(Orders.created_at, Date)
+
+
+def rebuild_snapshots(conn: Connection, account_ids: Optional[list] = None) -> int:
+    """Recomputes the snapshots from the orders, returns the rows written
+
+    Orders are summed per day with one INSERT ... SELECT. Whatever part of
+    a balance the orders don't explain (its opening amount and manual
+    edits, whose dates are unknown) is booked on the account's first day.
+    """
+
+    def scope(column) -> list:
+        return [] if account_ids is None else [column.in_(account_ids)]
+
+    conn.execute(delete(BalanceSnapshots).where(*scope(BalanceSnapshots.account_id)))
+
+    day = _order_day(conn)
+    conn.execute(
+        insert(BalanceSnapshots).from_select(
+            ["account_id", "day", "delta_minor"],
+            select(Orders.account_id, day, func.sum(Orders.amount_minor))
+            .join(Accounts, Accounts.id == Orders.account_id)
+            .where(*scope(Orders.account_id))
+            .group_by(Orders.account_id, day),
+        )
+    )
+
+    explained = (
+        select(
+            BalanceSnapshots.account_id,
+            func.sum(BalanceSnapshots.delta_minor).label("total"),
+            func.min(BalanceSnapshots.day).label("first_day"),
+        )
+        .group_by(BalanceSnapshots.account_id)
+        .subquery()
+    )
+    residuals = conn.execute(
+        select(
+            Accounts.id,
+            Accounts.money_minor - func.coalesce(explained.c.total, 0),
+            explained.c.first_day,
+        )
+        .outerjoin(explained, explained.c.account_id == Accounts.id)
+        .where(
+            Accounts.money_minor != func.coalesce(explained.c.total, 0),
+            *scope(Accounts.id),
+        )
+    ).all()
+    today = date.today()
+    rows = [
+        {"account_id": account_id, "day": first_day or today, "delta_minor": residual}
+        for account_id, residual, first_day in residuals
+    ]
+    for start in range(0, len(rows), UPSERT_BATCH):
+        conn.execute(_add_to_snapshots(conn).values(rows[start : start + UPSERT_BATCH]))
+
+    return conn.execute(
+        select(func.count())
+        .select_from(BalanceSnapshots)
+        .where(*scope(BalanceSnapshots.account_id))
+    ).scalar_one()
+
+
+if __name__ == "__main__":
+    import api.routes  # noqa: F401 - registers every model on Base.metadata
+    from database.core import get_engine
+
+    engine = get_engine()
+
+    with engine.begin() as conn:
+        print(f"{rebuild_snapshots(conn)} balance snapshot rows")
@@ -0,0 +1,182 @@
+"""Account and order writes sent together, applied in one transaction
+
+Sync clients replay offline edits as one batch: one request, one token
+check, one session and one commit instead of one of each per edit. The
+operations run in order through the same service functions as the
+single-item endpoints, so they get the same checks and the same status
+codes. Atomic batches roll everything back at the first failure; the
+others wrap each operation in a SAVEPOINT, so a failed one is undone on
+its own and the rest still commit together.
+"""
+
+import uuid
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.schemas import AccountBase, AccountResponse
+from api.batch.schemas import BatchOperation
+from api.orders.schemas import OrderBase, OrderResponse
+from core.instrumentation import expect_operations
+from database.core import begin_write
+from services import accounts as accounts_service
+from services import orders as orders_service
+from services.events import pending_events
+
+
+def _client_id(operation: BatchOperation) -> Optional[str]:
+    """The id a create was given by the client, normalized"""
+    if operation.id is None:
+        return None
+    try:
+        return str(uuid.UUID(operation.id))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="id must be a UUID")
+
+
+def _target_id(operation: BatchOperation) -> str:
+    if not operation.id:
+        raise HTTPException(status_code=422, detail=f"{operation.op} needs an id")
+    return operation.id
+
+
+async def _create_account(db: AsyncSession, user: dict, operation: BatchOperation):
+    acc = AccountBase.model_validate(operation.data or {})
+    db_acc = await accounts_service.create_account(
+        db, user["id"], acc, _client_id(operation)
+    )
+    return db_acc.id, AccountResponse.model_validate(db_acc).model_dump(mode="json")
+
+
+async def _update_account(db: AsyncSession, user: dict, operation: BatchOperation):
+    acc = AccountBase.model_validate(operation.data or {})
+    db_acc = await accounts_service.get_account_for_write(
+        db, user, _target_id(operation)
+    )
+    await accounts_service.update_account(db, db_acc, acc)
+    return db_acc.id, AccountResponse.model_validate(db_acc).model_dump(mode="json")
+
+
+async def _delete_account(db: AsyncSession, user: dict, operation: BatchOperation):
+    db_acc = await accounts_service.get_account_for_write(
+        db, user, _target_id(operation)
+    )
+    # A batch must be undoable as a whole, no intermediate commits
+    await accounts_service.delete_account(db, db_acc, commit_chunks=False)
+    return db_acc.id, None
+
+
+async def _create_order(db: AsyncSession, user: dict, operation: BatchOperation):
+    order = OrderBase.model_validate(operation.data or {})
+    db_order = await orders_service.create_order(db, user, order, _client_id(operation))
+    return db_order.id, OrderResponse.model_validate(db_order).model_dump(mode="json")
+
+
+async def _update_order(db: AsyncSession, user: dict, operation: BatchOperation):
+    order = OrderBase.model_validate(operation.data or {})
+    db_order = await orders_service.update_order(db, user, _target_id(operation), order)
+    return db_order.id, OrderResponse.model_validate(db_order).model_dump(mode="json")
+
+
+async def _delete_order(db: AsyncSession, user: dict, operation: BatchOperation):
+    order_id = _target_id(operation)
+    await orders_service.delete_order(db, user, order_id)
+    return order_id, None
+
+
+HANDLERS = {
+    ("create", "account"): _create_account,
+    ("update", "account"): _update_account,
+    ("delete", "account"): _delete_account,
+    ("create", "order"): _create_order,
+    ("update", "order"): _update_order,
+    ("delete", "order"): _delete_order,
+}
+
+
+async def apply_operation(
+    db: AsyncSession, user: dict, operation: BatchOperation
+) -> tuple:
+    """Applies one operation and flushes it, returns (id, response data)"""
+    handler = HANDLERS[(operation.op, operation.resource)]
+    result = await handler(db, user, operation)
+    # Constraint violations surface here, attributed to this operation
+    await db.flush()
+    return result
+
+
+def _failure(exc: Exception) -> tuple:
+    """(status, error) of an operation that failed"""
+    if isinstance(exc, HTTPException):
+        return exc.status_code, exc.detail
+    if isinstance(exc, ValidationError):
+        return 422, exc.errors(include_url=False, include_context=False)
+    return 409, "Conflicts with existing data"
+
+
+def _summary(results: list, committed: bool) -> dict:
+    failed = sum(1 for result in results if result["status"] >= 400)
+    return {
+        "committed": committed,
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "results": results,
+    }
+
+
+def _result(
+    index: int, status: int, id_: Optional[str], data=None, error: Any = None
+) -> dict:
+    return {"index": index, "status": status, "id": id_, "data": data, "error": error}
+
+
+def _rolled_back(operations: list, results: list, failed_index: int) -> list:
+    """Results of an atomic batch undone by the failure of `failed_index`"""
+    error = f"Not applied: operation {failed_index} failed"
+    return [
+        (
+            results[index]
+            if index == failed_index
+            else _result(
+                index,
+                424,
+                results[index]["id"] if index < failed_index else operation.id,
+                error=error,
+            )
+        )
+        for index, operation in enumerate(operations)
+    ]
+
+
+async def run_batch(
+    db: AsyncSession, user: dict, operations: list, atomic: bool
+) -> dict:
+    """Applies `operations` in order and commits once, returns their results"""
+    expect_operations(len(operations))
+    await begin_write(db)
+    results = []
+    for index, operation in enumerate(operations):
+        try:
+            if atomic:
+                id_, data = await apply_operation(db, user, operation)
+            else:
+                events = len(pending_events(db))
+                async with db.begin_nested():
+                    id_, data = await apply_operation(db, user, operation)
+        except (HTTPException, ValidationError, IntegrityError) as exc:
+            if not atomic:
+                # Undone with its SAVEPOINT, so nothing to announce
+                del pending_events(db)[events:]
+            status, error = _failure(exc)
+            results.append(_result(index, status, operation.id, error=error))
+            if not atomic:
+                continue
+            await db.rollback()
+            return _summary(_rolled_back(operations, results, index), committed=False)
+        results.append(_result(index, 200, id_, data))
+
+    await db.commit()
+    return _summary(results, committed=True)
@@ -0,0 +1,267 @@
+"""Per-period spend counters of the budgets, and their reconciliation
+
+Every order write adds what it spends (the negated amount of an Expense)
+to the counter of each budget covering its account and category, for the
+period of the order's date, in the same transaction and with an atomic
+`spent = spent + :delta` upsert. Reading how much of a budget is left is
+therefore one primary key lookup, however long the history is.
+
+The counters can be rebuilt from the orders with one INSERT ... SELECT per
+period length. New budgets are backfilled that way; a budget created on
+PostgreSQL while an order is being written may miss that order (SQLite
+serializes both), which is what the reconciliation job is for:
+
+    python -m services.budget_spend [--check]
+
+recomputes every counter from the orders, reports the ones that drifted
+and, unless --check is given, rewrites the budgets they belong to.
+"""
+
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from sqlalchemy import Date, cast, delete, func, insert, select, type_coerce, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts
+from api.budgets.models import Budgets, BudgetSpend
+from api.orders.models import Orders
+from api.orders.schemas import OrderType
+from database.core import upsert
+from services.balance_history import UPSERT_BATCH
+
+PERIODS = ("weekly", "monthly", "yearly")
+
+# Start of the period containing a timestamp, per dialect
+SQLITE_PERIOD_MODIFIERS = {
+    "weekly": ("weekday 0", "-6 days"),
+    "monthly": ("start of month",),
+    "yearly": ("start of year",),
+}
+POSTGRESQL_PERIOD_UNITS = {"weekly": "week", "monthly": "month", "yearly": "year"}
+
+
+def period_start(day: date, period: str) -> date:
+    """First day of the period containing `day` (weeks start on Monday)"""
+    if period == "weekly":
+        return day - timedelta(days=day.weekday())
+    if period == "monthly":
+        return day.replace(day=1)
+    return day.replace(month=1, day=1)
+
+
+def next_period_start(start: date, period: str) -> date:
+    if period == "weekly":
+        return start + timedelta(weeks=1)
+    if period == "monthly":
+        return (start + timedelta(days=31)).replace(day=1)
+    return start.replace(year=start.year + 1)
+
+
+def spent(order_type: str, amount_minor: int) -> int:
+    """What an order spends: the negated amount of an expense, else nothing"""
+    return -amount_minor if order_type == OrderType.EXPENSE.value else 0
+
+
+def coverage(
+    account_ids: Optional[Iterable[str]] = None,
+    budget_ids: Optional[Iterable[str]] = None,
+):
+    """(budget_id, account_id, category, period) of each account a budget covers
+
+    A UNION of the account budgets and of the owner-wide budgets joined to
+    the owner's accounts, so both halves use an index.
+    """
+    columns = (Budgets.id.label("budget_id"), Budgets.category, Budgets.period)
+    own = select(*columns, Budgets.account_id.label("account_id")).where(
+        Budgets.account_id.is_not(None)
+    )
+    owner_wide = (
+        select(*columns, Accounts.id.label("account_id"))
+        .join(Accounts, Accounts.owner_id == Budgets.owner_id)
+        .where(Budgets.account_id.is_(None))
+    )
+    if account_ids is not None:
+        account_ids = list(account_ids)
+        own = own.where(Budgets.account_id.in_(account_ids))
+        owner_wide = owner_wide.where(Accounts.id.in_(account_ids))
+    if budget_ids is not None:
+        budget_ids = list(budget_ids)
+        own = own.where(Budgets.id.in_(budget_ids))
+        owner_wide = owner_wide.where(Budgets.id.in_(budget_ids))
+    return union_all(own, owner_wide)
+
+
+def _add_to_counters(bind):
+    stmt = upsert(bind, BudgetSpend)
+    return stmt.on_conflict_do_update(
+        index_elements=[BudgetSpend.budget_id, BudgetSpend.period_start],
+        set_={"spent_minor": BudgetSpend.spent_minor + stmt.excluded.spent_minor},
+    )
+
+
+async def record_spend(db: AsyncSession, orders: Iterable[tuple]):
+    """Adds the spend of `orders` to the counters of the budgets covering them
+
+    `orders` are (account_id, category, order_type, created_at, amount_minor)
+    tuples; pass the negated amount of an order that goes away. One SELECT
+    of the covering budgets, then one upsert per UPSERT_BATCH counters.
+    """
+    orders = [order for order in orders if spent(order[2], order[4])]
+    if not orders:
+        return
+    covering = {}
+    for budget_id, category, period, account_id in await db.execute(
+        coverage(account_ids={order[0] for order in orders})
+    ):
+        covering.setdefault(account_id, []).append((budget_id, category, period))
+
+    deltas = {}
+    for account_id, category, order_type, created_at, amount_minor in orders:
+        for budget_id, budget_category, period in covering.get(account_id, ()):
+            if budget_category is not None and budget_category != category:
+                continue
+            key = (budget_id, period_start(created_at.date(), period))
+            deltas[key] = deltas.get(key, 0) + spent(order_type, amount_minor)
+
+    rows = [
+        {"budget_id": budget_id, "period_start": start, "spent_minor": delta}
+        for (budget_id, start), delta in deltas.items()
+        if delta
+    ]
+    for start in range(0, len(rows), UPSERT_BATCH):
+        await db.execute(
+            _add_to_counters(db).values(rows[start : start + UPSERT_BATCH])
+        )
+
+
+async def read_spend(db: AsyncSession, keys: list) -> dict:
+    """`{(budget_id, period_start): spent_minor}` of these counters"""
+    if not keys:
+        return {}
+    budget_ids = {budget_id for budget_id, _ in keys}
+    starts = {start for _, start in keys}
+    rows = await db.execute(
+        select(
+            BudgetSpend.budget_id, BudgetSpend.period_start, BudgetSpend.spent_minor
+        ).where(
+            BudgetSpend.budget_id.in_(budget_ids),
+            BudgetSpend.period_start.in_(starts),
+        )
+    )
+    return {(budget_id, start): spent_minor for budget_id, start, spent_minor in rows}
+
+
+"""═══ REBUILD AND RECONCILIATION ═══"""
+
+
+def _period_start_sql(conn: Connection, period: str, column):
+    if conn.dialect.name == "postgresql":
+        return cast(func.date_trunc(POSTGRESQL_PERIOD_UNITS[period], column), Date)
+    # date() returns text, typed as Date so that rows read back as dates
+    return type_coerce(func.date(column, *SQLITE_PERIOD_MODIFIERS[period]), Date)
+
+
+def spend_from_orders(conn: Connection, period: str, budget_ids: Optional[list] = None):
+    """SELECT budget_id, period_start, spent_minor of the budgets of a period
+    length, summed from the orders"""
+    covered = coverage(budget_ids=budget_ids).subquery()
+    start = _period_start_sql(conn, period, Orders.created_at)
+    return (
+        select(covered.c.budget_id, start, -func.sum(Orders.amount_minor))
+        .join(Orders, Orders.account_id == covered.c.account_id)
+        .where(
+            covered.c.period == period,
+            Orders.order_type == OrderType.EXPENSE.value,
+            covered.c.category.is_(None) | (covered.c.category == Orders.category),
+        )
+        .group_by(covered.c.budget_id, start)
+    )
+
+
+def rebuild_spend(conn: Connection, budget_ids: Optional[list] = None) -> int:
+    """Recomputes the counters from the orders, returns the rows written"""
+
+    def scope() -> list:
+        return [] if budget_ids is None else [BudgetSpend.budget_id.in_(budget_ids)]
+
+    conn.execute(delete(BudgetSpend).where(*scope()))
+    for period in PERIODS:
+        conn.execute(
+            insert(BudgetSpend).from_select(
+                ["budget_id", "period_start", "spent_minor"],
+                spend_from_orders(conn, period, budget_ids),
+            )
+        )
+    return conn.execute(
+        select(func.count()).select_from(BudgetSpend).where(*scope())
+    ).scalar_one()
+
+
+def reconcile_spend(conn: Connection, fix: bool = True) -> dict:
+    """Compares every counter with the orders, rebuilds the budgets that drifted
+
+    Returns the number of budgets and counters checked and the drift as
+    [{budget_id, period_start, stored, expected}] in minor units.
+    """
+    expected = {}
+    for period in PERIODS:
+        for budget_id, start, spent_minor in conn.execute(
+            spend_from_orders(conn, period)
+        ):
+            expected[(budget_id, start)] = spent_minor
+    stored = {
+        (budget_id, start): spent_minor
+        for budget_id, start, spent_minor in conn.execute(
+            select(
+                BudgetSpend.budget_id,
+                BudgetSpend.period_start,
+                BudgetSpend.spent_minor,
+            )
+        )
+    }
+    drift = [
+        {
+            "budget_id": budget_id,
+            "period_start": start,
+            "stored": stored.get((budget_id, start), 0),
+            "expected": expected.get((budget_id, start), 0),
+        }
+        for budget_id, start in sorted(expected.keys() | stored.keys())
+        if stored.get((budget_id, start), 0) != expected.get((budget_id, start), 0)
+    ]
+    if fix and drift:
+        rebuild_spend(conn, sorted({row["budget_id"] for row in drift}))
+    return {
+        "budgets": conn.execute(select(func.count()).select_from(Budgets)).scalar_one(),
+        "counters": len(stored),
+        "drift": drift,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import api.routes  # noqa: F401 - registers every model on Base.metadata
+    from database.core import get_engine
+
+    engine = get_engine()
+
+    parser = argparse.ArgumentParser(description="Reconcile the budget counters")
+    parser.add_argument(
+        "--check", action="store_true", help="report the drift, rewrite nothing"
+    )
+    args = parser.parse_args()
+    with engine.begin() as conn:
+        report = reconcile_spend(conn, fix=not args.check)
+    for row in report["drift"]:
+        print(
+            f"{row['budget_id']} {row['period_start']}: "
+            f"stored {row['stored']}, expected {row['expected']}"
+        )
+    print(
+        f"{report['budgets']} budgets, {report['counters']} counters, "
+        f"{len(report['drift'])} drifted"
+        + ("" if args.check or not report["drift"] else ", rebuilt")
+    )
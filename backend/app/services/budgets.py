@@ -0,0 +1,179 @@
+"""Budgets: definitions, status and reconciliation
+
+The status of a budget is read from its spend counter for the period (see
+services.budget_spend), so listing every budget of a user costs two
+queries whatever the number of orders behind them.
+"""
+
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.budgets.models import Budgets
+from api.budgets.schemas import BudgetBase
+from core.config import settings
+from core.money import from_minor, to_minor
+from core.security import is_superuser
+from database.core import begin_write
+from services.accounts import delete_budgets, get_account_for_write
+from services.budget_spend import (
+    next_period_start,
+    period_start,
+    read_spend,
+    rebuild_spend,
+    reconcile_spend,
+)
+
+logger = logging.getLogger(__name__)
+
+
+async def get_budget(db: AsyncSession, user: dict, budget_id: str) -> Budgets:
+    """Loads a budget of the user's (any, for the superuser)"""
+    budget = await db.get(Budgets, budget_id)
+    if not budget:
+        raise HTTPException(status_code=404, detail="Budget not found")
+    if not is_superuser(user) and user["id"] != budget.owner_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return budget
+
+
+async def _budget_owner(db: AsyncSession, user: dict, data: BudgetBase) -> str:
+    """An account budget belongs to the account's owner"""
+    if data.account_id is None:
+        return user["id"]
+    return (await get_account_for_write(db, user, data.account_id)).owner_id
+
+
+async def _backfill(db: AsyncSession, budget_id: str):
+    """Counts the orders already booked in the budget's scope"""
+    await db.flush()
+    await db.run_sync(lambda session: rebuild_spend(session.connection(), [budget_id]))
+
+
+async def create_budget(db: AsyncSession, user: dict, data: BudgetBase) -> Budgets:
+    # SQLite: no order can be written between the backfill and the commit
+    await begin_write(db)
+    budget = Budgets(
+        id=str(uuid.uuid4()),
+        owner_id=await _budget_owner(db, user, data),
+        account_id=data.account_id,
+        category=data.category,
+        name=data.name,
+        period=data.period,
+        limit_minor=to_minor(data.limit),
+        created_at=datetime.now(),
+    )
+    db.add(budget)
+    await _backfill(db, budget.id)
+    return budget
+
+
+async def update_budget(
+    db: AsyncSession, user: dict, budget_id: str, data: BudgetBase
+) -> Budgets:
+    """Renames, resizes or rescopes a budget; a new scope is recounted"""
+    await begin_write(db)
+    budget = await get_budget(db, user, budget_id)
+    rescoped = (budget.account_id, budget.category, budget.period) != (
+        data.account_id,
+        data.category,
+        data.period,
+    )
+    if data.account_id != budget.account_id and data.account_id is not None:
+        budget.owner_id = await _budget_owner(db, user, data)
+    budget.account_id = data.account_id
+    budget.category = data.category
+    budget.name = data.name
+    budget.period = data.period
+    budget.limit_minor = to_minor(data.limit)
+    if rescoped:
+        await _backfill(db, budget.id)
+    return budget
+
+
+async def delete_budget(db: AsyncSession, user: dict, budget_id: str):
+    budget = await get_budget(db, user, budget_id)
+    await delete_budgets(db, Budgets.id == budget.id)
+
+
+"""═══ STATUS ═══"""
+
+
+def budget_status(budget: Budgets, start: date, spent_minor: int) -> dict:
+    return {
+        "id": budget.id,
+        "owner_id": budget.owner_id,
+        "account_id": budget.account_id,
+        "category": budget.category,
+        "name": budget.name,
+        "period": budget.period,
+        "limit": from_minor(budget.limit_minor),
+        "created_at": budget.created_at,
+        "period_start": start,
+        "period_end": next_period_start(start, budget.period) - timedelta(days=1),
+        "spent": from_minor(spent_minor),
+        "remaining": from_minor(budget.limit_minor - spent_minor),
+    }
+
+
+async def budget_statuses(db: AsyncSession, budgets: list, day: date) -> list:
+    """Status of each budget in its period containing `day`, one query"""
+    starts = [period_start(day, budget.period) for budget in budgets]
+    spend = await read_spend(
+        db, [(budget.id, start) for budget, start in zip(budgets, starts)]
+    )
+    return [
+        budget_status(budget, start, spend.get((budget.id, start), 0))
+        for budget, start in zip(budgets, starts)
+    ]
+
+
+async def user_budgets(db: AsyncSession, owner_id: str) -> list:
+    return (
+        await db.scalars(
+            select(Budgets)
+            .where(Budgets.owner_id == owner_id)
+            .order_by(Budgets.created_at, Budgets.id)
+        )
+    ).all()
+
+
+"""═══ RECONCILIATION ═══"""
+
+
+async def reconcile(db: AsyncSession, fix: bool) -> dict:
+    """Checks every counter against the orders and commits the rebuilt ones"""
+    started = time.perf_counter()
+    await begin_write(db)
+    report = await db.run_sync(
+        lambda session: reconcile_spend(session.connection(), fix)
+    )
+    await db.commit()
+    drift = report["drift"]
+    if drift:
+        logger.warning(
+            "%d budget counters drifted from the orders%s",
+            len(drift),
+            ", rebuilt" if fix else "",
+        )
+    return {
+        "budgets": report["budgets"],
+        "counters": report["counters"],
+        "drifted": len(drift),
+        "drift": [
+            {
+                **row,
+                "stored": from_minor(row["stored"]),
+                "expected": from_minor(row["expected"]),
+            }
+            for row in drift[: settings.BUDGET_DRIFT_REPORT_MAX]
+        ],
+        "drift_truncated": len(drift) > settings.BUDGET_DRIFT_REPORT_MAX,
+        "rebuilt": fix and bool(drift),
+        "elapsed_seconds": round(time.perf_counter() - started, 3),
+    }
@@ -0,0 +1,168 @@
+"""Live updates: committed writes fanned out to Server-Sent Events streams
+
+Write paths queue compact delta events on their session (`publish`), and
+the broker delivers them once the transaction commits, to the streams of
+every user the change concerns; a rollback drops them. Each event is
+serialized once, whatever the number of subscribers.
+
+Every subscriber has a bounded queue. Publishing never waits on a slow
+client: when its queue is full, the queued events are replaced by a single
+"resync" event telling the client to refetch what it shows. An idle
+subscriber is one queue and one parked coroutine, no database connection.
+
+The broker is in-process: with several workers, a stream only receives
+the writes handled by its own worker, so clients should still refetch on
+(re)connect and on "resync".
+"""
+
+import asyncio
+import json
+from collections import defaultdict
+from functools import lru_cache
+from typing import Iterable, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+RESYNC = "resync"
+
+
+def frame(event_type: str, payload: dict) -> str:
+    """One SSE message"""
+    data = json.dumps(payload, default=str, separators=(",", ":"))
+    return f"event: {event_type}\ndata: {data}\n\n"
+
+
+RESYNC_FRAME = frame(RESYNC, {"reason": "too many events, refetch"})
+
+
+class Subscription:
+    def __init__(self, user_id: str, queue_size: int):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+
+class EventBroker:
+    """Per-user fan-out of SSE frames to bounded subscriber queues
+
+    Only touched from the event loop thread (the session hooks run in
+    SQLAlchemy's greenlets on that thread), so it needs no lock.
+    """
+
+    def __init__(self, queue_size: int, max_subscribers: int):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = defaultdict(set)
+        self.count = 0
+        self.published = 0
+        self.delivered = 0
+        self.resyncs = 0
+
+    def check_capacity(self):
+        if self.count >= self.max_subscribers:
+            raise HTTPException(
+                status_code=503, detail="Too many event streams, retry later"
+            )
+
+    def subscribe(self, user_id: str) -> Subscription:
+        self.check_capacity()
+        subscription = Subscription(user_id, self.queue_size)
+        self._subscribers[user_id].add(subscription)
+        self.count += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        subscribers = self._subscribers.get(subscription.user_id)
+        if subscribers is None or subscription not in subscribers:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.user_id]
+        self.count -= 1
+
+    def publish(self, user_ids: Iterable[str], message: str):
+        self.published += 1
+        for user_id in user_ids:
+            for subscription in self._subscribers.get(user_id, ()):
+                self._deliver(subscription, message)
+
+    def _deliver(self, subscription: Subscription, message: str):
+        queue = subscription.queue
+        try:
+            queue.put_nowait(message)
+            self.delivered += 1
+            return
+        except asyncio.QueueFull:
+            pass
+        # Backpressure: the client is too slow, collapse its backlog
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(RESYNC_FRAME)
+        self.resyncs += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "subscribers": self.count,
+            "users": len(self._subscribers),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": self.resyncs,
+        }
+
+
+@lru_cache(maxsize=None)
+def get_broker() -> EventBroker:
+    return EventBroker(settings.EVENTS_QUEUE_SIZE, settings.EVENTS_MAX_SUBSCRIBERS)
+
+
+def pending_events(db: AsyncSession) -> list:
+    """Events of the session's transaction, delivered when it commits"""
+    return db.info.setdefault("pending_events", [])
+
+
+def publish(
+    db: AsyncSession, user_ids: Iterable[Optional[str]], event_type: str, **payload
+):
+    """Sends `event_type` to these users' streams if the transaction commits"""
+    users = {user_id for user_id in user_ids if user_id is not None}
+    if users:
+        pending_events(db).append((users, frame(event_type, payload)))
+
+
+@event.listens_for(Session, "after_commit")
+def _deliver_committed(session: Session):
+    for users, message in session.info.pop("pending_events", ()):
+        get_broker().publish(users, message)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_rolled_back(session: Session):
+    session.info.pop("pending_events", None)
+
+
+async def stream(user_id: str):
+    """SSE body of the user's events, with keep-alive comments while idle
+
+    The subscription is taken on the first step of the body, so a client
+    gone before the response starts never holds one; the finally block
+    drops it however the stream ends.
+    """
+    subscription = get_broker().subscribe(user_id)
+    try:
+        yield f"retry: {settings.EVENTS_RETRY_MS}\n: connected\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(
+                    subscription.queue.get(), settings.EVENTS_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                # Keeps proxies from closing the idle connection
+                yield ": keep-alive\n\n"
+                continue
+            yield message
+    finally:
+        get_broker().unsubscribe(subscription)
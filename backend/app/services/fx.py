@@ -0,0 +1,223 @@
+"""Exchange rates loaded from a local file and kept in memory as NumPy arrays
+
+Rates come from a JSON or CSV file (no network access), e.g. a saved
+central bank or openexchangerates.org dump:
+
+    {"base": "USD", "date": "2026-10-01", "rates": {"EUR": 0.92, "XPF": 110.2}}
+
+    currency,rate
+    EUR,0.92
+
+A load replaces the whole table and bumps the shared "fx" version
+(services.versions); every process reloads its cached RateTable when it
+sees a newer version. From the command line:
+
+    python -m services.fx rates.json [--as-of 2026-10-01]
+"""
+
+import csv
+import io
+import json
+import math
+import re
+import threading
+from datetime import date
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.fx.models import FxRates
+from services.versions import mark_changed, read_version
+
+FX_KEY = "fx"
+CURRENCY_CODE = re.compile(r"^[A-Z]{3}$")
+
+
+def normalize_currency(currency: Optional[str]) -> str:
+    return (currency or "").strip().upper()
+
+
+"""═══ RATE FILES ═══"""
+
+
+def _check_rate(currency: str, rate, where: str) -> tuple:
+    code = normalize_currency(currency)
+    if not CURRENCY_CODE.match(code):
+        raise ValueError(f"{where}: invalid currency code {currency!r}")
+    try:
+        value = float(rate)
+    except (TypeError, ValueError):
+        raise ValueError(f"{where}: invalid rate {rate!r}") from None
+    if not math.isfinite(value) or value <= 0:
+        raise ValueError(f"{where}: rate must be a positive number")
+    return code, value
+
+
+def parse_rates(text: str, format: str) -> tuple:
+    """Parses a rate file, returns ({currency: units_per_base}, as_of or None)
+
+    JSON: {"base", "date", "rates": {currency: rate}} (base and date are
+    optional) or a bare {currency: rate} object. CSV: a header row with
+    `currency` and `rate` (or `units_per_base`) columns.
+    """
+    rates, as_of = {}, None
+    if format == "json":
+        try:
+            document = json.loads(text)
+        except ValueError:
+            raise ValueError("Invalid JSON") from None
+        if not isinstance(document, dict):
+            raise ValueError("Expected a JSON object")
+        if isinstance(document.get("rates"), dict):
+            if document.get("date"):
+                try:
+                    as_of = date.fromisoformat(str(document["date"]))
+                except ValueError:
+                    raise ValueError("Invalid date, expected YYYY-MM-DD") from None
+            if document.get("base"):
+                code, _ = _check_rate(document["base"], 1, "base")
+                rates[code] = 1.0
+            document = document["rates"]
+        for currency, rate in document.items():
+            code, value = _check_rate(currency, rate, currency)
+            rates[code] = value
+    else:
+        reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        rate_column = columns.get("rate") or columns.get("units_per_base")
+        if "currency" not in columns or rate_column is None:
+            raise ValueError("CSV needs a header with currency and rate columns")
+        for row in reader:
+            line = f"line {reader.line_num}"
+            code, value = _check_rate(row[columns["currency"]], row[rate_column], line)
+            rates[code] = value
+    if not rates:
+        raise ValueError("No rates in the file")
+    return rates, as_of
+
+
+async def store_rates(db: AsyncSession, rates: dict, as_of: date) -> int:
+    """Replaces the rate table, the caller commits"""
+    await db.execute(delete(FxRates))
+    await db.execute(
+        insert(FxRates),
+        [
+            {"currency": code, "units_per_base": value, "as_of": as_of}
+            for code, value in sorted(rates.items())
+        ],
+    )
+    mark_changed(db, keys=[FX_KEY])
+    return len(rates)
+
+
+"""═══ RATE CACHE ═══"""
+
+
+class RateTable:
+    """One loaded rate table: currency codes and their rates as an array"""
+
+    def __init__(self, rows: list, version: int):
+        # numpy is imported on first use, it is slow to import
+        import numpy as np
+
+        self.version = version
+        self.currencies = [row.currency for row in rows]
+        self.index = {code: i for i, code in enumerate(self.currencies)}
+        # A trailing NaN, which index -1 (unknown currency) selects
+        self.units = np.array(
+            [row.units_per_base for row in rows] + [np.nan], dtype=np.float64
+        )
+        self.as_of = max((row.as_of for row in rows), default=None)
+
+    def factors(self, currencies: list, target: str):
+        """Multiplier converting each currency to `target`, NaN without a rate"""
+        import numpy as np
+
+        codes = [normalize_currency(c) for c in currencies]
+        target = normalize_currency(target)
+        idx = np.fromiter(
+            (self.index.get(code, -1) for code in codes),
+            dtype=np.intp,
+            count=len(codes),
+        )
+        factors = self.units[self.index.get(target, -1)] / self.units[idx]
+        factors[np.array([code == target for code in codes], dtype=bool)] = 1.0
+        return factors
+
+    def to_list(self) -> list:
+        return [
+            {"currency": code, "units_per_base": float(units), "as_of": self.as_of}
+            for code, units in zip(self.currencies, self.units[:-1])
+        ]
+
+
+class RateCache:
+    """The latest RateTable read by this process, valid for one fx version"""
+
+    def __init__(self):
+        self._table: Optional[RateTable] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: int) -> Optional[RateTable]:
+        with self._lock:
+            if self._table is not None and self._table.version == version:
+                self.hits += 1
+                return self._table
+            self.misses += 1
+            return None
+
+    def put(self, table: RateTable):
+        with self._lock:
+            if self._table is None or self._table.version <= table.version:
+                self._table = table
+
+
+rate_cache = RateCache()
+
+
+async def get_rates(db: AsyncSession) -> RateTable:
+    """Current rate table, one primary key lookup when it is cached"""
+    version = await read_version(db, FX_KEY)
+    table = rate_cache.get(version)
+    if table is None:
+        rows = (await db.execute(select(FxRates).order_by(FxRates.currency))).scalars()
+        table = RateTable(list(rows), version)
+        rate_cache.put(table)
+    return table
+
+
+if __name__ == "__main__":
+    import argparse
+    import asyncio
+
+    import api.routes  # noqa: F401 - registers every model on Base.metadata
+    from database.core import async_session, get_engine
+    from database.migrations import init_schema
+
+    parser = argparse.ArgumentParser(description="Load exchange rates from a file")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=("json", "csv"), default=None)
+    parser.add_argument("--as-of", type=date.fromisoformat, default=None)
+    args = parser.parse_args()
+
+    with open(args.path, encoding="utf-8") as rate_file:
+        text = rate_file.read()
+    file_format = args.format or ("csv" if args.path.endswith(".csv") else "json")
+    try:
+        parsed, file_date = parse_rates(text, file_format)
+    except ValueError as exc:
+        raise SystemExit(f"{args.path}: {exc}")
+
+    async def load():
+        async with async_session() as db:
+            count = await store_rates(
+                db, parsed, args.as_of or file_date or date.today()
+            )
+            await db.commit()
+        return count
+
+    init_schema(get_engine())
+    print(f"{asyncio.run(load())} exchange rates loaded")
@@ -0,0 +1,167 @@
+"""Net worth across currencies: SQL aggregates, converted with NumPy
+
+Balances are summed per currency by the database, and the history per
+(currency, day) from the daily balance snapshots (services.balance_history).
+The conversion then works on whole arrays: one rate factor per currency,
+a cumulative sum over the days and one matrix product, instead of Python
+arithmetic per account or order. Amounts are converted at the currently
+loaded rates (services.fx), history included.
+"""
+
+from datetime import date, timedelta
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts, BalanceSnapshots
+from core.money import from_minor
+from services.analytics import get_analytics_cache
+from services.fx import RateTable, get_rates, normalize_currency
+from services.versions import read_version, user_key
+
+
+def _currency_column():
+    return func.upper(func.trim(func.coalesce(Accounts.currency, "")))
+
+
+async def _history(
+    db: AsyncSession,
+    scope: list,
+    current: dict,
+    rates: RateTable,
+    target: str,
+    start: date,
+    end: date,
+) -> list:
+    """Daily totals from `start` to `end`, `current`: {currency: balance now}
+
+    Snapshot rows add up to the balances, so the opening balance of `start`
+    is the current balance minus every row from `start` on: one scan of the
+    rows since `start` instead of another over the rows before it.
+    """
+    import numpy as np
+
+    currency = _currency_column().label("currency")
+    changes = (
+        await db.execute(
+            select(
+                currency, BalanceSnapshots.day, func.sum(BalanceSnapshots.delta_minor)
+            )
+            .select_from(BalanceSnapshots)
+            .join(Accounts, Accounts.id == BalanceSnapshots.account_id)
+            .where(BalanceSnapshots.day >= start, *scope)
+            .group_by(currency, BalanceSnapshots.day)
+        )
+    ).all()
+
+    currencies = sorted(current.keys() | {row[0] for row in changes})
+    index = {code: i for i, code in enumerate(currencies)}
+    days = (end - start).days + 1
+
+    # Deltas per [currency, day]; the last column collects the days after end
+    deltas = np.zeros((len(currencies), days + 1), dtype=np.float64)
+    if changes:
+        rows = np.array(
+            [(index[code], (day - start).days, delta) for code, day, delta in changes],
+            dtype=np.int64,
+        )
+        np.add.at(deltas, (rows[:, 0], np.minimum(rows[:, 1], days)), rows[:, 2])
+    opening = np.array([current.get(code, 0) for code in currencies], dtype=np.float64)
+    opening -= deltas.sum(axis=1)
+    balances = opening[:, None] + np.cumsum(deltas[:, :days], axis=1)
+
+    factors = np.nan_to_num(rates.factors(currencies, target), nan=0.0)
+    totals = np.rint(factors @ balances)
+    return [
+        {"day": start + timedelta(days=offset), "total": from_minor(int(total))}
+        for offset, total in enumerate(totals)
+    ]
+
+
+async def compute_net_worth(
+    db: AsyncSession,
+    owner_id: Optional[str],
+    target: str,
+    start: Optional[date],
+    end: date,
+    rates: RateTable,
+) -> dict:
+    """Net worth of one owner's accounts (every account when owner_id is None)"""
+    # Imported on first use rather than with the app, it is slow to import
+    import numpy as np
+
+    target = normalize_currency(target)
+    scope = [] if owner_id is None else [Accounts.owner_id == owner_id]
+    currency = _currency_column().label("currency")
+    rows = (
+        await db.execute(
+            select(currency, func.count(), func.sum(Accounts.money_minor))
+            .where(*scope)
+            .group_by(currency)
+        )
+    ).all()
+
+    currencies = [row[0] for row in rows]
+    balances = np.array([row[2] or 0 for row in rows], dtype=np.float64)
+    converted = np.rint(balances * rates.factors(currencies, target))
+    known = ~np.isnan(converted)
+    total = converted[known].sum()
+
+    by_currency = [
+        {
+            "currency": code,
+            "accounts": row[1],
+            "balance": from_minor(row[2]),
+            "converted": from_minor(int(value)) if has_rate else None,
+            "share": round(value / total, 4) if has_rate and total else None,
+        }
+        for code, row, value, has_rate in zip(currencies, rows, converted, known)
+    ]
+    by_currency.sort(key=lambda line: -(line["converted"] or 0))
+
+    return {
+        "currency": target,
+        "total": from_minor(int(total)),
+        "rates_as_of": rates.as_of,
+        "by_currency": by_currency,
+        "missing_rates": sorted(
+            code for code, has_rate in zip(currencies, known) if not has_rate
+        ),
+        "history": (
+            []
+            if start is None
+            else await _history(
+                db,
+                scope,
+                {code: row[2] or 0 for code, row in zip(currencies, rows)},
+                rates,
+                target,
+                start,
+                end,
+            )
+        ),
+    }
+
+
+async def get_net_worth(
+    db: AsyncSession,
+    owner_id: Optional[str],
+    target: str,
+    start: Optional[date],
+    end: date,
+) -> dict:
+    """compute_net_worth, cached per owner like the spending analytics"""
+    rates = await get_rates(db)
+    if owner_id is None:
+        return await compute_net_worth(db, None, target, start, end, rates)
+
+    key = ("net_worth", normalize_currency(target), start, end, rates.version)
+    version = await read_version(db, user_key(owner_id))
+    cached = get_analytics_cache().get(owner_id, key, version)
+    if cached is not None:
+        return cached
+
+    result = await compute_net_worth(db, owner_id, target, start, end, rates)
+    get_analytics_cache().put(owner_id, key, result, version)
+    return result
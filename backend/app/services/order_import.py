@@ -0,0 +1,196 @@
+"""Bulk order import from a streamed CSV or NDJSON body
+
+The upload is parsed line by line as it arrives, validated against
+OrderImportRow and inserted in batches, so memory depends on the batch size
+and not on the size of the file.
+
+Each batch is committed on its own, with one aggregated balance update per
+account: the write lock is held while a batch is written, not while the
+rest of the upload arrives. An import that fails or is cut off midway
+keeps the batches committed before that point; the report's `inserted`
+and `batches` count what was committed.
+"""
+
+import codecs
+import csv
+import json
+import time
+import uuid
+from datetime import datetime
+from typing import AsyncIterator
+
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts
+from api.orders.schemas import OrderImportRow
+from core.config import settings
+from core.money import to_minor
+from core.security import is_superuser
+from database.core import begin_write
+from services.orders import apply_balance_deltas, insert_order_rows
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Splits a byte stream into decoded lines without buffering all of it"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_csv_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple]:
+    """Yields (line_number, record) from CSV lines with a header row"""
+    header = None
+    record, start = "", 0
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        record = f"{record}\n{line}" if record else line
+        start = start or line_number
+        # An odd number of quotes means a quoted field continues on next line
+        if record.count('"') % 2:
+            continue
+        values = next(csv.reader([record])) if record.strip() else None
+        record_start, record, start = start, "", 0
+        if values is None:
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        # Empty cells fall back to the schema defaults
+        yield record_start, {
+            key: value for key, value in zip(header, values) if value != ""
+        }
+    if record:
+        yield start, {"__error__": "Unterminated quoted field"}
+
+
+async def iter_ndjson_records(lines: AsyncIterator[str]) -> AsyncIterator[tuple]:
+    """Yields (line_number, record) from NDJSON lines"""
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = {"__error__": "Invalid JSON"}
+        if not isinstance(record, dict):
+            record = {"__error__": "Expected a JSON object"}
+        yield line_number, record
+
+
+class ImportReport:
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.rows = 0
+        self.inserted = 0
+        self.batches = 0
+        self.failed = 0
+        self.errors = []
+
+    def error(self, line: int, detail):
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "detail": detail})
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "batches": self.batches,
+            "failed": self.failed,
+            "errors": sorted(self.errors, key=lambda e: e["line"]),
+            "errors_truncated": self.failed > len(self.errors),
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed) if elapsed else None,
+        }
+
+
+class AccountAccess:
+    """Which account ids the importing user may book orders on
+
+    Resolved again in every batch's transaction: an account deleted
+    between two batches gets no more orders.
+    """
+
+    def __init__(self, db: AsyncSession, user: dict):
+        self.db = db
+        self.owner_id = None if is_superuser(user) else user["id"]
+
+    async def resolve(self, account_ids: set) -> set:
+        stmt = select(Accounts.id).where(Accounts.id.in_(account_ids))
+        if self.owner_id is not None:
+            stmt = stmt.where(Accounts.owner_id == self.owner_id)
+        return set((await self.db.scalars(stmt)).all())
+
+
+async def import_orders(
+    db: AsyncSession, user: dict, records: AsyncIterator[tuple], batch_size: int
+) -> dict:
+    """Validates, inserts and commits the records batch by batch
+
+    Returns the import report.
+    """
+    report = ImportReport()
+    access = AccountAccess(db, user)
+    batch = []
+
+    async def flush():
+        await begin_write(db)
+        allowed = await access.resolve({row["account_id"] for _, row in batch})
+        rows = []
+        for line, row in batch:
+            if row["account_id"] in allowed:
+                rows.append(row)
+            else:
+                report.error(line, "Account not found")
+        await apply_balance_deltas(db, await insert_order_rows(db, rows))
+        await db.commit()
+        report.inserted += len(rows)
+        report.batches += 1
+        batch.clear()
+
+    now = datetime.now()
+    async for line, record in records:
+        report.rows += 1
+        if "__error__" in record:
+            report.error(line, record["__error__"])
+            continue
+        try:
+            order = OrderImportRow.model_validate(record)
+        except ValidationError as exc:
+            report.error(line, exc.errors(include_url=False, include_input=False))
+            continue
+
+        batch.append(
+            (
+                line,
+                {
+                    "id": str(uuid.uuid4()),
+                    "created_by": user["id"],
+                    "created_at": order.created_at or now,
+                    "account_id": order.account_id,
+                    "description": order.description,
+                    "order_type": order.order_type.value,
+                    "category": order.category,
+                    "amount_minor": to_minor(order.amount),
+                },
+            )
+        )
+        if len(batch) >= batch_size:
+            await flush()
+
+    if batch:
+        await flush()
+    return report.summary()
@@ -0,0 +1,279 @@
+"""Order writes and the account balance they move
+
+Balances are changed with a single `UPDATE ... SET money_minor = money_minor
++ :delta` so concurrent writers on one account never lose an update, and
+order rows are only rewritten if they still hold the values the deltas were
+computed from. None of these functions commit: the caller owns the
+transaction.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts
+from api.orders.models import Orders
+from api.orders.schemas import OrderBase
+from core.money import from_minor, to_minor
+from core.security import is_superuser
+from services.balance_history import add_delta, record_daily_deltas
+from services.budget_spend import record_spend
+from services.events import publish
+from services.versions import mark_changed
+
+
+async def apply_balance_delta(
+    db: AsyncSession, account_id: str, delta: int, owner_id: Optional[str] = None
+) -> Optional[str]:
+    """Adds `delta` minor units to an account, returns its owner id
+
+    Returns None when the account does not exist (or is not owned by
+    `owner_id` when one is given), in which case nothing was changed.
+    """
+    stmt = (
+        update(Accounts)
+        .where(Accounts.id == account_id)
+        .values(money_minor=Accounts.money_minor + delta)
+        .returning(Accounts.owner_id, Accounts.money_minor)
+        .execution_options(synchronize_session=False)
+    )
+    if owner_id is not None:
+        stmt = stmt.where(Accounts.owner_id == owner_id)
+    row = (await db.execute(stmt)).first()
+    if row is None:
+        return None
+    # Every order write moves a balance, so this is where they are noticed
+    account_owner_id, balance_minor = row
+    mark_changed(db, users=[account_owner_id], accounts=[account_id])
+    publish(
+        db,
+        [account_owner_id],
+        "account.balance",
+        account_id=account_id,
+        balance=from_minor(balance_minor),
+        delta=from_minor(delta),
+    )
+    return account_owner_id
+
+
+async def apply_balance_deltas(db: AsyncSession, deltas: dict):
+    """One aggregated balance update per account of `{account_id: delta}`"""
+    for account_id, delta in deltas.items():
+        await apply_balance_delta(db, account_id, delta)
+
+
+async def insert_order_rows(
+    db: AsyncSession, rows: list, event_type: str = "orders.imported"
+) -> dict:
+    """Bulk inserts order rows (executemany), returns their per-account deltas
+
+    The balances are not touched: callers apply the deltas, per batch or
+    aggregated over several, with apply_balance_deltas.
+    """
+    if not rows:
+        return {}
+    await db.execute(insert(Orders), rows)
+    creators = {row["created_by"] for row in rows}
+    mark_changed(db, users=creators)
+    publish(
+        db,
+        creators,
+        event_type,
+        count=len(rows),
+        account_ids=sorted({row["account_id"] for row in rows}),
+    )
+    deltas, daily = {}, {}
+    for row in rows:
+        deltas[row["account_id"]] = (
+            deltas.get(row["account_id"], 0) + row["amount_minor"]
+        )
+        add_delta(daily, row["account_id"], row["created_at"], row["amount_minor"])
+    await record_daily_deltas(db, daily)
+    await record_spend(
+        db,
+        (
+            (
+                row["account_id"],
+                row.get("category"),
+                row["order_type"],
+                row["created_at"],
+                row["amount_minor"],
+            )
+            for row in rows
+        ),
+    )
+    return deltas
+
+
+def order_event(db_order: Orders) -> dict:
+    """Payload of the order.* events"""
+    return {
+        "id": db_order.id,
+        "account_id": db_order.account_id,
+        "created_by": db_order.created_by,
+        "description": db_order.description,
+        "order_type": db_order.order_type,
+        "category": db_order.category,
+        "amount": from_minor(db_order.amount_minor),
+        "created_at": db_order.created_at,
+    }
+
+
+def spend_entry(db_order: Orders, amount_minor: int) -> tuple:
+    """The order as record_spend takes it, with `amount_minor` as its amount"""
+    return (
+        db_order.account_id,
+        db_order.category,
+        db_order.order_type,
+        db_order.created_at,
+        amount_minor,
+    )
+
+
+def _account_owner_filter(user: dict) -> Optional[str]:
+    """Regular users may only book orders on their own accounts"""
+    return None if is_superuser(user) else user["id"]
+
+
+async def get_order_for_write(db: AsyncSession, user: dict, order_id: str) -> Orders:
+    """Loads (and locks, where supported) an order the user may modify"""
+    db_order = await db.scalar(
+        select(Orders).where(Orders.id == order_id).with_for_update()
+    )
+    if not db_order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    if not is_superuser(user) and user["id"] != db_order.created_by:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return db_order
+
+
+async def create_order(
+    db: AsyncSession, user: dict, order: OrderBase, order_id: Optional[str] = None
+) -> Orders:
+    """`order_id` lets offline clients pick the id, a new uuid4 by default"""
+    db_order = Orders(
+        id=order_id or str(uuid.uuid4()),
+        created_by=user["id"],
+        created_at=datetime.now(),
+        account_id=order.account_id,
+        description=order.description,
+        order_type=order.order_type.value,
+        category=order.category,
+        amount_minor=to_minor(order.amount),
+    )
+    owner_id = await apply_balance_delta(
+        db, order.account_id, db_order.amount_minor, _account_owner_filter(user)
+    )
+    if owner_id is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+
+    db.add(db_order)
+    mark_changed(db, users=[db_order.created_by])
+    publish(
+        db, {owner_id, db_order.created_by}, "order.created", **order_event(db_order)
+    )
+    await record_daily_deltas(
+        db, {(db_order.account_id, db_order.created_at.date()): db_order.amount_minor}
+    )
+    await record_spend(db, [spend_entry(db_order, db_order.amount_minor)])
+    return db_order
+
+
+async def _write_order_row(db: AsyncSession, db_order: Orders, stmt):
+    """Applies `stmt` only if the order still has the values we read
+
+    The balance and budget deltas are computed from the order as loaded, so
+    a concurrent writer that changed (or deleted) it in between must make us
+    fail instead of booking the same change twice.
+    """
+    result = await db.execute(
+        stmt.where(
+            Orders.id == db_order.id,
+            Orders.account_id == db_order.account_id,
+            Orders.amount_minor == db_order.amount_minor,
+            Orders.order_type == db_order.order_type,
+            (
+                Orders.category.is_(None)
+                if db_order.category is None
+                else Orders.category == db_order.category
+            ),
+        ).execution_options(synchronize_session="evaluate")
+    )
+    if result.rowcount != 1:
+        raise HTTPException(
+            status_code=409, detail="Order was modified concurrently, retry"
+        )
+    mark_changed(db, users=[db_order.created_by])
+
+
+async def update_order(
+    db: AsyncSession, user: dict, order_id: str, new_order: OrderBase
+) -> Orders:
+    db_order = await get_order_for_write(db, user, order_id)
+    old_account_id, old_amount = db_order.account_id, db_order.amount_minor
+    old_spend = spend_entry(db_order, -old_amount)
+    new_amount = to_minor(new_order.amount)
+
+    await _write_order_row(
+        db,
+        db_order,
+        update(Orders).values(
+            updated_at=datetime.now(),
+            description=new_order.description,
+            order_type=new_order.order_type.value,
+            category=new_order.category,
+            amount_minor=new_amount,
+            account_id=new_order.account_id,
+        ),
+    )
+
+    if new_order.account_id == old_account_id:
+        owners = {
+            await apply_balance_delta(db, old_account_id, new_amount - old_amount)
+        }
+    else:
+        # Moving the order: an inaccessible target account aborts the
+        # transaction before anything is committed
+        owner_id = await apply_balance_delta(
+            db, new_order.account_id, new_amount, _account_owner_filter(user)
+        )
+        if owner_id is None:
+            raise HTTPException(status_code=404, detail="Account not found")
+        owners = {owner_id, await apply_balance_delta(db, old_account_id, -old_amount)}
+    publish(
+        db,
+        owners | {db_order.created_by},
+        "order.updated",
+        previous_account_id=old_account_id,
+        **order_event(db_order),
+    )
+
+    daily = {}
+    add_delta(daily, old_account_id, db_order.created_at, -old_amount)
+    add_delta(daily, new_order.account_id, db_order.created_at, new_amount)
+    await record_daily_deltas(db, daily)
+    await record_spend(db, [old_spend, spend_entry(db_order, new_amount)])
+    return db_order
+
+
+async def delete_order(db: AsyncSession, user: dict, order_id: str):
+    db_order = await get_order_for_write(db, user, order_id)
+    await _write_order_row(db, db_order, delete(Orders))
+    owner_id = await apply_balance_delta(
+        db, db_order.account_id, -db_order.amount_minor
+    )
+    publish(
+        db,
+        {owner_id, db_order.created_by},
+        "order.deleted",
+        id=db_order.id,
+        account_id=db_order.account_id,
+    )
+    await record_daily_deltas(
+        db, {(db_order.account_id, db_order.created_at.date()): -db_order.amount_minor}
+    )
+    await record_spend(db, [spend_entry(db_order, -db_order.amount_minor)])
@@ -0,0 +1,253 @@
+"""Recurring orders: definitions and the scheduler that books them
+
+The scheduler runs in every worker (started by the app's lifespan). Each
+tick books the due occurrences of up to SCHEDULER_BATCH_SIZE definitions
+per transaction: one executemany INSERT of the orders, one balance update
+per account and one executemany UPDATE moving each definition's
+next_index / next_run past what was booked. A restart or a crash can
+only lose a whole transaction, never book part of one, so nothing is
+booked twice or skipped. Several workers are kept apart in three ways:
+
+- the due definitions are locked (FOR UPDATE SKIP LOCKED on PostgreSQL,
+  BEGIN IMMEDIATE on SQLite)
+- the UPDATE only advances rows still at the next_index that was read
+- order ids are uuid5(definition id, occurrence index), so booking the
+  same occurrence twice fails on the primary key
+
+After downtime a tick books every missed occurrence, at most
+SCHEDULER_MAX_OCCURRENCES per definition per transaction, and ticks
+again straight away while work is left.
+"""
+
+import asyncio
+import calendar
+import logging
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts
+from api.recurring.models import RecurringOrders
+from api.recurring.schemas import RecurringOrderBase, RecurringOrderUpdate
+from core.config import settings
+from core.money import to_minor
+from core.security import is_superuser
+from database.core import async_session, begin_write
+from services.accounts import get_account_for_write
+from services.orders import apply_balance_deltas, insert_order_rows
+
+logger = logging.getLogger(__name__)
+
+# Namespace of the occurrence order ids
+OCCURRENCE_NAMESPACE = uuid.UUID("0b6a3c2e-7f0d-4e0c-9a55-5d1f6f3e2a41")
+
+
+def occurrence(start: date, frequency: str, every: int, index: int) -> date:
+    """Day of occurrence `index` (0 is `start`)"""
+    step = every * index
+    if frequency == "daily":
+        return start + timedelta(days=step)
+    if frequency == "weekly":
+        return start + timedelta(weeks=step)
+    months = start.month - 1 + step * (12 if frequency == "yearly" else 1)
+    year, month = start.year + months // 12, months % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def occurrence_day(definition: RecurringOrders, index: int) -> Optional[date]:
+    """Day of occurrence `index`, None past the end date"""
+    day = occurrence(
+        definition.start_date, definition.frequency, definition.every, index
+    )
+    if definition.end_date is not None and day > definition.end_date:
+        return None
+    return day
+
+
+def occurrence_id(definition_id: str, index: int) -> str:
+    return str(uuid.uuid5(OCCURRENCE_NAMESPACE, f"{definition_id}:{index}"))
+
+
+def due_occurrences(definition: RecurringOrders, today: date, limit: int) -> tuple:
+    """([(index, day)] due by `today`, at most `limit`), next index, next run"""
+    due = []
+    # From the index: next_run is only what the due lookup goes by
+    index = definition.next_index
+    day = occurrence_day(definition, index)
+    while day is not None and day <= today and len(due) < limit:
+        due.append((index, day))
+        index += 1
+        day = occurrence_day(definition, index)
+    return due, index, day
+
+
+"""═══ DEFINITIONS ═══"""
+
+
+def _check_end_date(start_date: date, end_date: Optional[date]):
+    if end_date is not None and end_date < start_date:
+        raise HTTPException(
+            status_code=400, detail="end_date must not be before start_date"
+        )
+
+
+async def get_definition(
+    db: AsyncSession, user: dict, definition_id: str
+) -> RecurringOrders:
+    """Loads a definition of the user's (any, for the superuser)"""
+    definition = await db.get(RecurringOrders, definition_id)
+    if not definition:
+        raise HTTPException(status_code=404, detail="Recurring order not found")
+    if not is_superuser(user) and user["id"] != definition.created_by:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return definition
+
+
+async def create_definition(
+    db: AsyncSession, user: dict, data: RecurringOrderBase
+) -> RecurringOrders:
+    await get_account_for_write(db, user, data.account_id)
+    _check_end_date(data.start_date, data.end_date)
+    definition = RecurringOrders(
+        id=str(uuid.uuid4()),
+        created_by=user["id"],
+        account_id=data.account_id,
+        description=data.description,
+        order_type=data.order_type.value,
+        amount_minor=to_minor(data.amount),
+        frequency=data.frequency,
+        every=data.every,
+        start_date=data.start_date,
+        end_date=data.end_date,
+        next_index=0,
+        created_at=datetime.now(),
+    )
+    definition.next_run = occurrence_day(definition, 0)
+    db.add(definition)
+    return definition
+
+
+async def update_definition(
+    db: AsyncSession, user: dict, definition_id: str, data: RecurringOrderUpdate
+) -> RecurringOrders:
+    """Changes what future occurrences book; booked orders are left alone"""
+    definition = await get_definition(db, user, definition_id)
+    if data.account_id != definition.account_id:
+        await get_account_for_write(db, user, data.account_id)
+    _check_end_date(definition.start_date, data.end_date)
+    definition.account_id = data.account_id
+    definition.description = data.description
+    definition.order_type = data.order_type.value
+    definition.amount_minor = to_minor(data.amount)
+    definition.end_date = data.end_date
+    # A new end date may end (or revive) the schedule
+    definition.next_run = occurrence_day(definition, definition.next_index)
+    return definition
+
+
+"""═══ SCHEDULER ═══"""
+
+
+async def book_due(db: AsyncSession, today: date) -> tuple:
+    """Books one batch of due occurrences and commits, returns (booked, more)
+
+    `more` is True when due occurrences were left for another batch.
+    """
+    await begin_write(db)
+    definitions = (
+        await db.scalars(
+            select(RecurringOrders)
+            .join(Accounts, Accounts.id == RecurringOrders.account_id)
+            .where(RecurringOrders.next_run <= today)
+            .order_by(RecurringOrders.next_run, RecurringOrders.id)
+            .limit(settings.SCHEDULER_BATCH_SIZE)
+            .with_for_update(skip_locked=True, of=RecurringOrders)
+        )
+    ).all()
+    if not definitions:
+        await db.rollback()
+        return 0, False
+
+    rows, claims = [], []
+    more = len(definitions) == settings.SCHEDULER_BATCH_SIZE
+    for definition in definitions:
+        due, next_index, next_run = due_occurrences(
+            definition, today, settings.SCHEDULER_MAX_OCCURRENCES
+        )
+        more = more or (next_run is not None and next_run <= today)
+        claims.append(
+            {
+                "b_id": definition.id,
+                "b_seen": definition.next_index,
+                "b_index": next_index,
+                "b_run": next_run,
+            }
+        )
+        rows.extend(
+            {
+                "id": occurrence_id(definition.id, index),
+                "created_by": definition.created_by,
+                "created_at": datetime.combine(day, datetime.min.time()),
+                "account_id": definition.account_id,
+                "description": definition.description,
+                "order_type": definition.order_type,
+                "amount_minor": definition.amount_minor,
+            }
+            for index, day in due
+        )
+
+    table = RecurringOrders.__table__
+    claimed = await db.execute(
+        update(table)
+        .where(
+            table.c.id == bindparam("b_id"), table.c.next_index == bindparam("b_seen")
+        )
+        .values(next_index=bindparam("b_index"), next_run=bindparam("b_run")),
+        claims,
+    )
+    # -1: the driver does not count executemany rows, the locks still hold
+    if 0 <= claimed.rowcount < len(claims):
+        await db.rollback()
+        logger.warning("Recurring orders booked concurrently, batch skipped")
+        return 0, True
+
+    deltas = await insert_order_rows(db, rows, "orders.recurring")
+    await apply_balance_deltas(db, deltas)
+    await db.commit()
+    return len(rows), more
+
+
+async def run_due(today: Optional[date] = None) -> int:
+    """Books every due occurrence, one transaction per batch"""
+    booked, more = 0, True
+    while more:
+        async with async_session() as db:
+            count, more = await book_due(db, today or date.today())
+        booked += count
+    return booked
+
+
+async def run_scheduler(stop: asyncio.Event):
+    """Ticks every SCHEDULER_INTERVAL_SECONDS until `stop` is set"""
+    while not stop.is_set():
+        try:
+            started = time.perf_counter()
+            booked = await run_due()
+            if booked:
+                logger.info(
+                    "Booked %d recurring orders in %.2f s",
+                    booked,
+                    time.perf_counter() - started,
+                )
+        except Exception:
+            # A failed batch is rolled back as a whole, the next tick retries
+            logger.exception("Recurring order tick failed")
+        try:
+            await asyncio.wait_for(stop.wait(), settings.SCHEDULER_INTERVAL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
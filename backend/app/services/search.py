@@ -0,0 +1,281 @@
+"""Ranked full-text search over order descriptions
+
+The index lives in the database and is kept in sync by the database
+itself, so every write path (single orders, imports, chunked deletes)
+updates it in the same transaction:
+
+- SQLite: an FTS5 table of the descriptions (plus account and owner
+  tokens, so scoped searches stay inside the index) maintained by
+  triggers, ranked with bm25()
+- PostgreSQL: a GIN index on to_tsvector('simple', description), ranked
+  with ts_rank()
+- anything else: an unranked LIKE scan
+
+SEARCH_BACKEND picks one explicitly. The index is created with the orders
+table (and by migrations 3 and 5 for older databases); rebuild it with
+
+    python -m services.search
+
+after switching backends.
+"""
+
+import re
+from typing import Optional
+
+from sqlalchemy import column, event, func, literal, literal_column, select, table
+from sqlalchemy import text, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.accounts.models import Accounts
+from api.orders.models import Orders
+from core.config import settings
+from core.pagination import decode_cursor, encode_cursor
+
+# Words of a query beyond this are ignored
+MAX_TERMS = 16
+
+
+def search_terms(query: str) -> list:
+    """Lower-cased words of a user query, stripped of any search syntax"""
+    return re.findall(r"\w+", query.lower())[:MAX_TERMS]
+
+
+def scope_token(prefix: str, id_: str) -> str:
+    """One index token standing for an account ("a") or an owner ("o")"""
+    return prefix + id_.replace("-", "")
+
+
+class SearchBackend:
+    name = "like"
+
+    def install(self, conn: Connection):
+        """Creates the index and whatever keeps it in sync"""
+
+    def uninstall(self, conn: Connection):
+        """Drops the index and its triggers, if they exist"""
+
+    def rebuild(self, conn: Connection):
+        """Re-indexes every order"""
+
+    def match(
+        self,
+        stmt,
+        terms: list,
+        owner_id: Optional[str],
+        account_id: Optional[str],
+    ):
+        """Restricts a select of Orders (joined to Accounts), returns (stmt, rank)
+
+        Every term must match a word prefix; lower ranks are better matches.
+        """
+        stmt = self.scope(stmt, owner_id, account_id)
+        for term in terms:
+            escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            stmt = stmt.where(Orders.description.ilike(f"%{escaped}%", escape="\\"))
+        return stmt, literal(0.0)
+
+    def scope(self, stmt, owner_id: Optional[str], account_id: Optional[str]):
+        if owner_id is not None:
+            stmt = stmt.where(Accounts.owner_id == owner_id)
+        if account_id is not None:
+            stmt = stmt.where(Orders.account_id == account_id)
+        return stmt
+
+
+class Fts5Backend(SearchBackend):
+    """FTS5 table holding the order ids, filled by triggers
+
+    Rows carry orders.id rather than orders.rowid, which a VACUUM may
+    renumber since the orders are keyed by a string. Besides the
+    description, each row indexes its account and owner as tokens (see
+    scope_token), so a user's search intersects posting lists inside the
+    index instead of ranking everyone's matches and filtering. The ids are
+    not indexed: the triggers find an order's row through its account
+    token, among the account's orders only.
+    """
+
+    name = "fts5"
+
+    # Scope tokens of the order `alias` (new / old / a table alias)
+    SCOPE = (
+        "'a' || replace({0}.account_id, '-', '') || ' o' || replace(coalesce("
+        "(SELECT owner_id FROM accounts WHERE accounts.id = {0}.account_id), ''"
+        "), '-', '')"
+    )
+    # Deletes the row of the order `old`, looked up among its account's rows
+    DELETE = (
+        "DELETE FROM orders_fts WHERE rowid IN ("
+        "SELECT rowid FROM orders_fts WHERE orders_fts MATCH "
+        "'scope : \"a' || replace(old.account_id, '-', '') || '\"' "
+        "AND order_id = old.id)"
+    )
+    DDL = (
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS orders_fts USING fts5(
+            order_id UNINDEXED,
+            description,
+            scope,
+            tokenize='unicode61 remove_diacritics 2'
+        )
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_insert AFTER INSERT ON orders BEGIN
+            INSERT INTO orders_fts (order_id, description, scope)
+            VALUES (new.id, new.description, {SCOPE.format("new")});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_delete AFTER DELETE ON orders BEGIN
+            {DELETE};
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS orders_fts_update
+        AFTER UPDATE OF description, account_id ON orders BEGIN
+            {DELETE};
+            INSERT INTO orders_fts (order_id, description, scope)
+            VALUES (new.id, new.description, {SCOPE.format("new")});
+        END
+        """,
+    )
+
+    def install(self, conn: Connection):
+        for statement in self.DDL:
+            conn.execute(text(statement))
+
+    def uninstall(self, conn: Connection):
+        for trigger in ("insert", "delete", "update"):
+            conn.execute(text(f"DROP TRIGGER IF EXISTS orders_fts_{trigger}"))
+        conn.execute(text("DROP TABLE IF EXISTS orders_fts"))
+
+    def rebuild(self, conn: Connection):
+        conn.execute(text("DELETE FROM orders_fts"))
+        conn.execute(
+            text(
+                "INSERT INTO orders_fts (order_id, description, scope) "
+                f"SELECT o.id, o.description, {self.SCOPE.format('o')} FROM orders o"
+            )
+        )
+
+    def match(
+        self,
+        stmt,
+        terms: list,
+        owner_id: Optional[str],
+        account_id: Optional[str],
+    ):
+        fts = table("orders_fts", column("order_id"))
+        expression = " AND ".join(f'description : "{term}"*' for term in terms)
+        if owner_id is not None:
+            expression += f' AND scope : "{scope_token("o", owner_id)}"'
+        if account_id is not None:
+            expression += f' AND scope : "{scope_token("a", account_id)}"'
+        stmt = stmt.join(fts, fts.c.order_id == Orders.id).where(
+            literal_column("orders_fts").op("MATCH")(expression)
+        )
+        # Rank on the description alone: one weight per column
+        return stmt, func.bm25(literal_column("orders_fts"), 0.0, 1.0, 0.0)
+
+
+class PostgresBackend(SearchBackend):
+    name = "postgres"
+
+    # Inlined, not bound, so the planner matches the expression index
+    DOCUMENT = "to_tsvector('simple', coalesce(orders.description, ''))"
+
+    def install(self, conn: Connection):
+        conn.execute(
+            text(
+                "CREATE INDEX IF NOT EXISTS ix_orders_description_fts "
+                f"ON orders USING gin (({self.DOCUMENT}))"
+            )
+        )
+
+    def rebuild(self, conn: Connection):
+        conn.execute(text("REINDEX INDEX ix_orders_description_fts"))
+
+    def match(
+        self,
+        stmt,
+        terms: list,
+        owner_id: Optional[str],
+        account_id: Optional[str],
+    ):
+        document = literal_column(self.DOCUMENT)
+        query = func.to_tsquery(
+            literal_column("'simple'"), " & ".join(f"{term}:*" for term in terms)
+        )
+        stmt = self.scope(stmt, owner_id, account_id).where(document.op("@@")(query))
+        return stmt, -func.ts_rank(document, query)
+
+
+BACKENDS = {
+    backend.name: backend for backend in (Fts5Backend, PostgresBackend, SearchBackend)
+}
+DEFAULT_BACKENDS = {"sqlite": "fts5", "postgresql": "postgres"}
+
+
+def get_backend(dialect_name: str) -> SearchBackend:
+    name = settings.SEARCH_BACKEND
+    if name == "auto":
+        name = DEFAULT_BACKENDS.get(dialect_name, "like")
+    return BACKENDS[name]()
+
+
+@event.listens_for(Orders.__table__, "after_create")
+def _install_with_orders(target, conn: Connection, **kw):
+    get_backend(conn.dialect.name).install(conn)
+
+
+def install_search_index(conn: Connection):
+    """Creates the index of the configured backend and fills it"""
+    backend = get_backend(conn.dialect.name)
+    backend.install(conn)
+    backend.rebuild(conn)
+
+
+async def search_orders(
+    db: AsyncSession,
+    query: str,
+    owner_id: Optional[str],
+    account_id: Optional[str],
+    cursor: Optional[str],
+    limit: int,
+) -> tuple:
+    """Returns ([(order, rank)], next_cursor), best matches first
+
+    Searches the orders of `owner_id`'s accounts and/or of `account_id`
+    (everything when both are None). Pages are keyset on (rank, id), so
+    writes between two pages may shift the ranks of later matches.
+    """
+    backend = get_backend(db.get_bind().dialect.name)
+    stmt = select(Orders.id.label("order_id")).join(
+        Accounts, Accounts.id == Orders.account_id
+    )
+    stmt, rank = backend.match(stmt, search_terms(query), owner_id, account_id)
+    ranked = stmt.add_columns(rank.label("rank")).subquery()
+
+    keys = [ranked.c.rank, ranked.c.order_id]
+    stmt = select(Orders, ranked.c.rank).join(ranked, ranked.c.order_id == Orders.id)
+    if cursor:
+        stmt = stmt.where(tuple_(*keys) > tuple_(*decode_cursor(cursor, keys)))
+    rows = (await db.execute(stmt.order_by(*keys).limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        order, last_rank = rows[-1]
+        next_cursor = encode_cursor([last_rank, order.id])
+    return [(order, rank) for order, rank in rows], next_cursor
+
+
+if __name__ == "__main__":
+    import api.routes  # noqa: F401 - registers every model on Base.metadata
+    from database.core import get_engine
+
+    engine = get_engine()
+
+    with engine.begin() as conn:
+        install_search_index(conn)
+    print(f"rebuilt the {get_backend(engine.dialect.name).name} search index")
@@ -0,0 +1,145 @@
+"""Per-user and per-account version counters, and the ETags built on them
+
+Write paths only mark what they changed (`mark_changed`); the marked
+counters are incremented with one upsert right before the transaction
+commits, so a version always moves together with the data it covers. Reads
+turn the counter into an ETag and answer a matching If-None-Match with 304
+after a single primary key lookup, without touching the order tables.
+
+A user's counter covers everything listed for them: their accounts (and
+the orders and balances in them) and the orders they created. Shared data
+gets a key of its own (e.g. "fx" for the exchange rates).
+"""
+
+import hashlib
+import hmac
+from typing import Iterable
+
+from fastapi import Depends, HTTPException, Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from api.accounts.models import Accounts
+from core.config import settings
+from core.security import check_resource_access, get_current_user
+from database.core import get_read_db, upsert
+from database.versions import DataVersions
+
+
+def user_key(user_id: str) -> str:
+    return f"user:{user_id}"
+
+
+def account_key(account_id: str) -> str:
+    return f"account:{account_id}"
+
+
+def mark_changed(
+    db: AsyncSession,
+    users: Iterable[str] = (),
+    accounts: Iterable[str] = (),
+    keys: Iterable[str] = (),
+):
+    """Bumps these users', accounts' and other keys' versions on commit"""
+    changed = db.info.setdefault("changed_versions", set())
+    changed.update(user_key(user_id) for user_id in users if user_id is not None)
+    changed.update(account_key(a) for a in accounts if a is not None)
+    changed.update(keys)
+
+
+@event.listens_for(Session, "before_commit")
+def _bump_marked(session: Session):
+    keys = session.info.pop("changed_versions", None)
+    if not keys:
+        return
+    session.execute(
+        upsert(session, DataVersions)
+        .values([{"key": key, "version": 1} for key in sorted(keys)])
+        .on_conflict_do_update(
+            index_elements=[DataVersions.key],
+            set_={"version": DataVersions.version + 1},
+        )
+    )
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_rolled_back(session: Session):
+    session.info.pop("changed_versions", None)
+
+
+async def read_version(db: AsyncSession, key: str) -> int:
+    """Committed version of `key`, 0 until its first write"""
+    version = await db.scalar(
+        select(DataVersions.version).where(DataVersions.key == key)
+    )
+    return version or 0
+
+
+def make_etag(key: str, version: int, user: dict, request: Request) -> str:
+    """Weak ETag of one user's view of `key` at `version`
+
+    Keyed with SECRET_KEY so nobody can derive the tag of someone else's
+    data (and learn how often it changes) from the ids alone.
+    """
+    scope = f"{key}:{version}:{user['id']}:{request.url.path}?{request.url.query}"
+    digest = hmac.new(settings.SECRET_KEY.encode(), scope.encode(), hashlib.sha256)
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+
+def etag_matches(etag: str, if_none_match: str) -> bool:
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # Weak comparison, as required for If-None-Match
+    return "*" in tags or etag.removeprefix("W/") in [
+        tag.removeprefix("W/") for tag in tags
+    ]
+
+
+async def conditional_get(
+    request: Request, response: Response, db: AsyncSession, key: str, user: dict
+):
+    """Raises 304 when the client's copy is current, else sets the ETag
+
+    Call it before reading any data: the version is read first, so data
+    committed in between can only make the tag look older than the body,
+    which costs a refetch, never a missed update.
+    """
+    etag = make_etag(key, await read_version(db, key), user, request)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(etag, if_none_match):
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+
+
+async def user_etag(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    user: dict = Depends(get_current_user),
+):
+    """Conditional GET of a listing covered by the caller's own version"""
+    await conditional_get(request, response, db, user_key(user["id"]), user)
+
+
+async def account_etag(
+    account_id: str,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    user: dict = Depends(get_current_user),
+):
+    """Conditional GET of one account's data (`account_id` path parameter)
+
+    Checks access first, or a 304 (`If-None-Match: *` matches any tag)
+    would answer for someone else's account or one that does not exist.
+    Only the owner is read, not the account, whose data must not be older
+    than its version.
+    """
+    account = (
+        await db.execute(select(Accounts.owner_id).where(Accounts.id == account_id))
+    ).first()
+    if account is None:
+        raise HTTPException(status_code=404, detail="Account not found")
+    check_resource_access(user, account.owner_id, "account")
+    await conditional_get(request, response, db, account_key(account_id), user)
@@ -0,0 +1,46 @@
+"""Test setup: settings that need no .env and a throwaway SQLite database
+
+cd backend/app && python -m pytest
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+# Tests import the app's modules the way the app does (core, database, ...)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+# Set before any app module reads the settings; variables already set win
+os.environ.update(
+    {
+        "SECRET_KEY": os.environ.get("SECRET_KEY", "test-secret-key"),
+        "ALGORITHM": os.environ.get("ALGORITHM", "HS256"),
+        "SUPERUSER_USERNAME": os.environ.get("SUPERUSER_USERNAME", "admin"),
+        "SUPERUSER_PASSWORD": os.environ.get("SUPERUSER_PASSWORD", "adminpass"),
+        "SUPERUSER_ID": os.environ.get("SUPERUSER_ID", "admin-id"),
+        # Tests book recurring orders themselves when they need to
+        "SCHEDULER_ENABLED": "false",
+        # Never the development database, see the db_url fixture
+        "DB_URL": f"sqlite:///{Path(tempfile.mkdtemp()) / 'unused.db'}",
+    }
+)
+for name in ("ASYNC_DB_URL", "READ_DB_URL"):
+    os.environ.pop(name, None)
+
+
+@pytest.fixture
+def db_url(tmp_path, monkeypatch):
+    """DB_URL of an empty SQLite file; engines are created for it on first use"""
+    from core.config import get_settings
+    from database.core import dispose_engines
+
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+    monkeypatch.setenv("DB_URL", url)
+    get_settings.cache_clear()
+    yield url
+    asyncio.run(dispose_engines())
+    get_settings.cache_clear()
@@ -0,0 +1,60 @@
+"""Projections and the orders cap apply to every account representation"""
+
+import asyncio
+import json
+
+import httpx
+
+
+async def documents() -> dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            # Listing every account needs the superuser
+            user = {"username": "admin", "password": "adminpass"}
+            token = (await c.post("/api/user/token", data=user)).json()
+            auth = {"Authorization": f"Bearer {token['access_token']}"}
+            await c.post(
+                "/api/account/", json={"name": "Main", "money": 10}, headers=auth
+            )
+            account_id = (await c.get("/api/account/", headers=auth)).json()[0]["id"]
+            for amount in range(4):
+                await c.post(
+                    "/api/order/",
+                    json={
+                        "account_id": account_id,
+                        "order_type": "Add",
+                        "amount": amount,
+                    },
+                    headers=auth,
+                )
+
+            results = {}
+            for query in ("", "?fields=money", "?fields=money,orders&orders_limit=2"):
+                r = await c.get(f"/api/account/{account_id}{query}", headers=auth)
+                results[("detail", query)] = r.json()
+            for query in ("&include_orders=true&orders_limit=2", "&fields=name"):
+                r = await c.get(f"/api/account/all?format=ndjson{query}", headers=auth)
+                results[("ndjson", query)] = [
+                    json.loads(line) for line in r.text.splitlines()
+                ]
+            return results
+
+
+def test_projections_and_orders_cap(db_url):
+    results = asyncio.run(documents())
+
+    assert "orders" in results[("detail", "")]
+    # A projection embeds the orders only when it names them
+    assert set(results[("detail", "?fields=money")]) == {"money"}
+    detail = results[("detail", "?fields=money,orders&orders_limit=2")]
+    assert set(detail) == {"money", "orders"}
+    assert len(detail["orders"]) == 2
+
+    capped = results[("ndjson", "&include_orders=true&orders_limit=2")]
+    assert [len(account["orders"]) for account in capped] == [2]
+    assert [set(account) for account in results[("ndjson", "&fields=name")]] == [
+        {"name"}
+    ]
@@ -0,0 +1,44 @@
+from services.analytics import AnalyticsCache
+
+
+def test_results_per_user_are_capped():
+    cache = AnalyticsCache(max_users=10, max_keys=3)
+    for start in range(100):
+        cache.put("user", ("summary", start), {"start": start}, version=1)
+
+    assert cache.snapshot()["entries"] == 3
+    assert cache.get("user", ("summary", 0), 1) is None
+    assert cache.get("user", ("summary", 99), 1) == {"start": 99}
+
+
+def test_least_recently_read_result_is_evicted_first():
+    cache = AnalyticsCache(max_users=10, max_keys=2)
+    cache.put("user", "a", 1, version=1)
+    cache.put("user", "b", 2, version=1)
+    assert cache.get("user", "a", 1) == 1
+    cache.put("user", "c", 3, version=1)
+
+    assert cache.get("user", "b", 1) is None
+    assert cache.get("user", "a", 1) == 1
+    assert cache.get("user", "c", 1) == 3
+
+
+def test_a_new_version_drops_the_user_results():
+    cache = AnalyticsCache(max_users=10, max_keys=2)
+    cache.put("user", "a", 1, version=1)
+    cache.put("user", "b", 2, version=2)
+
+    assert cache.get("user", "a", 2) is None
+    assert cache.get("user", "b", 2) == 2
+    # A result computed at an older version never replaces newer ones
+    cache.put("user", "a", 1, version=1)
+    assert cache.get("user", "a", 2) is None
+
+
+def test_users_are_capped():
+    cache = AnalyticsCache(max_users=2, max_keys=2)
+    for user in ("a", "b", "c"):
+        cache.put(user, "key", user, version=1)
+
+    assert cache.snapshot()["users"] == 2
+    assert cache.get("a", "key", 1) is None
@@ -0,0 +1,55 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import DateTime, create_engine, literal, select
+
+from services.budget_spend import (
+    PERIODS,
+    _period_start_sql,
+    next_period_start,
+    period_start,
+)
+
+
+def test_period_start_at_month_ends_and_leap_days():
+    assert period_start(date(2024, 2, 29), "monthly") == date(2024, 2, 1)
+    assert period_start(date(2024, 12, 31), "monthly") == date(2024, 12, 1)
+    assert period_start(date(2024, 2, 29), "yearly") == date(2024, 1, 1)
+    # Weeks start on Monday, even across a month or year end
+    assert period_start(date(2024, 2, 29), "weekly") == date(2024, 2, 26)
+    assert period_start(date(2025, 1, 1), "weekly") == date(2024, 12, 30)
+    assert period_start(date(2024, 3, 3), "weekly") == date(2024, 2, 26)
+    assert period_start(date(2024, 2, 26), "weekly") == date(2024, 2, 26)
+
+
+def test_next_period_start_from_a_31_day_month():
+    assert next_period_start(date(2024, 1, 1), "monthly") == date(2024, 2, 1)
+    assert next_period_start(date(2024, 2, 1), "monthly") == date(2024, 3, 1)
+    assert next_period_start(date(2024, 12, 1), "monthly") == date(2025, 1, 1)
+    assert next_period_start(date(2024, 1, 1), "yearly") == date(2025, 1, 1)
+    assert next_period_start(date(2024, 2, 26), "weekly") == date(2024, 3, 4)
+
+
+def test_every_day_falls_in_the_period_it_starts():
+    day = date(2023, 12, 1)
+    while day < date(2025, 3, 1):
+        for period in PERIODS:
+            start = period_start(day, period)
+            assert start <= day < next_period_start(start, period)
+        day += timedelta(days=1)
+
+
+def test_sqlite_periods_match_the_counters():
+    """The rebuild (SQL) and the order writes (Python) use the same periods"""
+    engine = create_engine("sqlite://")
+    days = [date(2024, 2, 25) + timedelta(days=n) for n in range(10)] + [
+        date(2024, 12, 31),
+        date(2025, 1, 1),
+        date(2025, 1, 5),
+    ]
+    with engine.connect() as conn:
+        for period in PERIODS:
+            for day in days:
+                created_at = literal(datetime.combine(day, time(23, 59)), DateTime)
+                start = conn.scalar(select(_period_start_sql(conn, period, created_at)))
+                assert start == period_start(day, period), (period, day)
+    engine.dispose()
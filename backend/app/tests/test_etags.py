@@ -0,0 +1,55 @@
+"""Conditional GETs never answer for accounts the caller cannot read"""
+
+import asyncio
+
+import httpx
+
+
+async def statuses() -> dict:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            headers = {}
+            for name in ("etagowner", "etagother"):
+                user = {"username": name, "password": f"{name}password"}
+                await c.post("/api/user/register", json=user)
+                token = (await c.post("/api/user/token", data=user)).json()
+                headers[name] = {"Authorization": f"Bearer {token['access_token']}"}
+            await c.post(
+                "/api/account/",
+                json={"name": "Owned", "money": 10},
+                headers=headers["etagowner"],
+            )
+            account_id = (
+                await c.get("/api/account/", headers=headers["etagowner"])
+            ).json()[0]["id"]
+
+            results = {}
+            for path in (f"/api/account/{account_id}", "/api/account/missing"):
+                for name, auth in headers.items():
+                    for if_none_match in (None, "*"):
+                        extra = (
+                            {"If-None-Match": if_none_match} if if_none_match else {}
+                        )
+                        r = await c.get(path, headers=auth | extra)
+                        results[(path.rsplit("/", 1)[1], name, if_none_match)] = (
+                            r.status_code
+                        )
+            return account_id, results
+
+
+def test_if_none_match_star_checks_access_first(db_url):
+    account_id, results = asyncio.run(statuses())
+
+    assert results == {
+        (account_id, "etagowner", None): 200,
+        (account_id, "etagowner", "*"): 304,
+        (account_id, "etagother", None): 403,
+        (account_id, "etagother", "*"): 403,
+        ("missing", "etagowner", None): 404,
+        ("missing", "etagowner", "*"): 404,
+        ("missing", "etagother", None): 404,
+        ("missing", "etagother", "*"): 404,
+    }
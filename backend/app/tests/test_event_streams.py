@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from services.events import get_broker, stream
+
+
+def test_streams_subscribe_only_once_started():
+    async def scenario():
+        broker = get_broker()
+        # A client gone before the body starts never subscribed
+        body = stream("user")
+        assert broker.count == 0
+        await body.aclose()
+        assert broker.count == 0
+
+        body = stream("user")
+        assert (await body.__anext__()).startswith("retry:")
+        assert broker.count == 1
+        await body.aclose()
+        assert broker.count == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_broker_refuses_before_streaming(monkeypatch):
+    broker = get_broker()
+    monkeypatch.setattr(broker, "max_subscribers", 0)
+
+    with pytest.raises(HTTPException) as error:
+        broker.check_capacity()
+    assert error.value.status_code == 503
@@ -0,0 +1,43 @@
+import math
+from datetime import date
+from types import SimpleNamespace
+
+from services.fx import RateTable
+
+
+def rate_table() -> RateTable:
+    rows = [
+        SimpleNamespace(currency=code, units_per_base=units, as_of=date(2026, 1, 2))
+        for code, units in (("USD", 1.0), ("EUR", 0.5), ("JPY", 150.0))
+    ]
+    return RateTable(rows, version=1)
+
+
+def test_factors_convert_through_the_base_currency():
+    factors = rate_table().factors(["EUR", "JPY", "USD"], "USD")
+
+    assert list(factors) == [2.0, 1 / 150, 1.0]
+
+
+def test_unknown_currencies_have_no_factor():
+    factors = rate_table().factors(["GBP", "", None, "EUR"], "USD")
+
+    assert [math.isnan(factor) for factor in factors] == [True, True, True, False]
+
+
+def test_unknown_target_converts_only_its_own_currency():
+    factors = rate_table().factors(["EUR", "chf", "CHF "], "CHF")
+
+    assert math.isnan(factors[0])
+    # Same currency as the target: no rate needed
+    assert list(factors[1:]) == [1.0, 1.0]
+
+
+def test_codes_are_normalized():
+    factors = rate_table().factors([" eur", "Usd"], "usd")
+
+    assert list(factors) == [2.0, 1.0]
+
+
+def test_no_currencies():
+    assert len(rate_table().factors([], "USD")) == 0
@@ -0,0 +1,133 @@
+"""Upgrading a database created with the original schema
+
+Money was stored as floats and dates as strings (str(datetime.now()));
+migration 1 converts both, the later ones add tables and indexes.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import create_engine, func, select, text
+from sqlalchemy.orm import Session
+
+# What Base.metadata.create_all created before migration 1
+BASELINE_DDL = (
+    """
+    CREATE TABLE users (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        username VARCHAR UNIQUE,
+        hashed_password VARCHAR
+    )
+    """,
+    "CREATE INDEX ix_users_id ON users (id)",
+    """
+    CREATE TABLE accounts (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        owner_id VARCHAR REFERENCES users (id),
+        name VARCHAR,
+        currency VARCHAR,
+        money FLOAT
+    )
+    """,
+    "CREATE INDEX ix_accounts_id ON accounts (id)",
+    """
+    CREATE TABLE orders (
+        id VARCHAR NOT NULL PRIMARY KEY,
+        created_by VARCHAR REFERENCES users (id),
+        account_id VARCHAR REFERENCES accounts (id),
+        created_at VARCHAR,
+        updated_at VARCHAR,
+        description VARCHAR,
+        order_type VARCHAR,
+        amount FLOAT
+    )
+    """,
+    "CREATE INDEX ix_orders_id ON orders (id)",
+)
+
+
+def create_baseline(url: str):
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        for statement in BASELINE_DDL:
+            conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users VALUES ('u1', 'olduser', 'hash')"))
+        conn.execute(
+            text("INSERT INTO accounts VALUES (:id, 'u1', :name, 'USD', :money)"),
+            [
+                {"id": "a1", "name": "Main", "money": 100.1},
+                # Float sums drift: 0.1 + 0.2 is stored as 0.30000000000000004
+                {"id": "a2", "name": "Savings", "money": 0.1 + 0.2},
+                {"id": "a3", "name": "Empty", "money": None},
+            ],
+        )
+        conn.execute(
+            text(
+                "INSERT INTO orders VALUES "
+                "(:id, 'u1', :account_id, :created_at, :updated_at, "
+                ":description, 'Expense', :amount)"
+            ),
+            [
+                {
+                    "id": "o1",
+                    "account_id": "a1",
+                    "created_at": str(datetime(2024, 2, 29, 10, 0, 0, 123456)),
+                    "updated_at": str(datetime(2024, 3, 1, 8, 30)),
+                    "description": "groceries",
+                    "amount": -12.34,
+                },
+                {
+                    "id": "o2",
+                    "account_id": "a1",
+                    "created_at": "",
+                    "updated_at": "",
+                    "description": "rent",
+                    "amount": 0.07,
+                },
+            ],
+        )
+    engine.dispose()
+
+
+def test_migrations_upgrade_the_original_schema(db_url):
+    import api.routes  # noqa: F401 - registers every model on Base.metadata
+    from api.accounts.models import Accounts, BalanceSnapshots
+    from api.orders.models import Orders
+    from database.core import get_engine
+    from database.migrations import MIGRATIONS, init_schema
+
+    create_baseline(db_url)
+    engine = get_engine()
+
+    assert init_schema(engine) == [name for _, name, _ in MIGRATIONS]
+    # Already at the latest version
+    assert init_schema(engine) == []
+
+    with Session(engine) as db:
+        balances = dict(db.execute(select(Accounts.id, Accounts.money_minor)).all())
+        assert balances == {"a1": 10010, "a2": 30, "a3": 0}
+
+        orders = {order.id: order for order in db.scalars(select(Orders))}
+        assert orders["o1"].amount_minor == -1234
+        assert orders["o2"].amount_minor == 7
+        assert orders["o1"].created_at == datetime(2024, 2, 29, 10, 0, 0, 123456)
+        assert orders["o1"].updated_at == datetime(2024, 3, 1, 8, 30)
+        # An empty date gets the migration's time, an empty update none
+        assert isinstance(orders["o2"].created_at, datetime)
+        assert orders["o2"].updated_at is None
+        assert orders["o1"].category is None
+
+        # Migration 2: the snapshots of each account add up to its balance
+        snapshots = dict(
+            db.execute(
+                select(
+                    BalanceSnapshots.account_id, func.sum(BalanceSnapshots.delta_minor)
+                ).group_by(BalanceSnapshots.account_id)
+            ).all()
+        )
+        assert snapshots == {"a1": 10010, "a2": 30}
+
+        # Migrations 3 and 5: the existing orders are searchable by id
+        matches = db.execute(
+            text("SELECT order_id FROM orders_fts WHERE orders_fts MATCH 'groceries'")
+        ).all()
+        assert matches == [("o1",)]
@@ -0,0 +1,131 @@
+"""Concurrent order writes keep every account balance exact
+
+The same check as benchmarks.balance_stress, sized for the test suite:
+writers create, update (moving orders between accounts) and delete orders
+of the same accounts in parallel, through the app.
+"""
+
+import asyncio
+import random
+from collections import Counter
+
+import httpx
+from sqlalchemy import func, select
+
+# Opening amount of each account
+OPENING = {"Balance A": 100.0, "Balance B": 0.0, "Balance C": 2500.5}
+WRITERS = 8
+OPS = 15
+
+
+async def writer(client, headers, account_ids, order_ids, rng) -> Counter:
+    statuses = Counter()
+    for _ in range(OPS):
+        action = rng.random()
+        body = {
+            "account_id": rng.choice(account_ids),
+            "description": "concurrent",
+            "order_type": rng.choice(("Add", "Expense")),
+            "amount": rng.randint(-5000, 5000) / 100,
+        }
+        if action < 0.6 or not order_ids:
+            r = await client.post("/api/order/", json=body, headers=headers)
+            if r.status_code == 200:
+                # Shared ids, so that writers race on the same orders too
+                page = await client.get(
+                    "/api/order/", params={"limit": 500}, headers=headers
+                )
+                order_ids[:] = [o["id"] for o in page.json()["orders"]]
+        elif action < 0.85:
+            r = await client.put(
+                f"/api/order/{rng.choice(order_ids)}", json=body, headers=headers
+            )
+        else:
+            r = await client.delete(
+                f"/api/order/{rng.choice(order_ids)}", headers=headers
+            )
+        statuses[r.status_code] += 1
+    return statuses
+
+
+async def write_concurrently() -> tuple:
+    from main import app
+
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+    # ASGITransport sends no lifespan events: create the schema here
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            user = {"username": "balanceuser", "password": "balancepassword"}
+            assert (await c.post("/api/user/register", json=user)).status_code == 200
+            token = (await c.post("/api/user/token", data=user)).json()["access_token"]
+            headers = {"Authorization": f"Bearer {token}"}
+            for name, money in OPENING.items():
+                await c.post(
+                    "/api/account/",
+                    json={"name": name, "money": money},
+                    headers=headers,
+                )
+            accounts = {
+                a["id"]: a["name"]
+                for a in (await c.get("/api/account/", headers=headers)).json()
+            }
+
+            rng = random.Random(0)
+            order_ids = []
+            results = await asyncio.gather(
+                *(
+                    writer(
+                        c,
+                        headers,
+                        list(accounts),
+                        order_ids,
+                        random.Random(rng.random()),
+                    )
+                    for _ in range(WRITERS)
+                )
+            )
+        return accounts, sum(results, Counter()), await read_balances(accounts)
+
+
+async def read_balances(accounts: dict) -> dict:
+    """{account_id: (balance, sum of its orders)} in minor units"""
+    from api.accounts.models import Accounts
+    from api.orders.models import Orders
+    from database.core import async_session
+
+    async with async_session() as db:
+        sums = dict(
+            (
+                await db.execute(
+                    select(Orders.account_id, func.sum(Orders.amount_minor))
+                    .where(Orders.account_id.in_(accounts))
+                    .group_by(Orders.account_id)
+                )
+            ).all()
+        )
+        balances = dict(
+            (
+                await db.execute(
+                    select(Accounts.id, Accounts.money_minor).where(
+                        Accounts.id.in_(accounts)
+                    )
+                )
+            ).all()
+        )
+    return {
+        account_id: (balances[account_id], sums.get(account_id) or 0)
+        for account_id in accounts
+    }
+
+
+def test_concurrent_writes_keep_balances_exact(db_url):
+    from core.money import to_minor
+
+    accounts, statuses, balances = asyncio.run(write_concurrently())
+
+    # Lost races are refused (404 / 409), never half applied
+    assert set(statuses) <= {200, 404, 409}
+    assert statuses[200] > WRITERS * OPS // 2
+    assert len(balances) == len(OPENING)
+    for account_id, (balance, orders) in balances.items():
+        assert balance == to_minor(OPENING[accounts[account_id]]) + orders
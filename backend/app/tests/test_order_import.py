@@ -0,0 +1,55 @@
+"""Imports commit batch by batch: a failure keeps the batches before it"""
+
+import asyncio
+
+import httpx
+import pytest
+from sqlalchemy import select
+
+USER = {"username": "importuser", "password": "importpassword"}
+
+
+async def records(account_id: str, count: int, fail_after=None):
+    for line in range(1, count + 1):
+        if line == fail_after:
+            raise ConnectionError("upload cut off")
+        yield line, {"account_id": account_id, "order_type": "Add", "amount": 1}
+
+
+async def import_twice() -> tuple:
+    from main import app
+    from api.accounts.models import Accounts
+    from database.core import async_session
+    from services.order_import import import_orders
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            await c.post("/api/user/register", json=USER)
+            token = (await c.post("/api/user/token", data=USER)).json()
+            auth = {"Authorization": f"Bearer {token['access_token']}"}
+            await c.post("/api/account/", json={"name": "Import"}, headers=auth)
+            account = (await c.get("/api/account/", headers=auth)).json()[0]
+        account_id = account["id"]
+        user = {"username": USER["username"], "id": account["owner_id"]}
+
+        async with async_session() as db:
+            report = await import_orders(db, user, records(account_id, 5), batch_size=2)
+        async with async_session() as db:
+            with pytest.raises(ConnectionError):
+                await import_orders(
+                    db, user, records(account_id, 9, fail_after=6), batch_size=2
+                )
+        async with async_session() as db:
+            balance = await db.scalar(
+                select(Accounts.money_minor).where(Accounts.id == account_id)
+            )
+    return report, balance
+
+
+def test_failed_import_keeps_the_committed_batches(db_url):
+    report, balance = asyncio.run(import_twice())
+
+    assert (report["inserted"], report["batches"]) == (5, 3)
+    # 5 rows, then the 2 batches of the failed upload before line 6
+    assert balance == 900
@@ -0,0 +1,16 @@
+import asyncio
+
+from core.password_pool import PasswordPool, compute_duration, wait_duration
+
+
+def test_job_timings_are_exported():
+    waits, computes = wait_duration.total()[1], compute_duration.total()[1]
+    pool = PasswordPool(workers=1, queue_size=1)
+
+    async def run_jobs():
+        return await asyncio.gather(pool.run(sum, (1, 2)), pool.run(sum, (3, 4)))
+
+    assert asyncio.run(run_jobs()) == [3, 7]
+    assert wait_duration.total()[1] == waits + 2
+    assert compute_duration.total()[1] == computes + 2
+    assert pool.snapshot()["completed"] == 2
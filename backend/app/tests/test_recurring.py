@@ -0,0 +1,69 @@
+from datetime import date
+
+from api.recurring.models import RecurringOrders
+from services.recurring import due_occurrences, occurrence
+
+
+def occurrences(start: date, frequency: str, every: int, count: int) -> list:
+    return [occurrence(start, frequency, every, index) for index in range(count)]
+
+
+def test_monthly_from_the_31st_clamps_to_shorter_months():
+    assert occurrences(date(2024, 1, 31), "monthly", 1, 5) == [
+        date(2024, 1, 31),
+        date(2024, 2, 29),
+        # Back to the 31st: a short month does not shift the later ones
+        date(2024, 3, 31),
+        date(2024, 4, 30),
+        date(2024, 5, 31),
+    ]
+
+
+def test_monthly_outside_leap_years():
+    assert occurrence(date(2023, 1, 31), "monthly", 1, 1) == date(2023, 2, 28)
+    assert occurrence(date(2023, 1, 29), "monthly", 1, 1) == date(2023, 2, 28)
+
+
+def test_every_few_months_across_the_year_end():
+    assert occurrences(date(2024, 11, 30), "monthly", 3, 3) == [
+        date(2024, 11, 30),
+        date(2025, 2, 28),
+        date(2025, 5, 30),
+    ]
+
+
+def test_yearly_from_a_leap_day():
+    assert occurrences(date(2024, 2, 29), "yearly", 1, 5) == [
+        date(2024, 2, 29),
+        date(2025, 2, 28),
+        date(2026, 2, 28),
+        date(2027, 2, 28),
+        date(2028, 2, 29),
+    ]
+
+
+def test_daily_and_weekly_cross_the_leap_day():
+    assert occurrence(date(2024, 2, 28), "daily", 1, 1) == date(2024, 2, 29)
+    assert occurrence(date(2024, 2, 28), "daily", 1, 2) == date(2024, 3, 1)
+    assert occurrence(date(2024, 2, 26), "weekly", 1, 1) == date(2024, 3, 4)
+    assert occurrence(date(2024, 2, 26), "weekly", 2, 1) == date(2024, 3, 11)
+
+
+def test_due_occurrences_stop_at_the_end_date_and_the_limit():
+    definition = RecurringOrders(
+        start_date=date(2024, 1, 31),
+        end_date=date(2024, 4, 30),
+        frequency="monthly",
+        every=1,
+        next_index=1,
+    )
+
+    due, next_index, next_run = due_occurrences(definition, date(2024, 12, 31), 2)
+    assert due == [(1, date(2024, 2, 29)), (2, date(2024, 3, 31))]
+    assert (next_index, next_run) == (3, date(2024, 4, 30))
+
+    definition.next_index = next_index
+    due, next_index, next_run = due_occurrences(definition, date(2024, 12, 31), 2)
+    assert due == [(3, date(2024, 4, 30))]
+    # Past the end date: nothing left to run
+    assert (next_index, next_run) == (4, None)
@@ -0,0 +1,48 @@
+import time
+
+from core.token_cache import TokenCache
+
+
+def test_expired_tokens_are_dropped(monkeypatch):
+    now = 1_000_000.0
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache = TokenCache(10)
+    cache.put("token", {"sub": "user"}, expires_at=now + 60)
+
+    assert cache.get("token") == {"sub": "user"}
+    now += 60
+    assert cache.get("token") is None
+    assert cache.snapshot() == {"size": 0, "hits": 1, "misses": 1}
+
+
+def test_least_recently_used_token_is_evicted():
+    expires_at = time.time() + 3600
+    cache = TokenCache(2)
+    cache.put("a", {"sub": "a"}, expires_at)
+    cache.put("b", {"sub": "b"}, expires_at)
+    # Reading "a" makes "b" the least recently used
+    assert cache.get("a") == {"sub": "a"}
+    cache.put("c", {"sub": "c"}, expires_at)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"sub": "a"}
+    assert cache.get("c") == {"sub": "c"}
+    assert cache.snapshot()["size"] == 2
+
+
+def test_cached_claims_are_copies():
+    cache = TokenCache(1)
+    claims = {"sub": "user"}
+    cache.put("token", claims, time.time() + 60)
+    claims["sub"] = "someone else"
+    cache.get("token")["sub"] = "tampered"
+
+    assert cache.get("token") == {"sub": "user"}
+
+
+def test_size_zero_disables_the_cache():
+    cache = TokenCache(0)
+    cache.put("token", {"sub": "user"}, time.time() + 60)
+
+    assert cache.get("token") is None
+    assert cache.snapshot()["size"] == 0
@@ -1,9 +1,92 @@
+"""Launches the API with uvicorn
+
+    python start_server.py                  # SERVER_MODE, "dev" by default
+    python start_server.py --production     # overrides SERVER_MODE
+    python start_server.py --production --workers 4
+
+dev: one process with the file watcher (reload). production: SERVER_WORKERS
+processes (default: one per available core), uvloop and httptools when they
+are installed, and a graceful shutdown on SIGTERM / SIGINT that stops
+accepting connections and lets in-flight requests finish for up to
+SERVER_GRACEFUL_SHUTDOWN_TIMEOUT seconds. The schema is created / upgraded
+once here, before the workers start, instead of by every worker.
+"""
+
+import argparse
+import importlib.util
 import os
 import sys
 
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app")
+sys.path.insert(0, APP_DIR)
+# Settings read ../.env relative to the working directory
+os.chdir(APP_DIR)
+
+import uvicorn  # noqa: E402
+
+
+def available_cores() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def prepare_schema():
+    """Creates or upgrades the schema once, then lets the workers skip it"""
+    import api.routes  # noqa: F401 - registers every model on Base.metadata
+    from database.core import get_engine
+    from database.migrations import init_schema
+
+    engine = get_engine()
+    for name in init_schema(engine):
+        print(f"applied {name}")
+    engine.dispose()
+    # Inherited by the worker processes, read by their Settings
+    os.environ["INIT_SCHEMA_ON_STARTUP"] = "false"
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--production", action="store_true")
+    parser.add_argument("--workers", type=int, default=None)
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    from core.config import settings
+
+    if not args.production and settings.SERVER_MODE == "dev":
+        uvicorn.run(
+            "main:app",
+            host=settings.SERVER_HOST,
+            port=settings.SERVER_PORT,
+            reload=True,
+            app_dir=APP_DIR,
+        )
+        return
+
+    prepare_schema()
+    uvicorn.run(
+        "main:app",
+        host=settings.SERVER_HOST,
+        port=settings.SERVER_PORT,
+        workers=args.workers or settings.SERVER_WORKERS or available_cores(),
+        loop="uvloop" if installed("uvloop") else "asyncio",
+        http="httptools" if installed("httptools") else "h11",
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEPALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY,
+        access_log=settings.SERVER_ACCESS_LOG,
+        app_dir=APP_DIR,
+    )
 
-import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True)
+    main()